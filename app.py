@@ -1,21 +1,37 @@
 """
 App Dash (sem upload):
-- Lê o arquivo CONSOLIDADO_Avanco_Fisico_2026.xlsx na inicialização
-- Monta layout
+- Monta o layout e já responde; lê o arquivo
+  CONSOLIDADO_Avanco_Fisico_2026.xlsx em segundo plano ao subir
+  (ou várias planilhas: DATA_SOURCE = pasta ou glob, src/sources.py)
+- Recarrega a planilha em segundo plano quando ela muda (src/reload.py)
+- Relatório do tempo de subida (imports, layout, carga, preparo) no log
+  e em /metrics (src/startup.py)
 - Popula filtros
-- Atualiza KPIs, gráficos, insights e tabela
+- Filtra uma vez e publica a chave do recorte (store-filtered)
+- KPIs, cada gráfico, insights e tabela em callbacks independentes
 - Botão "Limpar filtros"
 """
 
+# Primeiro import: zera o relógio do relatório de subida
+from src.startup import STARTUP
+
+import os
 from pathlib import Path
 
-from dash import Dash, Input, Output, State, no_update
+from dash import ClientsideFunction, Dash, Input, Output, State, Patch, ctx, no_update
 
-from src.data import load_excel_local, prepare_df, df_to_store, df_from_store, apply_filters
+from src.cache import (
+    get_dataset, get_cooccurrence, key_version, set_dataset_loader,
+    DATASETS, INDEXES, CUBES, COOCCURRENCE,
+)
+from src.reload import DatasetWatcher, LOADING_STATUS
+from src.memo import get_filter_result, result_store_key, result_from_store, memo_stats, RESULTS
 from src.layout import build_layout
-from src.filters import build_filter_options_and_bounds
+from src.filters import SEARCH_COLUMNS, build_filter_bounds, build_cascading_options
 from src.charts import (
+    FIGURES as FIGURE_CACHE,
     plot_template,
+    plotly_template_json,
     fig_empty,
     build_funnel_fig,
     build_wip_stage_fig,
@@ -24,50 +40,111 @@ from src.charts import (
     build_leadtime_fig,
     build_conversion_fig,
 )
-from src.insights import build_insights, compute_kpis, build_table_payload
+from src.insights import build_insights, compute_kpis
+from src.table import filter_positions, sort_positions, build_table_page
+from src.pipeline import accept_filter_state, skip_if_stale
+from src import compress, metrics
 
 
 APP_FILE = "CONSOLIDADO_Avanco_Fisico_2026.xlsx"
 
-# ✅ Crie o app UMA ÚNICA VEZ
-app = Dash(__name__, suppress_callback_exceptions=True)
-server = app.server
-app.layout = build_layout()
+# Origem da base: planilha, pasta com planilhas ou glob (ex.: "dados/*.xlsx");
+# caminhos relativos partem da pasta do app
+DATA_SOURCE = str(Path(__file__).resolve().parent / os.environ.get("DATA_SOURCE", APP_FILE))
 
+# Base em representação compacta (categóricas, float32, datas em dias)
+COMPACT_DATASET = os.environ.get("COMPACT_DATASET", "1") != "0"
 
-def load_initial_store_payload():
-    """
-    Carrega e prepara o dataframe ao subir o servidor.
-    Retorna payload serializado para dcc.Store.
-    """
-    base_path = Path(__file__).resolve().parent / APP_FILE
-    if not base_path.exists():
-        # O app sobe, mas mostrará mensagem e gráficos vazios
-        return None, f"❌ Arquivo não encontrado: {base_path}"
+# Colunas mapeadas do cache em disco: workers do gunicorn dividem a mesma
+# memória da base (ver gunicorn.conf.py)
+SHARED_DATASET = os.environ.get("SHARED_DATASET", "1") != "0"
 
-    raw = load_excel_local(str(base_path))
-    df = prepare_df(raw)
-    return df_to_store(df), f"✅ Base carregada: {APP_FILE} — {len(df):,} linhas"
+# Começa a carregar a base assim que o módulo sobe (o gunicorn desliga:
+# o mestre carrega antes do fork e o vigia começa em cada worker, ver
+# gunicorn.conf.py)
+DATASET_AUTOLOAD = os.environ.get("DATASET_AUTOLOAD", "1") != "0"
 
+STARTUP.mark("imports")
 
-# Carrega base ao iniciar (processo do servidor)
-INITIAL_STORE_DATA, INITIAL_STATUS = load_initial_store_payload()
+# ✅ Crie o app UMA ÚNICA VEZ
+app = Dash(__name__, suppress_callback_exceptions=True)
+server = app.server
+
+# /metrics (Prometheus) e, com METRICS_LOG=1, uma linha JSON por callback
+metrics.init_app(server)
+# gzip/brotli nas respostas (depois das métricas: elas medem antes e depois)
+compress.init_app(server)
+metrics.register_collector(metrics.lru_collector({
+    "datasets": DATASETS,
+    "indexes": INDEXES,
+    "cubes": CUBES,
+    "cooccurrence": COOCCURRENCE,
+    "results": RESULTS,
+    "figures": FIGURE_CACHE,
+    "compressed_static": compress.STATIC,
+}))
+metrics.register_collector(lambda: [
+    ("query_path_total", {"path": path}, n, "counter") for path, n in memo_stats()["paths"].items()
+])
+metrics.register_collector(STARTUP.collect)
+app.layout = build_layout()
+STARTUP.mark("layout")
+
+# Carrega a base em segundo plano (o layout já é servido enquanto isso) e
+# depois recarrega as planilhas quando elas mudarem
+WATCHER = DatasetWatcher(DATA_SOURCE, compact=COMPACT_DATASET, mmap=SHARED_DATASET)
+# Chave nova publicada por outro worker: este confere as planilhas na hora
+set_dataset_loader(WATCHER.resolve)
+if DATASET_AUTOLOAD:
+    WATCHER.start()
 
 
 @app.callback(
     Output("store-df", "data"),
     Output("load-status", "children"),
+    Output("page-load", "disabled"),
     Input("page-load", "n_intervals"),
     prevent_initial_call=False,
 )
 def init_data(_n):
     """
     Inicializa o store-df na abertura do app.
-    Usa Interval para disparar uma vez.
+    O Interval repete enquanto a base carrega (mostrando o progresso) e
+    para quando ela fica pronta.
+    """
+    key, status = WATCHER.current
+    if key is None:
+        if WATCHER.loading:
+            return no_update, WATCHER.progress or LOADING_STATUS, False
+        # O app segue no ar, mas mostrará mensagem e gráficos vazios
+        return no_update, status, True
+    return key, status, True
+
+
+@app.callback(
+    Output("store-df", "data", allow_duplicate=True),
+    Output("load-status", "children", allow_duplicate=True),
+    Input("reload-poll", "n_intervals"),
+    State("store-df", "data"),
+    State("load-status", "children"),
+    prevent_initial_call=True,
+)
+def sync_data(_n, store_data, shown_status):
     """
-    if INITIAL_STORE_DATA is None:
-        return no_update, INITIAL_STATUS
-    return INITIAL_STORE_DATA, INITIAL_STATUS
+    Troca para a versão nova da base quando o watcher recarregar a planilha.
+    Enquanto ele lê a planilha, mostra o progresso no load-status.
+    Só avança: worker que ainda não recarregou não devolve a versão antiga.
+    """
+    if key_version(WATCHER.current[0]) < key_version(store_data):
+        return no_update, no_update
+    progress = WATCHER.progress
+    if progress:
+        return no_update, progress
+    key, status = WATCHER.current
+    if key is None or key == store_data:
+        # Tira o texto de progresso se a leitura terminou sem versão nova
+        return no_update, (status if shown_status != status else no_update)
+    return key, status
 
 
 @app.callback(
@@ -81,10 +158,6 @@ def set_theme(toggle_value):
 
 
 @app.callback(
-    Output("f-cliente", "options"),
-    Output("f-os", "options"),
-    Output("f-tag", "options"),
-    Output("f-situacao", "options"),
     Output("f-dt-receb", "min_date_allowed"),
     Output("f-dt-receb", "max_date_allowed"),
     Output("f-dt-exped", "min_date_allowed"),
@@ -94,27 +167,59 @@ def set_theme(toggle_value):
 )
 def init_filters(store_data):
     """
-    Popula dropdowns e limites de datas.
+    Limites de datas.
     Também salva defaults para o botão de limpar filtros.
     """
-    if not store_data:
-        return [], [], [], [], None, None, None, None, {"dt_defaults": [None, None, None, None]}
+    df = get_dataset(store_data)
+    if df is None:
+        return None, None, None, None, {"dt_defaults": [None, None, None, None]}
+    return build_filter_bounds(df)
 
-    df = df_from_store(store_data)
 
-    (
-        opt_cliente,
-        opt_os,
-        opt_tag,
-        opt_situacao,
-        receb_min,
-        receb_max,
-        exp_min,
-        exp_max,
-        defaults,
-    ) = build_filter_options_and_bounds(df)
+# (dropdown, coluna da base)
+OPTION_DROPDOWNS = [
+    ("f-cliente", "cliente"),
+    ("f-os", "os_cliente"),
+    ("f-tag", "tag"),
+    ("f-situacao", "situacao_desenho"),
+]
+
+
+# Dropdowns com busca no servidor (texto digitado -> search_value)
+SEARCH_DROPDOWNS = [(dropdown, col) for dropdown, col in OPTION_DROPDOWNS if col in SEARCH_COLUMNS]
 
-    return opt_cliente, opt_os, opt_tag, opt_situacao, receb_min, receb_max, exp_min, exp_max, defaults
+
+@app.callback(
+    [Output(dropdown, "options") for dropdown, _ in OPTION_DROPDOWNS],
+    Input("store-df", "data"),
+    [Input(dropdown, "value") for dropdown, _ in OPTION_DROPDOWNS],
+    [Input(dropdown, "search_value") for dropdown, _ in SEARCH_DROPDOWNS],
+)
+def filter_options(store_data, *args):
+    """
+    Opções em cascata: cada dropdown lista só os valores que aparecem
+    junto com o que está selecionado nos outros (mapas de co-ocorrência).
+    OS e TAG levam só as primeiras opções que batem com o texto buscado.
+    """
+    cooc = get_cooccurrence(store_data)
+    if cooc is None:
+        return [[] for _ in OPTION_DROPDOWNS]
+
+    values, texts = args[:len(OPTION_DROPDOWNS)], args[len(OPTION_DROPDOWNS):]
+    selected = {col: v or [] for (_, col), v in zip(OPTION_DROPDOWNS, values)}
+    search = {col: text for (_, col), text in zip(SEARCH_DROPDOWNS, texts)}
+
+    changed = set(ctx.triggered_prop_ids)
+    searched = {dropdown for dropdown, _ in SEARCH_DROPDOWNS if f"{dropdown}.search_value" in changed}
+    if changed and changed == {f"{dropdown}.search_value" for dropdown in searched}:
+        # Só digitou numa busca: atualiza só aquele dropdown
+        columns = [col for dropdown, col in SEARCH_DROPDOWNS if dropdown in searched]
+    else:
+        # A seleção de um dropdown não muda a lista dele mesmo
+        columns = [col for dropdown, col in OPTION_DROPDOWNS if changed != {f"{dropdown}.value"}]
+    with metrics.span("filter_options"):
+        options = build_cascading_options(cooc, selected, columns, search)
+    return [options.get(col, no_update) for _, col in OPTION_DROPDOWNS]
 
 
 @app.callback(
@@ -139,71 +244,180 @@ def clear_filters(_n_clicks, defaults):
     return [], [], [], [], None, None, None, None, ""
 
 
+FILTER_INPUTS = [
+    ("f-cliente", "value"),
+    ("f-os", "value"),
+    ("f-tag", "value"),
+    ("f-situacao", "value"),
+    ("f-dt-receb", "start_date"),
+    ("f-dt-receb", "end_date"),
+    ("f-dt-exped", "start_date"),
+    ("f-dt-exped", "end_date"),
+    ("f-desenho", "value"),
+]
+
+# Mudanças seguidas dos filtros viram um só estado numerado (assets/filters.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="filters", function_name="coalesce"),
+    Output("store-filter-seq", "data"),
+    [Input(c, p) for c, p in FILTER_INPUTS],
+    State("store-filter-seq", "data"),
+)
+
+
 @app.callback(
-    Output("kpi-grid", "children"),
-    Output("g-funnel", "figure"),
-    Output("g-wip-stage", "figure"),
-    Output("g-timeseries", "figure"),
-    Output("g-top-os", "figure"),
-    Output("g-leadtime", "figure"),
-    Output("g-conv", "figure"),
-    Output("insights", "children"),
-    Output("tbl", "data"),
-    Output("tbl", "columns"),
+    Output("store-filtered", "data"),
     Input("store-df", "data"),
-    Input("store-theme", "data"),
-    Input("f-cliente", "value"),
-    Input("f-os", "value"),
-    Input("f-tag", "value"),
-    Input("f-situacao", "value"),
-    Input("f-dt-receb", "start_date"),
-    Input("f-dt-receb", "end_date"),
-    Input("f-dt-exped", "start_date"),
-    Input("f-dt-exped", "end_date"),
-    Input("f-desenho", "value"),
+    Input("store-filter-seq", "data"),
+    [State(c, p) for c, p in FILTER_INPUTS],
 )
-def render(store_data, theme,
-           f_cliente, f_os, f_tag, f_situacao,
-           receb_s, receb_e, exped_s, exped_e,
-           f_desenho):
+def filter_data(store_data, filter_seq,
+                f_cliente, f_os, f_tag, f_situacao,
+                receb_s, receb_e, exped_s, exped_e,
+                f_desenho):
     """
-    Renderiza tudo com base no dataframe e nos filtros.
+    Aplica os filtros e publica a chave do recorte (dataset + filtros
+    normalizados + seq do estado dos filtros). Cada painel abaixo é um
+    callback próprio que lê essa chave; o Dash dispara todos em paralelo.
+    Estados de filtro já superados na mesma aba são pulados.
     """
-    template = plot_template(theme)
-
-    if not store_data:
-        kpis = compute_kpis(None)
-        empty = fig_empty(template, "Base não carregada. Verifique o arquivo Excel na pasta do projeto.")
-        return kpis, empty, empty, empty, empty, empty, empty, "Sem dados.", [], []
-
-    df = df_from_store(store_data)
-
-    df_f = apply_filters(
-        df,
-        clientes=f_cliente or [],
-        os_values=f_os or [],
-        tag_values=f_tag or [],
-        situacoes=f_situacao or [],
+    seq = accept_filter_state(filter_seq)
+    res = get_filter_result(
+        store_data,
+        clientes=f_cliente,
+        os_values=f_os,
+        tag_values=f_tag,
+        situacoes=f_situacao,
         dt_receb_range=[receb_s, receb_e],
         dt_exped_range=[exped_s, exped_e],
         desenho_text=f_desenho,
     )
+    if res is None:
+        return None
+    return {**result_store_key(res), **seq}
+
+
+@app.callback(
+    Output("kpi-grid", "children"),
+    Input("store-filtered", "data"),
+)
+def render_kpis(filtered):
+    skip_if_stale(filtered, "kpis")
+    res = result_from_store(filtered)
+    if res is None:
+        return compute_kpis(None)
+    return res.get("kpis", lambda: metrics.measure("kpis", lambda: compute_kpis(None, res.summary())))
+
+
+# (id do gráfico, nome no cache, builder(res, template, *extras), entradas extras)
+FIGURES = [
+    ("g-funnel", "funnel", lambda res, t: build_funnel_fig(None, t, res.summary()), []),
+    ("g-wip-stage", "wip", lambda res, t: build_wip_stage_fig(None, t, res.summary()), []),
+    (
+        "g-timeseries", "timeseries",
+        lambda res, t, granularity: build_timeseries_fig(None, t, res.timeseries(granularity)),
+        [Input("ts-granularity", "value")],
+    ),
+    ("g-top-os", "top_os", lambda res, t: build_top_os_fig(None, t, res.os_totals()), []),
+    ("g-leadtime", "leadtime", lambda res, t: build_leadtime_fig(res.df, t), []),
+    ("g-conv", "conversion", lambda res, t: build_conversion_fig(None, t, res.summary()), []),
+]
+
+
+def register_figure_callback(graph_id, name, builder, extra_inputs):
+    @app.callback(
+        Output(graph_id, "figure"),
+        Input("store-filtered", "data"),
+        *extra_inputs,
+        State("store-theme", "data"),
+    )
+    def render_figure(filtered, *args):
+        *extras, theme = args
+        skip_if_stale(filtered, name)
+        template = plot_template(theme)
+        res = result_from_store(filtered)
+        if res is None:
+            return fig_empty(template, "Base não carregada. Verifique o arquivo Excel na pasta do projeto.")
+        return res.get(
+            (name, template, *extras),
+            lambda: metrics.measure("figure", lambda: builder(res, template, *extras), figure=name),
+        )
+
+    return render_figure
 
-    kpis = compute_kpis(df_f)
 
-    fig_funnel = build_funnel_fig(df_f, template)
-    fig_wip = build_wip_stage_fig(df_f, template)
-    fig_ts = build_timeseries_fig(df_f, template)
-    fig_top_os = build_top_os_fig(df_f, template)
-    fig_lt = build_leadtime_fig(df_f, template)
-    fig_conv = build_conversion_fig(df_f, template)
+for _graph_id, _name, _builder, _extra_inputs in FIGURES:
+    register_figure_callback(_graph_id, _name, _builder, _extra_inputs)
 
-    insights = build_insights(df_f)
 
-    tbl_data, tbl_cols = build_table_payload(df_f)
+@app.callback(
+    [Output(graph_id, "figure", allow_duplicate=True) for graph_id, *_ in FIGURES],
+    Input("store-theme", "data"),
+    prevent_initial_call=True,
+)
+def restyle_figures(theme):
+    """
+    Troca de tema: só substitui o template das figuras (Patch), sem
+    recalcular dados nem reenviar os traces.
+    """
+    template = plotly_template_json(plot_template(theme))
+    patches = []
+    for _ in FIGURES:
+        p = Patch()
+        p["layout"]["template"] = template
+        patches.append(p)
+    return patches
+
+
+@app.callback(
+    Output("insights", "children"),
+    Input("store-filtered", "data"),
+)
+def render_insights(filtered):
+    skip_if_stale(filtered, "insights")
+    res = result_from_store(filtered)
+    if res is None:
+        return "Sem dados."
+    return res.get("insights", lambda: metrics.measure("insights", lambda: build_insights(
+        None, res.summary(), res.os_totals().set_index("os_cliente")["saldo_a_expedir_kg"]
+    )))
 
-    return kpis, fig_funnel, fig_wip, fig_ts, fig_top_os, fig_lt, fig_conv, insights, tbl_data, tbl_cols
 
+@app.callback(
+    Output("tbl", "data"),
+    Output("tbl", "page_count"),
+    Output("tbl", "page_current"),
+    Output("tbl-count", "children"),
+    Input("store-filtered", "data"),
+    Input("tbl", "page_current"),
+    Input("tbl", "page_size"),
+    Input("tbl", "sort_by"),
+    Input("tbl", "filter_query"),
+)
+def render_table(filtered, page_current, page_size, sort_by, filter_query):
+    """
+    Tabela paginada no servidor: filtra/ordena todo o recorte e formata
+    só a página pedida.
+    """
+    skip_if_stale(filtered, "table")
+    res = result_from_store(filtered)
+    if res is None:
+        return [], 1, 0, ""
+
+    # Mudou o recorte, a ordenação ou o filtro da tabela: volta à 1ª página
+    if "tbl.page_current" not in ctx.triggered_prop_ids:
+        page_current = 0
+
+    sort_key = tuple((s.get("column_id"), s.get("direction")) for s in (sort_by or []))
+    with metrics.span("table"):
+        order = res.get(
+            ("table_order", sort_key, filter_query or ""),
+            lambda: sort_positions(res.df, filter_positions(res.df, filter_query), sort_by),
+        )
+        data, page_count, total = build_table_page(res.df, page_current, page_size, order)
+    metrics.count_rows("table", total, len(data))
+    page_current = min(int(page_current or 0), page_count - 1)
+    return data, page_count, page_current, f"{total:,} itens".replace(",", ".")
 
 if __name__ == "__main__":
     # Local: roda com o servidor embutido
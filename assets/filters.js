@@ -0,0 +1,30 @@
+// Fila de mudanças de filtro (ver src/pipeline.py):
+// mudanças seguidas dentro de batch_ms viram um único estado novo,
+// numerado por aba ({session, seq}); só ele segue para o servidor.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    filters: {
+        coalesce: function () {
+            var state = arguments[arguments.length - 1] || {};
+            var batchMs = state.batch_ms || 0;
+            var tab = window.__filterPipeline;
+            if (!tab) {
+                var id = (window.crypto && window.crypto.randomUUID)
+                    ? window.crypto.randomUUID()
+                    : String(Date.now()) + Math.random().toString(16).slice(2);
+                tab = window.__filterPipeline = {session: id, seq: state.seq || 0, pending: 0};
+            }
+            var ticket = ++tab.pending;
+            return new Promise(function (resolve) {
+                setTimeout(function () {
+                    if (ticket !== tab.pending) {
+                        // Chegou outra mudança na janela: esta não vai ao servidor
+                        resolve(window.dash_clientside.no_update);
+                        return;
+                    }
+                    tab.seq += 1;
+                    resolve({session: tab.session, seq: tab.seq, batch_ms: batchMs});
+                }, batchMs);
+            });
+        }
+    }
+});
@@ -0,0 +1,20 @@
+"""
+Benchmarks do dashboard (rodar da raiz do projeto):
+    python -m benchmarks.bench_stages
+    python -m benchmarks.bench_filters
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_ingest
+    python -m benchmarks.bench_sources
+    python -m benchmarks.bench_cube
+    python -m benchmarks.bench_figures
+
+Suíte completa com resultados em JSON e comparação entre execuções:
+    python -m benchmarks.suite run --out antes.json
+    python -m benchmarks.suite compare antes.json depois.json
+
+Teste de carga pelos callbacks HTTP (no processo ou contra --url):
+    python -m benchmarks.loadtest --users 4 --duration 30
+
+Tempo de subida (1º byte, base pronta e fases do relatório de subida):
+    python -m benchmarks.coldstart --runs 3
+"""
@@ -0,0 +1,148 @@
+"""
+Cubo pré-agregado (src/cube.py) vs agregação sobre as linhas filtradas.
+- Confere que os números de KPIs, insights, somas por OS (top OS) e dos
+  gráficos de funil, WIP, conversão e série por dia/semana/mês batem pelos
+  dois caminhos (np.isclose: a ordem das somas muda o arredondamento)
+- Mede o tempo de cada caminho por combinação de filtros (datas em
+  semanas inteiras, para caber no grão do cubo)
+
+Uso:
+    python -m benchmarks.bench_cube [--sizes 100000 1000000] [--excel CONSOLIDADO_Avanco_Fisico_2026.xlsx]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_filters import filter_mixes
+from benchmarks.synthetic import make_raw_df
+from src.charts import build_conversion_fig, build_funnel_fig, build_timeseries_fig, build_wip_stage_fig
+from src.cube import StageCube
+from src.data import apply_filters, load_excel_local, prepare_df
+from src.index import FilterIndex
+from src.memo import FilterResult, normalize_filters
+from src.timeseries import GRANULARITIES
+
+
+# Datas dos filtros em semanas inteiras (segunda a domingo)
+WEEK_RANGES = {
+    "dt_receb_range": ["2024-03-04", "2024-09-29"],
+    "dt_exped_range": ["2025-01-06", None],
+}
+
+
+# Somas em outra ordem (cubo x linhas) diferem no arredondamento do float
+RTOL = 1e-6
+ATOL = 1e-6
+
+
+def _plain(obj):
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    if hasattr(obj, "tolist"):
+        return _plain(obj.tolist())
+    return obj
+
+
+def same(a, b) -> bool:
+    """
+    Estruturas iguais; números comparados com np.isclose (RTOL/ATOL).
+    """
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return bool(np.isclose(a, b, rtol=RTOL, atol=ATOL, equal_nan=True))
+    return a == b
+
+
+def outputs(res: FilterResult) -> dict:
+    """
+    Números por trás de tudo que o dashboard mostra a partir dos agregados
+    do recorte (KPIs e insights saem do resumo e das somas por OS).
+    """
+    t = "plotly_white"
+    summary = res.summary()
+    figs = {
+        "funnel": build_funnel_fig(None, t, summary),
+        "wip": build_wip_stage_fig(None, t, summary),
+        "conversion": build_conversion_fig(None, t, summary),
+        **{f"timeseries[{g}]": build_timeseries_fig(None, t, res.timeseries(g)) for g in GRANULARITIES},
+    }
+    out = {name: _plain(fig["data"]) for name, fig in figs.items()}
+    out["summary"] = _plain({
+        "n_rows": summary.n_rows,
+        "total_kg": summary.total_kg,
+        "produzido_kg": summary.produzido_kg,
+        "exped_kg": summary.exped_kg,
+        "atraso_kg": summary.atraso_kg,
+        "reached_kg": dict(summary.reached_kg),
+        "stage_kg": {str(k): v for k, v in summary.stage_kg.items()},
+        "leadtime_sum": summary.leadtime_sum,
+        "leadtime_count": summary.leadtime_count,
+    })
+    # Por OS em ordem de nome (o ranking do top OS / "maior WIP" pode trocar
+    # de posição entre valores que só diferem no arredondamento)
+    totals = res.os_totals().astype({"os_cliente": str}).sort_values("os_cliente")
+    out["os_totals"] = _plain(totals.to_dict("list"))
+    return out
+
+
+def _best(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(name, df):
+    index = FilterIndex(df)
+    t0 = time.perf_counter()
+    cube = StageCube(df, index)
+    t_build = time.perf_counter() - t0
+    print(f"\n{name} — {len(df):,} linhas, cubo com {cube.n_cells:,} células (montado em {t_build * 1000:.0f} ms)")
+    print(f"{'filtro':<18} {'caminho':>8} {'linhas (ms)':>12} {'cubo (ms)':>10} {'ganho':>7}")
+
+    for fname, kw in filter_mixes(df):
+        kw = {**kw, **{k: v for k, v in WEEK_RANGES.items() if kw.get(k) != [None, None]}}
+        norm = normalize_filters(**kw)
+
+        def rows_result():
+            return FilterResult("bench", norm, lambda: apply_filters(df, index=index, **kw))
+
+        def cube_result():
+            return FilterResult("bench", norm, lambda: apply_filters(df, index=index, **kw), cube=cube)
+
+        path = "cubo" if cube.fits(**kw) else "linhas"
+        if path == "cubo" and not same(outputs(rows_result()), outputs(cube_result())):
+            raise AssertionError(f"Cubo e linhas divergem no filtro '{fname}'")
+
+        def aggregates(make):
+            res = make()
+            res.summary(), res.os_totals(), res.timeseries()
+
+        t_rows = _best(lambda: aggregates(rows_result))
+        t_cube = _best(lambda: aggregates(cube_result)) if path == "cubo" else t_rows
+        print(f"{fname:<18} {path:>8} {t_rows * 1000:>12.2f} {t_cube * 1000:>10.2f} {t_rows / t_cube:>6.1f}x")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="*", default=[100_000, 1_000_000])
+    p.add_argument("--excel", help="também mede a planilha real")
+    args = p.parse_args()
+
+    if args.excel:
+        run(args.excel, prepare_df(load_excel_local(args.excel)))
+    for n in args.sizes:
+        run("sintética", prepare_df(make_raw_df(n)))
+
+
+if __name__ == "__main__":
+    main()
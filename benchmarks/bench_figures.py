@@ -0,0 +1,223 @@
+"""
+Figuras em dict (src/charts.py) vs plotly.express/go.Figure (versão antiga).
+- Confere que funil, WIP, série semanal, top OS e conversão saem com os
+  mesmos traces, e que o histograma de lead time conta todas as linhas
+- Confere a série por dia/semana/mês (números de dia, src/timeseries.py)
+  contra o to_period da versão antiga e compara o tempo das duas
+- Mede montar + serializar (como o Dash faz) cada figura: px, dict sem
+  cache e dict do cache; e o tamanho do JSON enviado
+
+Uso:
+    python -m benchmarks.bench_figures [--sizes 10000 100000 1000000] [--excel CONSOLIDADO_Avanco_Fisico_2026.xlsx]
+"""
+
+import argparse
+import base64
+import json
+import time
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from benchmarks.synthetic import make_raw_df
+from src import charts
+from src.charts import (
+    build_conversion_fig, build_funnel_fig, build_leadtime_fig, build_timeseries_fig, build_top_os_fig,
+    FIGURE_DECIMALS, build_wip_stage_fig, os_totals,
+)
+from src.data import date_values, load_excel_local, prepare_df
+from src.summary import compute_stage_summary
+from src.timeseries import GRANULARITIES, timeseries_kg
+
+
+TEMPLATE = "plotly_white"
+MARGIN = dict(l=10, r=10, t=40, b=10)
+PERIOD_FREQ = {"dia": "D", "semana": "W", "mes": "M"}
+
+
+# ---- Versão antiga (referência) ----
+
+def period_kg(df, freq="W"):
+    """
+    kg recebido e expedido por período via to_period (antigo charts.weekly_kg).
+    """
+    tmp = df.copy()
+    tmp["receb_sem"] = date_values(tmp["dt_receb"]).dt.to_period(freq).dt.start_time
+    tmp["exped_sem"] = date_values(tmp["dt_exped"]).dt.to_period(freq).dt.start_time
+
+    receb = tmp.dropna(subset=["receb_sem"]).groupby("receb_sem")["peso_total_kg"].sum()
+    exped = tmp.dropna(subset=["exped_sem"]).groupby("exped_sem")["peso_exped_kg"].sum()
+    return receb, exped
+
+
+def px_funnel(summary):
+    reached = summary.funnel()
+    fig = go.Figure(go.Funnel(y=list(reached.keys()), x=list(reached.values()), textinfo="value+percent initial"))
+    fig.update_layout(template=TEMPLATE, height=380, margin=MARGIN)
+    return fig
+
+
+def px_wip(summary):
+    wip = summary.stage_kg.reset_index().sort_values("peso_total_kg", ascending=True)
+    fig = px.bar(wip, x="peso_total_kg", y="etapa_atual", orientation="h",
+                 labels={"peso_total_kg": "KG", "etapa_atual": "Etapa"})
+    fig.update_layout(template=TEMPLATE, height=380, margin=MARGIN)
+    return fig
+
+
+def px_timeseries(weekly):
+    receb, exped = weekly
+    fig = go.Figure()
+    if len(receb):
+        fig.add_trace(go.Scatter(x=receb.index, y=receb.to_numpy(), mode="lines+markers", name="Recebido (kg)"))
+    if len(exped):
+        fig.add_trace(go.Scatter(x=exped.index, y=exped.to_numpy(), mode="lines+markers", name="Expedido (kg)"))
+    fig.update_layout(template=TEMPLATE, height=380, margin=MARGIN, legend=dict(orientation="h"))
+    return fig
+
+
+def px_top_os(by_os):
+    by_os = by_os[by_os["os_cliente"] != ""].sort_values("saldo_a_produzir_kg", ascending=False).head(10)
+    fig = px.bar(by_os[::-1], x="saldo_a_produzir_kg", y="os_cliente", orientation="h",
+                 labels={"saldo_a_produzir_kg": "Saldo a Produzir (kg)", "os_cliente": "OS Cliente"})
+    fig.update_layout(template=TEMPLATE, height=380, margin=MARGIN)
+    return fig
+
+
+def px_leadtime(df):
+    lt = df.loc[df["leadtime_dias"].notna() & (df["leadtime_dias"] >= 0) & (df["leadtime_dias"] <= 3650), "leadtime_dias"]
+    fig = px.histogram(lt.astype("float64"), nbins=30, labels={"value": "Lead time (dias)"})
+    fig.update_layout(template=TEMPLATE, height=380, margin=MARGIN)
+    return fig
+
+
+def px_conversion(summary):
+    total_scope = summary.total_kg
+    reached = list(summary.reached_kg.values())
+    stages = ["Total→Prep", "Prep→Mont", "Mont→Sold", "Sold→Acab", "Acab→Pint", "Pint→Exped"]
+    denom = [total_scope] + reached[:-1]
+    conv = [(n / d) if d > 0 else 0.0 for n, d in zip(reached, denom)]
+    fig = px.bar(x=stages, y=[c * 100 for c in conv], labels={"x": "Etapa", "y": "Conversão (%)"})
+    fig.update_layout(template=TEMPLATE, height=380, margin=MARGIN)
+    fig.update_yaxes(range=[0, 105])
+    return fig
+
+
+# ---- Comparação ----
+
+def _plain(obj):
+    """
+    JSON do plotly -> valores simples (arrays tipados decodificados,
+    datas como "AAAA-MM-DD", floats arredondados).
+    """
+    if isinstance(obj, dict) and "bdata" in obj:
+        return _plain(np.frombuffer(base64.b64decode(obj["bdata"]), dtype=obj["dtype"]).tolist())
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    if isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        # Precisão com que as figuras vão para o navegador
+        return round(float(obj), FIGURE_DECIMALS)
+    if isinstance(obj, str) and len(obj) == 19 and obj.endswith("T00:00:00"):
+        return obj[:10]
+    return obj
+
+
+def _traces(fig) -> list:
+    fig = fig.to_plotly_json() if hasattr(fig, "to_plotly_json") else fig
+    return _plain(json.loads(to_json_plotly({"data": fig["data"]}))["data"])
+
+
+def check(df):
+    for granularity, freq in PERIOD_FREQ.items():
+        for old, new in zip(period_kg(df, freq), timeseries_kg(df, granularity)):
+            if not (np.array_equal(old.index.to_numpy(), new.index.to_numpy())
+                    and np.allclose(old.to_numpy(), new.to_numpy())):
+                raise AssertionError(f"Série por {granularity} diverge do to_period")
+
+    summary = compute_stage_summary(df)
+    weekly, by_os = period_kg(df), os_totals(df)
+    pairs = {
+        "funil": (px_funnel(summary), build_funnel_fig(None, TEMPLATE, summary)),
+        "wip": (px_wip(summary), build_wip_stage_fig(None, TEMPLATE, summary)),
+        "série semanal": (px_timeseries(weekly), build_timeseries_fig(None, TEMPLATE, timeseries_kg(df))),
+        "top OS": (px_top_os(by_os), build_top_os_fig(None, TEMPLATE, by_os)),
+        "conversão": (px_conversion(summary), build_conversion_fig(None, TEMPLATE, summary)),
+    }
+    for name, (old, new) in pairs.items():
+        if _traces(old) != _traces(new):
+            raise AssertionError(f"Traces divergentes em '{name}'")
+
+    lt = df["leadtime_dias"].to_numpy(dtype="float64", na_value=np.nan)
+    lt = lt[(lt >= 0) & (lt <= 3650)]
+    trace = build_leadtime_fig(df, TEMPLATE)["data"][0]
+    xbins = trace["xbins"]
+    if len(lt):
+        edges = np.arange(xbins["start"], xbins["end"] + xbins["size"] / 2, xbins["size"])
+        if trace["y"] != np.histogram(lt, bins=edges)[0].astype("float64").tolist() or sum(trace["y"]) != len(lt):
+            raise AssertionError("Histograma de lead time não conta todas as linhas")
+
+
+# ---- Tempo ----
+
+def _best(fn, repeat=5):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(name, df):
+    check(df)
+    print(f"\n{name} — {len(df):,} linhas: série a partir das linhas (ms)")
+    print(f"{'período':<14} {'to_period':>10} {'dias':>8} {'ganho':>7}")
+    for granularity, freq in PERIOD_FREQ.items():
+        t_old, _ = _best(lambda: period_kg(df, freq))
+        t_new, _ = _best(lambda: timeseries_kg(df, granularity))
+        print(f"{GRANULARITIES[granularity]:<14} {t_old * 1000:>10.2f} {t_new * 1000:>8.2f} {t_old / t_new:>6.1f}x")
+
+    summary = compute_stage_summary(df)
+    weekly, by_os = timeseries_kg(df), os_totals(df)
+    figures = [
+        ("funil", lambda: px_funnel(summary), lambda: build_funnel_fig(None, TEMPLATE, summary)),
+        ("wip", lambda: px_wip(summary), lambda: build_wip_stage_fig(None, TEMPLATE, summary)),
+        ("série semanal", lambda: px_timeseries(weekly), lambda: build_timeseries_fig(None, TEMPLATE, weekly)),
+        ("top OS", lambda: px_top_os(by_os), lambda: build_top_os_fig(None, TEMPLATE, by_os)),
+        ("lead time", lambda: px_leadtime(df), lambda: build_leadtime_fig(df, TEMPLATE)),
+        ("conversão", lambda: px_conversion(summary), lambda: build_conversion_fig(None, TEMPLATE, summary)),
+    ]
+
+    print(f"\n{name} — {len(df):,} linhas (montar + serializar, ms)")
+    print(f"{'figura':<14} {'px':>8} {'dict':>8} {'cache':>8} {'ganho':>7} {'KB px':>8} {'KB dict':>8}")
+    for fig_name, old, new in figures:
+        t_px, payload_px = _best(lambda: to_json_plotly(old()))
+
+        def cold():
+            charts.FIGURES.clear()
+            return to_json_plotly(new())
+
+        t_dict, payload = _best(cold)
+        t_cache, _ = _best(lambda: to_json_plotly(new()))
+        print(f"{fig_name:<14} {t_px * 1000:>8.2f} {t_dict * 1000:>8.2f} {t_cache * 1000:>8.2f} "
+              f"{t_px / t_cache:>6.1f}x {len(payload_px) / 1024:>8.1f} {len(payload) / 1024:>8.1f}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--excel", help="também mede a planilha real")
+    args = p.parse_args()
+
+    if args.excel:
+        run(args.excel, prepare_df(load_excel_local(args.excel)))
+    for n in args.sizes:
+        run("sintética", prepare_df(make_raw_df(n)))
+
+
+if __name__ == "__main__":
+    main()
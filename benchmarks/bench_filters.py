@@ -0,0 +1,98 @@
+"""
+apply_filters: versão original (cópias encadeadas) vs FilterIndex.
+- Confere que as duas versões retornam as mesmas linhas
+- Mede o tempo por chamada em filtros representativos
+- Simula a digitação no "Desenho PAI contém" (uma busca por tecla)
+
+Uso:
+    python -m benchmarks.bench_filters [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import time
+
+from benchmarks.synthetic import make_raw_df
+from src.data import prepare_df, apply_filters
+from src.index import FilterIndex
+
+
+def filter_mixes(df):
+    """
+    Combinações típicas de filtro (nome, kwargs de apply_filters).
+    """
+    cliente = df["cliente"].iloc[0]
+    os_vals = list(df["os_cliente"].drop_duplicates().iloc[:3])
+    tags = list(df["tag"].drop_duplicates().iloc[:20])
+    desenho = str(df["desenho_pai"].iloc[len(df) // 2])[:5]
+    base = dict(clientes=[], os_values=[], tag_values=[], situacoes=[],
+                dt_receb_range=[None, None], dt_exped_range=[None, None], desenho_text="")
+    return [
+        ("sem filtro", base),
+        ("cliente", {**base, "clientes": [cliente]}),
+        ("cliente+OS", {**base, "clientes": [cliente], "os_values": os_vals}),
+        ("TAGs", {**base, "tag_values": tags}),
+        ("situação+receb", {**base, "situacoes": ["LIBERADO"], "dt_receb_range": ["2024-03-01", "2024-09-30"]}),
+        ("exped (aberto)", {**base, "dt_exped_range": ["2025-01-01", None]}),
+        ("desenho contém", {**base, "desenho_text": desenho}),
+        ("tudo", {**base, "clientes": [cliente], "situacoes": ["LIBERADO"],
+                  "dt_receb_range": ["2024-01-01", "2025-06-30"], "desenho_text": desenho[:3]}),
+    ]
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run_typing(df, index):
+    """
+    Busca a cada tecla: a versão original reescaneia a coluna toda;
+    o índice refina o resultado do prefixo anterior.
+    """
+    text = str(df["desenho_pai"].iloc[len(df) // 3])
+    t_build, _ = _best(lambda: index.desenho, 1)
+    print(f"construção do índice de substring: {t_build * 1000:.1f} ms")
+    print(f"{'digitado':<18} {'linhas':>9} {'original (ms)':>14} {'índice (ms)':>12}")
+    for k in range(1, len(text) + 1):
+        q = text[:k]
+        t0 = time.perf_counter()
+        old = df["desenho_pai"].str.lower().str.contains(q, regex=False, na=False)
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        pos = index.desenho.match_rows(q)
+        t_new = time.perf_counter() - t0
+        if int(old.sum()) != len(pos):
+            raise AssertionError(f"Busca divergente para '{q}'")
+        print(f"{q:<18} {len(pos):>9,} {t_old * 1000:>14.2f} {t_new * 1000:>12.3f}")
+
+
+def run(sizes, repeat):
+    for n in sizes:
+        df = prepare_df(make_raw_df(n))
+        t_idx_build, index = _best(lambda: FilterIndex(df), 1)
+        print(f"\n{n:,} linhas — construção do índice: {t_idx_build * 1000:.1f} ms")
+        print(f"{'filtro':<18} {'linhas':>9} {'original (ms)':>14} {'índice (ms)':>12} {'ganho':>7}")
+        for name, kw in filter_mixes(df):
+            t_old, old = _best(lambda: apply_filters(df, **kw), repeat)
+            t_new, new = _best(lambda: apply_filters(df, index=index, **kw), repeat)
+            if not old.index.equals(new.index):
+                raise AssertionError(f"Linhas divergentes no filtro '{name}' ({n} linhas)")
+            print(f"{name:<18} {len(new):>9,} {t_old * 1000:>14.2f} {t_new * 1000:>12.2f} {t_old / t_new:>6.1f}x")
+        print()
+        run_typing(df, FilterIndex(df))
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--repeat", type=int, default=5)
+    args = p.parse_args()
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Leitura da planilha: pd.read_excel + prepare_df vs streaming (src.ingest).
+- Confere que as duas leituras geram a mesma base preparada
+- Mede tempo e pico de memória (RSS) de cada uma, em processos separados
+
+Uso:
+    python -m benchmarks.bench_ingest [--sizes 50000 200000] [--excel CONSOLIDADO_Avanco_Fisico_2026.xlsx]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_raw_df, write_workbook
+from src.data import DATASET_COLUMNS, load_excel_local, prepare_df
+from src.ingest import load_prepared_stream
+
+
+def _load_original(path):
+    return prepare_df(load_excel_local(path))[DATASET_COLUMNS]
+
+
+def _load_stream(path):
+    return load_prepared_stream(path)[DATASET_COLUMNS]
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(fn, path, queue):
+    start_kb = _status_kb("VmRSS")
+    t0 = time.perf_counter()
+    df = fn(path)
+    elapsed = time.perf_counter() - t0
+    peak_mb = (_status_kb("VmHWM") - start_kb) / 1024
+    queue.put((elapsed, peak_mb, df.memory_usage(deep=True).sum() / 1e6))
+
+
+def measure(fn, path):
+    """
+    (segundos, pico de RSS acima do processo ocioso em MB, tamanho da base
+    em MB) num processo novo.
+    """
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(fn, path, queue))
+    proc.start()
+    out = queue.get()
+    proc.join()
+    return out
+
+
+def run(name, path):
+    pd.testing.assert_frame_equal(_load_stream(path), _load_original(path))
+    print(f"\n{name} — bases idênticas: ok")
+    print(f"{'leitura':<12} {'tempo (s)':>10} {'pico extra (MB)':>16} {'base (MB)':>10}")
+    for label, fn in (("original", _load_original), ("streaming", _load_stream)):
+        t, peak, size = measure(fn, path)
+        print(f"{label:<12} {t:>10.2f} {peak:>16.1f} {size:>10.1f}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="*", default=[50_000, 200_000])
+    p.add_argument("--excel", help="também mede a planilha real")
+    args = p.parse_args()
+
+    if args.excel:
+        run(args.excel, args.excel)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = os.path.join(tmp, f"sintetica_{n}.xlsx")
+            write_workbook(make_raw_df(n), path)
+            run(f"sintética ({n:,} linhas)", path)
+
+
+if __name__ == "__main__":
+    main()
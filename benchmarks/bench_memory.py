@@ -0,0 +1,61 @@
+"""
+Modo compacto da base preparada (data.compact_df):
+- Relatório de memória por coluna (antes/depois)
+- Confere que KPIs, funil e insights não mudam com a compactação
+
+Uso:
+    python -m benchmarks.bench_memory [--sizes 100000 1000000] [--excel CONSOLIDADO_Avanco_Fisico_2026.xlsx]
+"""
+
+import argparse
+
+import pandas as pd
+
+from benchmarks.synthetic import make_raw_df
+from src.data import DATASET_COLUMNS, compact_df, load_excel_local, memory_report, prepare_df
+from src.insights import build_insights, compute_kpis
+from src.summary import compute_stage_summary
+
+
+def check_kpis(full: pd.DataFrame, compact: pd.DataFrame):
+    """
+    KPIs exibidos (texto formatado) idênticos nas duas representações.
+    """
+    if str(compute_kpis(full)) != str(compute_kpis(compact)):
+        raise AssertionError("KPIs divergentes no modo compacto")
+    if str(build_insights(full)) != str(build_insights(compact)):
+        raise AssertionError("Insights divergentes no modo compacto")
+    a, b = compute_stage_summary(full), compute_stage_summary(compact)
+    for label, kg in a.funnel().items():
+        if round(kg) != round(b.funnel()[label]):
+            raise AssertionError(f"Funil divergente em '{label}'")
+
+
+def run(name: str, full: pd.DataFrame):
+    full = full[DATASET_COLUMNS]
+    compact = compact_df(full)
+    rep = memory_report(full, compact)
+
+    print(f"\n{name} — {len(full):,} linhas")
+    with pd.option_context("display.width", 140, "display.max_columns", 10):
+        print((rep.assign(antes=rep["antes"] / 1e6, depois=rep["depois"] / 1e6)
+                  .rename(columns={"antes": "antes (MB)", "depois": "depois (MB)"})
+                  .round(3)))
+    check_kpis(full, compact)
+    print("KPIs, funil e insights idênticos: ok")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="*", default=[100_000, 1_000_000])
+    p.add_argument("--excel", help="também mede a planilha real")
+    args = p.parse_args()
+
+    if args.excel:
+        run(args.excel, prepare_df(load_excel_local(args.excel)))
+    for n in args.sizes:
+        run("sintética", prepare_df(make_raw_df(n)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Várias planilhas numa base só (src.sources.load_sources):
+- Leitura a frio com 1 processo vs um processo por núcleo
+- Leitura a quente (todos os caches válidos)
+- Uma planilha alterada: só ela é lida de novo
+- Confere que a base junta bate com prepare_df de cada planilha
+
+Uso:
+    python -m benchmarks.bench_sources [--files 8] [--rows 20000]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_raw_df, write_workbook
+from src.data import DATASET_COLUMNS, prepare_df
+from src.sources import CONSOLIDATED_NAME, load_sources, resolve_workbooks
+from src.disk_cache import CACHE_DIRNAME
+
+
+def _timed(label, fn):
+    t0 = time.perf_counter()
+    df, info = fn()
+    print(f"{label:<30} {time.perf_counter() - t0:>8.2f} s   {info['parsed']:>3} planilha(s) lida(s)")
+    return df
+
+
+def check_merged(df, raws, names):
+    expected = pd.concat([prepare_df(raw)[DATASET_COLUMNS] for raw in raws], ignore_index=True)
+    # Texto vindo do cache é categórica (códigos + vocabulário): compara o texto
+    got = df[DATASET_COLUMNS].copy()
+    for c in got.columns:
+        if isinstance(got[c].dtype, pd.CategoricalDtype) and not isinstance(expected[c].dtype, pd.CategoricalDtype):
+            got[c] = got[c].astype(expected[c].dtype)
+    pd.testing.assert_frame_equal(got, expected)
+    if df["arquivo"].astype(str).tolist() != [n for n, raw in zip(names, raws) for _ in range(len(raw))]:
+        raise AssertionError("Coluna 'arquivo' divergente")
+
+
+def run(n_files, n_rows):
+    tmp = tempfile.mkdtemp()
+    try:
+        raws, names = [], []
+        for i in range(n_files):
+            raw = make_raw_df(n_rows, seed=i)
+            name = f"cliente_{i:02d}.xlsx"
+            write_workbook(raw, os.path.join(tmp, name))
+            raws.append(raw)
+            names.append(name)
+        print(f"{n_files} planilhas x {n_rows:,} linhas, {os.cpu_count()} núcleos\n")
+
+        _timed("a frio, 1 processo", lambda: load_sources(tmp, max_workers=1))
+        shutil.rmtree(os.path.join(tmp, CACHE_DIRNAME))
+        df = _timed("a frio, paralelo", lambda: load_sources(tmp))
+        check_merged(df, raws, names)
+        print("base junta idêntica a prepare_df por planilha: ok\n")
+
+        _timed("a quente (cache junto)", lambda: load_sources(tmp, mmap=True))
+        shutil.rmtree(os.path.join(tmp, CACHE_DIRNAME, CONSOLIDATED_NAME))
+        _timed("a quente (caches por arquivo)", lambda: load_sources(tmp))
+
+        first = resolve_workbooks(tmp)[0]
+        write_workbook(raws[0].iloc[: n_rows // 2], first)
+        raws[0] = raws[0].iloc[: n_rows // 2]
+        df = _timed("1 planilha alterada", lambda: load_sources(tmp))
+        check_merged(df, raws, names)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--files", type=int, default=8)
+    p.add_argument("--rows", type=int, default=20_000)
+    args = p.parse_args()
+    run(args.files, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Etapa atual: classify_stages (vetorizado) vs stage_of_row (linha a linha).
+- Confere rótulos idênticos nas duas versões
+- Mede o tempo em bases sintéticas de 10k / 100k / 1M linhas
+
+Uso:
+    python -m benchmarks.bench_stages [--sizes 10000 100000 1000000] [--rowwise-max 100000]
+"""
+
+import argparse
+import time
+
+from benchmarks.synthetic import make_raw_df
+from src.data import prepare_df, classify_stages, stage_of_row
+
+
+def _timeit(fn, repeat=3):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(sizes, rowwise_max):
+    print(f"{'linhas':>10} {'vetorizado (s)':>15} {'linha a linha (s)':>18} {'ganho':>8}")
+    for n in sizes:
+        df = prepare_df(make_raw_df(n))
+        t_vec, vec = _timeit(lambda: classify_stages(df))
+
+        if n <= rowwise_max:
+            t_row, row = _timeit(lambda: df.apply(stage_of_row, axis=1), repeat=1)
+            if not (vec.astype(str) == row.to_numpy(dtype=str)).all():
+                raise AssertionError(f"Rótulos divergentes em {n} linhas")
+            print(f"{n:>10,} {t_vec:>15.4f} {t_row:>18.4f} {t_row / t_vec:>7.0f}x")
+        else:
+            print(f"{n:>10,} {t_vec:>15.4f} {'-':>18} {'-':>8}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--rowwise-max", type=int, default=1_000_000,
+                   help="maior base em que a versão linha a linha também roda")
+    args = p.parse_args()
+    run(args.sizes, args.rowwise_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Tempo de subida do servidor (como no despertar do Render):
+- Sobe o servidor num processo novo (gunicorn por padrão, ou o servidor
+  Flask do próprio app) e mede o tempo até o primeiro byte de "/" e do
+  layout (/_dash-layout)
+- Espera a base ficar pronta e lê as fases do relatório de subida
+  (startup_seconds{phase} no /metrics: imports, layout, load, prepare)
+- A planilha é copiada para uma pasta temporária: a 1ª rodada sobe sem
+  cache em disco (lê o Excel), as seguintes já com o cache
+
+Uso:
+    python -m benchmarks.coldstart [--runs 3] [--server gunicorn|flask] [--workbook planilha.xlsx]
+"""
+
+import argparse
+import http.client
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+WORKBOOK = ROOT / "CONSOLIDADO_Avanco_Fisico_2026.xlsx"
+PHASE_RE = re.compile(r'^dashboard_startup_seconds\{phase="([^"]+)"\} ([0-9.e+-]+)$', re.M)
+
+
+def _get(port: int, path: str, timeout: float = 5.0) -> tuple[int, bytes]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def _wait_first_byte(port: int, path: str, t0: float, deadline: float) -> float | None:
+    while time.perf_counter() < deadline:
+        try:
+            status, _ = _get(port, path)
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.01)
+            continue
+        if status == 200:
+            return time.perf_counter() - t0
+    return None
+
+
+def _server_cmd(server: str, port: int) -> list[str]:
+    if server == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+                "app:server"]
+    return [sys.executable, "-c", f"from app import server; server.run(port={port})"]
+
+
+def run_once(server: str, port: int, data_source: Path, timeout: float) -> dict:
+    """
+    Uma subida: tempos até o primeiro byte e fases do relatório de subida.
+    """
+    env = {**os.environ, "DATA_SOURCE": str(data_source), "RELOAD_INTERVAL_S": "0", "PORT": str(port)}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(_server_cmd(server, port), cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = t0 + timeout
+    try:
+        out = {
+            "ttfb_s": _wait_first_byte(port, "/", t0, deadline),
+            "layout_s": _wait_first_byte(port, "/_dash-layout", t0, deadline),
+        }
+        phases = {}
+        while time.perf_counter() < deadline:
+            _, body = _get(port, "/metrics")
+            phases = {name: float(v) for name, v in PHASE_RE.findall(body.decode("utf-8"))}
+            if "prepare" in phases:
+                break
+            time.sleep(0.05)
+        out["data_ready_s"] = time.perf_counter() - t0 if "prepare" in phases else None
+        out["phases"] = phases
+        return out
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def _fmt(secs: float | None) -> str:
+    return "   —   " if secs is None else f"{secs:7.2f}"
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--server", choices=["gunicorn", "flask"], default="gunicorn")
+    p.add_argument("--workbook", default=str(WORKBOOK))
+    p.add_argument("--port", type=int, default=8091)
+    p.add_argument("--timeout", type=float, default=120.0, help="segundos por subida")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_source = Path(tmp) / Path(args.workbook).name
+        shutil.copy2(args.workbook, data_source)
+
+        print(f"{'rodada':<14} {'1º byte':>7} {'layout':>7} {'base':>7}   fases (s)")
+        for i in range(args.runs):
+            r = run_once(args.server, args.port, data_source, args.timeout)
+            label = f"{i + 1} ({'sem cache' if i == 0 else 'cache'})"
+            phases = "  ".join(f"{k} {v:.2f}" for k, v in r["phases"].items())
+            print(f"{label:<14} {_fmt(r['ttfb_s'])} {_fmt(r['layout_s'])} {_fmt(r['data_ready_s'])}   {phases}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Teste de carga pela API HTTP dos callbacks do Dash (/_dash-update-component):
+- Cada usuário virtual repete sequências realistas de interação: abrir a
+  página, escolher cliente/OS/TAG/situação, buscar OS/TAG pelo texto,
+  intervalos de data, digitar o desenho, alternar o tema, trocar a
+  granularidade da série temporal e limpar os filtros
+- Cada mudança de filtro dispara o que o navegador dispararia: as opções
+  em cascata dos dropdowns (quando muda um deles), o estado
+  novo dos filtros (store-filter-seq), o filtro (store-filtered) e depois
+  KPIs, os seis gráficos, insights e tabela
+- Digitação do desenho: o campo só envia depois de uma pausa, então cada
+  trecho digitado sem pausa vira uma requisição; --per-keystroke manda
+  uma por tecla (pior caso, sem debounce)
+- Roda contra o servidor Flask no próprio processo (padrão) ou contra um
+  servidor local (--url, ex.: gunicorn)
+- Relatório por callback: vazão, latência p50/p95/p99 e tamanho das respostas
+  (bytes no fio: pede gzip, como o navegador)
+
+Uso:
+    python -m benchmarks.loadtest [--users 4] [--duration 30] [--per-keystroke]
+    gunicorn -c gunicorn.conf.py app:server &
+    python -m benchmarks.loadtest --url http://127.0.0.1:8050 --users 8 --duration 60 [--json carga.json]
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import random
+import string
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+UPDATE_PATH = "/_dash-update-component"
+ACCEPT_ENCODING = {"Accept-Encoding": "gzip"}
+
+PANELS = [
+    ("kpis", "kpi-grid.children"),
+    ("g-funnel", "g-funnel.figure"),
+    ("g-wip-stage", "g-wip-stage.figure"),
+    ("g-timeseries", "g-timeseries.figure"),
+    ("g-top-os", "g-top-os.figure"),
+    ("g-leadtime", "g-leadtime.figure"),
+    ("g-conv", "g-conv.figure"),
+    ("insights", "insights.children"),
+    ("table", "..tbl.data..."),
+]
+
+# Peso de cada tipo de interação na sequência de um usuário
+ACTIONS = {
+    "cliente": 3,
+    "os": 2,
+    "tag": 1,
+    "situacao": 1,
+    "datas": 2,
+    "desenho": 2,
+    "busca": 2,
+    "tema": 1,
+    "granularidade": 1,
+    "limpar": 1,
+}
+
+
+# ---- Clientes HTTP ----
+
+def _decoded(data: bytes, encoding: str | None) -> bytes:
+    return gzip.decompress(data) if encoding == "gzip" else data
+
+
+class InProcessClient:
+    """
+    Servidor Flask do app no próprio processo (test_client por thread).
+    """
+
+    def __init__(self, server):
+        self._client = server.test_client()
+
+    def get_json(self, path):
+        return self._client.get(path).get_json()
+
+    def post(self, path, body) -> tuple[int, bytes, int]:
+        r = self._client.post(path, json=body, headers=ACCEPT_ENCODING)
+        data = r.get_data()
+        return r.status_code, _decoded(data, r.headers.get("Content-Encoding")), len(data)
+
+
+class HttpClient:
+    """
+    Servidor local via HTTP (conexão keep-alive por usuário).
+    """
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self._conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+        self._prefix = parts.path.rstrip("/")
+
+    def _request(self, method, path, body=None) -> tuple[int, bytes, int]:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        payload = json.dumps(body).encode() if body is not None else None
+        try:
+            self._conn.request(method, self._prefix + path, body=payload, headers={**headers, **ACCEPT_ENCODING})
+            r = self._conn.getresponse()
+            data = r.read()
+            return r.status, _decoded(data, r.getheader("Content-Encoding")), len(data)
+        except (http.client.HTTPException, OSError):
+            self._conn.close()
+            raise
+
+    def get_json(self, path):
+        return json.loads(self._request("GET", path)[1])
+
+    def post(self, path, body) -> tuple[int, bytes, int]:
+        return self._request("POST", path, body)
+
+
+# ---- Callbacks ----
+
+class Callbacks:
+    """
+    Monta o corpo das requisições a partir de /_dash-dependencies.
+    """
+
+    def __init__(self, deps: list[dict]):
+        self.deps = deps
+
+    def find(self, output_prefix: str, duplicate: bool = False) -> dict:
+        """
+        Callback cuja saída começa com output_prefix; duplicate=True pega o
+        de saídas allow_duplicate (com "@" no id).
+        """
+        for d in self.deps:
+            if d["output"].startswith(output_prefix) and ("@" in d["output"]) == duplicate:
+                return d
+        raise KeyError(output_prefix)
+
+    def body(self, output_prefix: str, values: dict, changed: list[str], duplicate: bool = False) -> dict:
+        dep = self.find(output_prefix, duplicate)
+        body = {"output": dep["output"], "outputs": None, "inputs": [], "state": [], "changedPropIds": changed}
+        for key in ("inputs", "state"):
+            for item in dep[key]:
+                prop = f'{item["id"]}.{item["property"]}'
+                body[key].append({"id": item["id"], "property": item["property"], "value": values.get(prop)})
+        return body
+
+
+class Stats:
+    """
+    Latência e tamanho de cada resposta, por callback (thread-safe).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.size = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.interactions = 0
+
+    def record(self, name, seconds, size, ok):
+        with self._lock:
+            if ok:
+                self.latency[name].append(seconds)
+                self.size[name].append(size)
+            else:
+                self.errors[name] += 1
+
+    def interaction(self):
+        with self._lock:
+            self.interactions += 1
+
+    def report(self, elapsed: float) -> dict:
+        out = {}
+        for name in sorted(set(self.latency) | set(self.errors)):
+            lat = np.array(self.latency.get(name, []), dtype="float64") * 1000
+            size = np.array(self.size.get(name, []), dtype="float64")
+            out[name] = {
+                "requests": int(len(lat)),
+                "errors": int(self.errors.get(name, 0)),
+                "rps": len(lat) / elapsed if elapsed else 0.0,
+                "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+                "p95_ms": float(np.percentile(lat, 95)) if len(lat) else None,
+                "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+                "mean_bytes": float(size.mean()) if len(size) else None,
+            }
+        return out
+
+
+# ---- Usuário virtual ----
+
+class VirtualUser:
+    """
+    Um planejador usando o dashboard: estado dos filtros + sequência de
+    interações sorteadas com semente fixa.
+    """
+
+    def __init__(self, client, callbacks: Callbacks, stats: Stats, seed: int, per_keystroke: bool = False):
+        self.client = client
+        self.cb = callbacks
+        self.stats = stats
+        self.rng = random.Random(seed)
+        self.per_keystroke = per_keystroke
+        self.session = f"loadtest-{seed}"
+        self.seq = 0
+        self.values = {}
+        self.options = {}
+
+    def call(self, name: str, output_prefix: str, changed: list[str], duplicate: bool = False) -> dict | None:
+        body = self.cb.body(output_prefix, self.values, changed, duplicate)
+        t0 = time.perf_counter()
+        try:
+            status, data, wire = self.client.post(UPDATE_PATH, body)
+        except (OSError, http.client.HTTPException):
+            status, data, wire = 0, b"", 0
+        elapsed = time.perf_counter() - t0
+        # 204 = PreventUpdate (sem resposta)
+        ok = status in (200, 204)
+        self.stats.record(name, elapsed, wire, ok)
+        if status != 200:
+            return None
+        return json.loads(data).get("response", {})
+
+    # Abertura da página
+    def open_page(self):
+        self.values = {"page-load.n_intervals": 1, "store-theme.data": "light", "toggle-theme.value": [],
+                       "f-desenho.value": "", "ts-granularity.value": "semana",
+                       "tbl.page_current": 0, "tbl.page_size": 12, "tbl.sort_by": [], "tbl.filter_query": ""}
+        # Como o page-load: repete enquanto o servidor carrega a base
+        while True:
+            resp = self.call("init_data", "..store-df.data", ["page-load.n_intervals"])
+            if not resp or resp.get("page-load", {}).get("disabled", True):
+                break
+            self.values["page-load.n_intervals"] += 1
+            time.sleep(0.5)
+        self.values["store-df.data"] = (resp or {}).get("store-df", {}).get("data")
+
+        resp = self.call("init_filters", "..f-dt-receb.min_date_allowed", ["store-df.data"]) or {}
+        for comp in ("f-dt-receb", "f-dt-exped"):
+            props = resp.get(comp, {})
+            self.options[comp] = (props.get("min_date_allowed"), props.get("max_date_allowed"))
+        self.update_options(["store-df.data"])
+        self.refresh()
+
+    def update_options(self, changed: list[str]):
+        """
+        Opções em cascata dos dropdowns (só escolhe entre as oferecidas).
+        """
+        resp = self.call("filter_options", "..f-cliente.options", changed) or {}
+        for comp in ("f-cliente", "f-os", "f-tag", "f-situacao"):
+            if comp in resp:
+                opts = resp[comp].get("options") or []
+                self.options[comp] = [o["value"] if isinstance(o, dict) else o for o in opts
+                                      if not (isinstance(o, dict) and o.get("disabled"))]
+
+    def refresh(self):
+        """
+        Estado novo dos filtros: filtro + todos os painéis que dependem do recorte.
+        """
+        self.stats.interaction()
+        self.seq += 1
+        self.values["store-filter-seq.data"] = {"session": self.session, "seq": self.seq}
+        resp = self.call("filter", "store-filtered.data", ["store-filter-seq.data"]) or {}
+        self.values["store-filtered.data"] = resp.get("store-filtered", {}).get("data")
+        self.values["tbl.page_current"] = 0
+        for name, prefix in PANELS:
+            self.call(name, prefix, ["store-filtered.data"])
+
+    def _pick(self, comp: str, k_max: int) -> list:
+        opts = self.options.get(comp) or []
+        return self.rng.sample(opts, self.rng.randint(1, min(k_max, len(opts)))) if opts else []
+
+    def _date_range(self, comp: str) -> tuple:
+        lo, hi = self.options.get(comp) or (None, None)
+        if not lo or not hi:
+            return None, None
+        lo, hi = np.datetime64(lo[:10]), np.datetime64(hi[:10])
+        days = int((hi - lo) / np.timedelta64(1, "D"))
+        start = lo + np.timedelta64(self.rng.randint(0, max(0, days)), "D")
+        end = start + np.timedelta64(self.rng.randint(7, 120), "D")
+        return str(start), str(min(end, hi))
+
+    def act(self):
+        action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        if action in ("cliente", "os", "tag", "situacao"):
+            comp = {"cliente": "f-cliente", "os": "f-os", "tag": "f-tag", "situacao": "f-situacao"}[action]
+            self.values[f"{comp}.value"] = self._pick(comp, {"tag": 5}.get(action, 2))
+            self.update_options([f"{comp}.value"])
+            self.refresh()
+        elif action == "busca":
+            # Digita no dropdown de OS/TAG (uma busca por tecla) e escolhe um resultado
+            comp = self.rng.choice(["f-os", "f-tag"])
+            text = "".join(self.rng.choices(string.digits, k=self.rng.randint(1, 3)))
+            for i in range(1, len(text) + 1):
+                self.values[f"{comp}.search_value"] = text[:i]
+                self.update_options([f"{comp}.search_value"])
+            self.values[f"{comp}.search_value"] = ""
+            picked = self._pick(comp, 1)
+            self.values[f"{comp}.value"] = sorted(set(self.values.get(f"{comp}.value") or []) | set(picked))
+            self.update_options([f"{comp}.value", f"{comp}.search_value"])
+            self.refresh()
+        elif action == "datas":
+            comp = self.rng.choice(["f-dt-receb", "f-dt-exped"])
+            start, end = self._date_range(comp)
+            self.values[f"{comp}.start_date"], self.values[f"{comp}.end_date"] = start, end
+            self.refresh()
+        elif action == "desenho":
+            text = "".join(self.rng.choices(string.digits, k=self.rng.randint(2, 5)))
+            if self.per_keystroke:
+                cuts = list(range(1, len(text) + 1))
+            else:
+                # Pausas (acima do debounce) em pontos sorteados + fim do texto
+                cuts = sorted(set(self.rng.sample(range(1, len(text)), self.rng.randint(0, 1))) | {len(text)})
+            for i in cuts:
+                self.values["f-desenho.value"] = text[:i]
+                self.refresh()
+        elif action == "granularidade":
+            # Só a série temporal refaz (dia/semana/mês do mesmo recorte)
+            current = self.values["ts-granularity.value"]
+            self.values["ts-granularity.value"] = self.rng.choice([g for g in ("dia", "semana", "mes") if g != current])
+            self.stats.interaction()
+            self.call("g-timeseries", "g-timeseries.figure", ["ts-granularity.value"])
+        elif action == "tema":
+            dark = self.values.get("store-theme.data") != "dark"
+            self.values["toggle-theme.value"] = ["dark"] if dark else []
+            self.stats.interaction()
+            resp = self.call("theme", "..store-theme.data", ["toggle-theme.value"]) or {}
+            self.values["store-theme.data"] = resp.get("store-theme", {}).get("data", "dark" if dark else "light")
+            self.call("restyle", "..g-funnel.figure", ["store-theme.data"], duplicate=True)
+        else:
+            self.stats.interaction()
+            self.call("clear", "..f-cliente.value", ["btn-clear.n_clicks"])
+            for comp in ("f-cliente", "f-os", "f-tag", "f-situacao"):
+                self.values[f"{comp}.value"] = []
+            for comp in ("f-dt-receb", "f-dt-exped"):
+                self.values[f"{comp}.start_date"] = self.values[f"{comp}.end_date"] = None
+            self.values["f-desenho.value"] = ""
+            self.update_options([f"{comp}.value" for comp in ("f-cliente", "f-os", "f-tag", "f-situacao")])
+            self.refresh()
+
+    def run(self, deadline: float):
+        self.open_page()
+        while time.perf_counter() < deadline:
+            self.act()
+
+
+def run_load(make_client, users: int, duration: float, seed: int,
+             per_keystroke: bool = False) -> tuple[dict, float, int]:
+    callbacks = Callbacks(make_client().get_json("/_dash-dependencies"))
+    stats = Stats()
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        VirtualUser(make_client(), callbacks, stats, seed + i, per_keystroke).run(deadline)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return stats.report(elapsed), elapsed, stats.interactions
+
+
+def print_report(report: dict, elapsed: float, interactions: int, users: int):
+    total = sum(r["requests"] for r in report.values())
+    print(f"\n{users} usuários, {elapsed:.1f}s: {interactions:,} interações "
+          f"({interactions / elapsed:.1f}/s), {total:,} requisições ({total / elapsed:.1f}/s)")
+    print(f"{'callback':<14} {'req':>7} {'erros':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'KB médio':>9}")
+    for name, r in report.items():
+        if not r["requests"]:
+            print(f"{name:<14} {0:>7} {r['errors']:>6}")
+            continue
+        print(f"{name:<14} {r['requests']:>7,} {r['errors']:>6} {r['rps']:>7.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['mean_bytes'] / 1024:>9.1f}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--url", help="servidor local (ex.: http://127.0.0.1:8050); sem ele, roda no próprio processo")
+    p.add_argument("--users", type=int, default=4)
+    p.add_argument("--duration", type=float, default=30.0, help="segundos")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--per-keystroke", action="store_true",
+                   help="uma requisição por tecla no desenho (como sem debounce)")
+    p.add_argument("--json", help="grava o relatório em JSON")
+    args = p.parse_args()
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+    else:
+        from app import server
+
+        def make_client():
+            return InProcessClient(server)
+
+    report, elapsed, interactions = run_load(make_client, args.users, args.duration, args.seed,
+                                             args.per_keystroke)
+    print_report(report, elapsed, interactions, args.users)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"users": args.users, "duration_s": elapsed, "interactions": interactions,
+                       "callbacks": report}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Suíte de benchmarks reprodutível (bases sintéticas com semente fixa):
+- Mede leitura da planilha (load_excel_local e leitura em streaming),
+  prepare_df, compact_df, df_to_store/df_from_store, índice, cubo e
+  mapas de co-ocorrência, opções em cascata dos filtros (e busca),
+  apply_filters nas combinações típicas de filtro (com e sem o índice),
+  cada gráfico, KPIs, insights, a página da tabela e a amostra fixa da
+  tabela (build_table_payload)
+- Grava os tempos em JSON (melhor e mediana de N repetições + ambiente)
+- Modo compare: confronta dois JSON e aponta regressões acima do limite
+  (código de saída 1 se houver alguma)
+
+Uso:
+    python -m benchmarks.suite run [--sizes 10000 100000 1000000 2000000] [--out bench.json]
+    python -m benchmarks.suite compare antes.json depois.json [--threshold 0.10]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_filters import filter_mixes
+from benchmarks.synthetic import make_raw_df, write_workbook
+from src import charts
+from src.charts import (
+    build_conversion_fig, build_funnel_fig, build_leadtime_fig, build_timeseries_fig, build_top_os_fig,
+    build_wip_stage_fig,
+)
+from src.cooccurrence import CooccurrenceIndex
+from src.cube import StageCube
+from src.data import (
+    DATASET_COLUMNS, apply_filters, compact_df, df_from_store, df_to_store, load_excel_local, prepare_df,
+)
+from src.filters import build_cascading_options
+from src.index import FilterIndex
+from src.ingest import load_prepared_stream
+from src.insights import build_insights, build_table_payload, compute_kpis
+from src.table import build_table_page, sort_positions
+
+
+TEMPLATE = "plotly_white"
+
+CHARTS = {
+    "funnel": build_funnel_fig,
+    "wip": build_wip_stage_fig,
+    "timeseries": build_timeseries_fig,
+    "top_os": build_top_os_fig,
+    "leadtime": build_leadtime_fig,
+    "conversion": build_conversion_fig,
+}
+
+
+def _measure(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "median_s": statistics.median(times), "repeat": repeat}
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_size(n: int, repeat: int, excel_max: int, store_max: int, log=print) -> list[dict]:
+    """
+    Todos os tempos para uma base sintética de n linhas.
+    """
+    results = []
+
+    def bench(name, fn, times=repeat, **extra):
+        r = {"name": name, "rows": n, **extra, **_measure(fn, times)}
+        results.append(r)
+        log(f"{n:>10,}  {name:<42} {r['best_s'] * 1000:>10.2f} ms")
+
+    raw = make_raw_df(n)
+
+    if n <= excel_max:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "CONSOLIDADO.xlsx"
+            write_workbook(raw, path)
+            # Leitura do Excel é cara: menos repetições
+            bench("load_excel_local", lambda: load_excel_local(path), times=min(repeat, 2))
+            bench("load_prepared_stream", lambda: load_prepared_stream(path), times=min(repeat, 2))
+
+    bench("prepare_df", lambda: prepare_df(raw))
+    df = prepare_df(raw)[DATASET_COLUMNS]
+    bench("compact_df", lambda: compact_df(df))
+
+    if n <= store_max:
+        payload = df_to_store(df)
+        bench("df_to_store", lambda: df_to_store(df), bytes=len(payload))
+        bench("df_from_store", lambda: df_from_store(payload))
+
+    bench("filter_index", lambda: FilterIndex(df))
+    index = FilterIndex(df)
+    bench("stage_cube", lambda: StageCube(df, index))
+    bench("cooccurrence", lambda: CooccurrenceIndex(index))
+    cooc = CooccurrenceIndex(index)
+    selected = {"cliente": [df["cliente"].iloc[0]], "os_cliente": [], "tag": [], "situacao_desenho": ["LIBERADO"]}
+    bench("filter_options[cliente+situação]", lambda: build_cascading_options(cooc, selected))
+    bench("filter_options[busca tag]", lambda: build_cascading_options(cooc, selected, search={"tag": "1"}))
+
+    for fname, kw in filter_mixes(df):
+        rows = apply_filters(df, index=index, **kw)
+        bench(f"apply_filters[{fname}]", lambda: apply_filters(df, index=index, **kw), rows_out=len(rows))
+        # Caminho sem índice (máscaras e cópias por filtro), o de antes
+        bench(f"apply_filters[{fname}, sem índice]", lambda: apply_filters(df, **kw), rows_out=len(rows))
+
+    def chart(builder):
+        # Sem o cache de figuras: mede agregação + montagem
+        charts.FIGURES.clear()
+        return builder(df, TEMPLATE)
+
+    for cname, builder in CHARTS.items():
+        bench(f"chart[{cname}]", lambda: chart(builder))
+    bench("compute_kpis", lambda: compute_kpis(df))
+    bench("build_insights", lambda: build_insights(df))
+
+    sort_by = [{"column_id": "peso_total_kg", "direction": "desc"}]
+    bench("table_page[sorted]", lambda: build_table_page(df, 0, 12, sort_positions(df, None, sort_by)))
+    bench("table_payload", lambda: build_table_payload(df))
+    return results
+
+
+# ---- Comparação ----
+
+def compare(before: dict, after: dict, threshold: float, min_delta_s: float) -> list[dict]:
+    """
+    Linhas comuns aos dois resultados com a razão depois/antes (melhor
+    tempo); regression=True quando piorou mais que o limite.
+    """
+    old = {(r["name"], r["rows"]): r for r in before["results"]}
+    rows = []
+    for r in after["results"]:
+        prev = old.get((r["name"], r["rows"]))
+        if prev is None:
+            continue
+        ratio = r["best_s"] / prev["best_s"] if prev["best_s"] > 0 else float("inf")
+        regression = ratio > 1 + threshold and (r["best_s"] - prev["best_s"]) > min_delta_s
+        rows.append({"name": r["name"], "rows": r["rows"], "before_s": prev["best_s"], "after_s": r["best_s"],
+                     "ratio": ratio, "regression": regression})
+    return rows
+
+
+def print_comparison(rows: list[dict], threshold: float):
+    print(f"{'linhas':>10}  {'etapa':<42} {'antes (ms)':>11} {'depois (ms)':>12} {'razão':>7}")
+    for r in rows:
+        flag = "  REGRESSÃO" if r["regression"] else ""
+        print(f"{r['rows']:>10,}  {r['name']:<42} {r['before_s'] * 1000:>11.2f} {r['after_s'] * 1000:>12.2f} "
+              f"{r['ratio']:>6.2f}x{flag}")
+    n_reg = sum(r["regression"] for r in rows)
+    print(f"\n{n_reg} regressão(ões) acima de {threshold:.0%} em {len(rows)} medições comparadas")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="roda a suíte e grava o JSON")
+    r.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 1_000_000])
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--excel-max", type=int, default=100_000,
+                   help="maior base gravada em .xlsx para medir a leitura da planilha")
+    r.add_argument("--store-max", type=int, default=500_000,
+                   help="maior base medida em df_to_store/df_from_store")
+    r.add_argument("--out", default="bench.json")
+
+    c = sub.add_parser("compare", help="compara dois JSON da suíte")
+    c.add_argument("before")
+    c.add_argument("after")
+    c.add_argument("--threshold", type=float, default=0.10, help="piora relativa tolerada (0.10 = 10%%)")
+    c.add_argument("--min-delta-ms", type=float, default=1.0, help="ignora diferenças absolutas menores que isso")
+
+    args = p.parse_args()
+
+    if args.cmd == "run":
+        results = []
+        for n in args.sizes:
+            results.extend(run_size(n, args.repeat, args.excel_max, args.store_max))
+        out = {"environment": environment(), "results": results}
+        Path(args.out).write_text(json.dumps(out, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResultados em {args.out}")
+        return
+
+    before = json.loads(Path(args.before).read_text(encoding="utf-8"))
+    after = json.loads(Path(args.after).read_text(encoding="utf-8"))
+    rows = compare(before, after, args.threshold, args.min_delta_ms / 1000)
+    print_comparison(rows, args.threshold)
+    sys.exit(1 if any(r["regression"] for r in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Gera bases sintéticas no formato da aba CONSOLIDADO (cabeçalhos originais).
+- Cardinalidades realistas de cliente / OS / TAG
+- Progressão de etapas monotônica (quem pintou também preparou, montou...)
+- Datas de recebimento, entrega e expedição coerentes
+"""
+
+import numpy as np
+import pandas as pd
+
+
+STAGE_COLS = [
+    "DESENHOS PREPARADOS (KG)",
+    "DESENHOS MONTADOS (KG)",
+    "DESENHOS SOLDADOS (KG)",
+    "DESENHOS ACABADOS (KG)",
+    "DESENHOS PINTADOS (KG)",
+]
+
+
+def make_raw_df(n_rows: int, seed: int = 42, n_clientes: int = 12, rows_per_os: int = 400, rows_per_tag: int = 25) -> pd.DataFrame:
+    """
+    Base "crua" com n_rows desenhos, como viria de load_excel_local.
+    """
+    rng = np.random.default_rng(seed)
+    n_os = max(1, n_rows // rows_per_os)
+    n_tag = max(1, n_rows // rows_per_tag)
+
+    os_idx = rng.integers(0, n_os, n_rows)
+    cliente_idx = os_idx % n_clientes
+    tag_idx = rng.integers(0, n_tag, n_rows)
+
+    peso = np.round(rng.gamma(2.0, 150.0, n_rows), 2)
+    # 0 = não iniciado ... 5 = pintado, 6 = expedido
+    level = rng.choice(7, n_rows, p=[0.05, 0.05, 0.06, 0.06, 0.08, 0.15, 0.55])
+
+    receb = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, n_rows), unit="D")
+    entrega = receb + pd.to_timedelta(rng.integers(20, 120, n_rows), unit="D")
+    exped = receb + pd.to_timedelta(rng.integers(5, 150, n_rows), unit="D")
+
+    df = pd.DataFrame({
+        "CLIENTE": np.char.add("CLIENTE ", cliente_idx.astype(str)),
+        "OS_CLIENTE": np.char.add("OS-", (10000 + os_idx).astype(str)),
+        "TAG": np.char.add("TAG-", (100000 + tag_idx).astype(str)),
+        "SITUAÇÃO DO DESENHO": rng.choice(["LIBERADO", "EM REVISÃO", "CANCELADO"], n_rows, p=[0.85, 0.12, 0.03]),
+        "N° DESENHO PAI": (70000000 + rng.integers(0, max(1, n_rows // 3), n_rows)).astype(str),
+        "DESCRIÇÃO DO DESENHO": rng.choice(["VIGA", "COLUNA", "CONTRAVENTAMENTO", "TERÇA", "CHAPA"], n_rows),
+        "DATA RECEBIMENTO DA GUIA": receb,
+        "DATA DE ENTREGA": entrega,
+        "DATA EXPEDIÇÃO": exped.where(level == 6),
+        "PESO TOTAL ( KG)": peso,
+        "PESO EXPEDIDO (KG)": np.where(level == 6, peso, 0.0),
+    })
+    for i, c in enumerate(STAGE_COLS):
+        df[c] = np.where(level > i, peso, 0.0)
+    return df
+
+
+def write_workbook(df: pd.DataFrame, path, sheet: str = "CONSOLIDADO"):
+    """
+    Grava a base crua numa planilha .xlsx (openpyxl write_only, linha a linha).
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(list(df.columns))
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        ws.append([v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row])
+    wb.save(path)
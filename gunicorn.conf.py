@@ -0,0 +1,49 @@
+"""
+Configuração do gunicorn (gunicorn app:server usa este arquivo sozinho):
+- preload_app: o processo mestre importa o app (dash, pandas, layout)
+  uma única vez, antes do fork
+- O mestre também carrega a base, os índices e o cubo antes do fork
+  (when_ready): os workers herdam essas páginas (copy-on-write) e já
+  sobem com a base. PRELOAD_DATASET=0: cada worker carrega a base em
+  segundo plano depois do fork e responde com o layout enquanto isso
+- A base vem mapeada do cache em disco (SHARED_DATASET), então os workers
+  dividem as mesmas páginas, sem cópia; só um deles lê a planilha quando o
+  cache não existe (cache_lock), os outros esperam e mapeiam o cache;
+  texto vai como códigos + vocabulário e os arrays por linha dos índices
+  de filtro também ficam no cache, mapeados do mesmo jeito
+- Cada worker roda a própria thread de carga/recarga
+"""
+
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+preload_app = True
+
+# Nenhuma thread no mestre antes do fork: a carga do mestre roda em
+# when_ready, sem thread, e o vigia começa nos workers
+os.environ.setdefault("DATASET_AUTOLOAD", "0")
+
+PRELOAD_DATASET = os.environ.get("PRELOAD_DATASET", "1") != "0"
+
+
+def when_ready(server):
+    # Mestre, com o app já importado e antes do primeiro fork
+    if not PRELOAD_DATASET:
+        return
+    from app import WATCHER
+    try:
+        WATCHER.load_initial()
+    except Exception:
+        # A base continua "carregando": cada worker tenta de novo
+        server.log.exception("Falha ao carregar a base no mestre")
+    finally:
+        WATCHER.progress = None
+
+
+def post_fork(server, worker):
+    # Threads não sobrevivem ao fork: o vigia da planilha (e a carga, se o
+    # mestre não carregou) começa em cada worker
+    from app import WATCHER
+    WATCHER.start()
@@ -0,0 +1,169 @@
+"""
+Cache em memória do processo:
+- Registro de datasets preparados, indexados por hash do conteúdo
+- Índices de filtro (src/index.py) por versão do dataset
+- Cubo pré-agregado (src/cube.py) por versão do dataset; numa recarga
+  incremental, os rollups da série saem do cubo da versão anterior
+- Mapas de co-ocorrência dos filtros (src/cooccurrence.py) por versão
+
+O dcc.Store guarda apenas a chave do dataset; os callbacks buscam aqui
+o DataFrame já tipado, sem serializar/deserializar a base a cada clique.
+A chave leva na frente a versão da origem (mtime das planilhas): igual em
+todos os workers e crescente a cada recarga, então dá para saber qual de
+duas chaves é a mais nova.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+from src.cooccurrence import CooccurrenceIndex
+from src.cube import StageCube
+from src.disk_cache import array_store
+from src.index import FilterIndex
+from src.lru import LRUCache
+from src.metrics import timed
+
+
+def dataset_key(df: pd.DataFrame) -> str:
+    """
+    Chave estável do dataset (hash do conteúdo + colunas).
+    Mesma base => mesma chave em qualquer worker do gunicorn.
+    """
+    h = hashlib.sha1()
+    h.update("|".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+DATASETS = LRUCache(maxsize=int(os.environ.get("DATASET_CACHE_SIZE", "4")))
+INDEXES = LRUCache(maxsize=DATASETS.maxsize)
+CUBES = LRUCache(maxsize=DATASETS.maxsize)
+COOCCURRENCE = LRUCache(maxsize=DATASETS.maxsize)
+# Versão anterior de cada dataset recarregado: (chave anterior, src de
+# data.prepare_incremental); consumida quando o cubo é montado
+LINEAGE = LRUCache(maxsize=DATASETS.maxsize)
+
+# Versão atual fica fora do LRU (nunca é descartada)
+_pinned = (None, None)
+
+# Chamado com uma chave desconhecida (ex.: versão nova que outro worker já
+# publicou no Store); pode carregá-la e registrá-la (ver src/reload.py)
+_loader = None
+
+
+def key_version(key: str | None) -> int:
+    """
+    Versão da origem embutida na chave (0 se não tiver).
+    """
+    if not key or "." not in key:
+        return 0
+    try:
+        return int(key.split(".", 1)[0], 16)
+    except ValueError:
+        return 0
+
+
+def register_dataset(df: pd.DataFrame, version: int = 0, prev: tuple | None = None) -> str:
+    """
+    Registra o DataFrame preparado e retorna a chave para o dcc.Store.
+    prev = (chave anterior, src): linhas casadas com a versão anterior.
+    """
+    key = f"{version:x}.{dataset_key(df)}" if version else dataset_key(df)
+    DATASETS.put(key, df)
+    if prev is not None and prev[0] != key:
+        LINEAGE.put(key, prev)
+    return key
+
+
+def set_dataset_loader(loader):
+    """
+    Define quem resolve chaves desconhecidas em get_dataset (loader(chave)).
+    """
+    global _loader
+    _loader = loader
+
+
+def _lookup(key: str) -> pd.DataFrame | None:
+    df = DATASETS.get(key)
+    if df is None and _pinned[0] == key:
+        df = _pinned[1]
+    return df
+
+
+def get_dataset(key: str | None) -> pd.DataFrame | None:
+    """
+    Busca o DataFrame preparado pela chave do Store (None se desconhecida).
+    Chave desconhecida passa antes pelo loader (versão que este worker
+    ainda não recarregou).
+    """
+    if not key:
+        return None
+    df = _lookup(key)
+    if df is None and _loader is not None:
+        _loader(key)
+        df = _lookup(key)
+    return df
+
+
+def pin_dataset(key: str):
+    """
+    Marca a versão atual do dataset (protegida do descarte do LRU).
+    """
+    global _pinned
+    df = get_dataset(key)
+    if df is not None:
+        _pinned = (key, df)
+
+
+def get_filter_index(key: str | None) -> FilterIndex | None:
+    """
+    Índice de filtros do dataset (construído uma vez por chave).
+    """
+    df = get_dataset(key)
+    if df is None:
+        return None
+    # Base mapeada do cache: arrays do índice também ficam no disco
+    return INDEXES.get_or_create(key, lambda: FilterIndex(df, array_store(df.attrs.get("array_store"))))
+
+
+def get_cube(key: str | None) -> StageCube | None:
+    """
+    Cubo pré-agregado do dataset (construído uma vez por chave).
+    """
+    df = get_dataset(key)
+    if df is None:
+        return None
+
+    def build():
+        prev = None
+        lineage = LINEAGE.pop(key)
+        if lineage is not None:
+            prev_key, src = lineage
+            prev_cube, prev_df = CUBES.get(prev_key), _lookup(prev_key)
+            if prev_cube is not None and prev_df is not None:
+                prev = (prev_cube, prev_df, src)
+        return StageCube(df, get_filter_index(key), prev=prev)
+
+    return CUBES.get_or_create(key, build)
+
+
+def get_cooccurrence(key: str | None) -> CooccurrenceIndex | None:
+    """
+    Mapas de co-ocorrência dos filtros do dataset (construídos uma vez por chave).
+    """
+    df = get_dataset(key)
+    if df is None:
+        return None
+    return COOCCURRENCE.get_or_create(key, lambda: CooccurrenceIndex(get_filter_index(key)))
+
+
+@timed("warm_dataset")
+def warm_dataset(key: str | None):
+    """
+    Monta índice de filtros, cubo e mapas de co-ocorrência já na carga
+    (fora das requisições).
+    """
+    get_cube(key)
+    get_cooccurrence(key)
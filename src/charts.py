@@ -1,116 +1,306 @@
 """
 Gráficos Plotly em KG.
+- As figuras são montadas direto como dicts (mesmo JSON que o
+  plotly.express gerava), sem passar por go.Figure e pela validação dele
+- Dicts prontos ficam num LRU por (gráfico, tema, hash dos agregados):
+  recortes diferentes com os mesmos números reaproveitam a figura
+- layout.template é um só dict por tema (montado uma vez), dividido por
+  todas as figuras
+- Lead time: o histograma já vai com as caixas contadas no servidor, em
+  vez de mandar um valor por linha
+- Números em JSON curto (_floats); arrays tipados (bdata) ficam de fora:
+  o plotly.js 2.25 embutido no Dash 2.16 não os lê. O grosso de cada
+  resposta é o template, que a compressão (src.compress) resolve
 """
 
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+
+from src.lru import LRUCache
+from src.summary import StageSummary, compute_stage_summary
+from src.timeseries import DEFAULT_GRANULARITY, timeseries_kg
+
+
+MARGIN = {"l": 10, "r": 10, "t": 40, "b": 10}
+BAR_COLOR = "#636efa"
+LEADTIME_BINS = 30
+# Casas decimais dos números enviados nas figuras (kg e %)
+FIGURE_DECIMALS = 2
+LEADTIME_MAX_DIAS = 3650
+
+# Figuras prontas por (gráfico, tema, hash dos agregados)
+FIGURES = LRUCache(maxsize=int(os.environ.get("FIGURE_CACHE_SIZE", "256")))
 
 
 def plot_template(theme: str) -> str:
     return "plotly_dark" if theme == "dark" else "plotly_white"
 
 
-def fig_empty(template: str, title: str):
-    fig = go.Figure()
-    fig.update_layout(template=template, title=title, height=360)
-    return fig
+@lru_cache(maxsize=None)
+def _template(template: str) -> dict:
+    # plotly.io só na primeira figura (fora do caminho de subida)
+    import plotly.io as pio
 
+    # Ida e volta pelo JSON: só tipos simples no dict
+    return json.loads(json.dumps(pio.templates[template].to_plotly_json()))
 
-def build_funnel_fig(df: pd.DataFrame, template: str):
-    reached = {
-        "Total (escopo)": df["peso_total_kg"].sum(),
-        "Preparação atingida": df.loc[df["prep_kg"] > 0, "peso_total_kg"].sum(),
-        "Montagem atingida": df.loc[df["mont_kg"] > 0, "peso_total_kg"].sum(),
-        "Solda atingida": df.loc[df["sold_kg"] > 0, "peso_total_kg"].sum(),
-        "Acabamento atingido": df.loc[df["acab_kg"] > 0, "peso_total_kg"].sum(),
-        "Pintura atingida": df.loc[df["pint_kg"] > 0, "peso_total_kg"].sum(),
-        "Expedido": df.loc[df["peso_exped_kg"] > 0, "peso_total_kg"].sum(),
-    }
-    labels = list(reached.keys())
-    values = list(reached.values())
-
-    fig = go.Figure(go.Funnel(y=labels, x=values, textinfo="value+percent initial"))
-    fig.update_layout(template=template, height=380, margin=dict(l=10, r=10, t=40, b=10))
-    return fig
-
-
-def build_wip_stage_fig(df: pd.DataFrame, template: str):
-    wip = df.groupby("etapa_atual", as_index=False)["peso_total_kg"].sum().sort_values("peso_total_kg", ascending=True)
-    fig = px.bar(
-        wip,
-        x="peso_total_kg",
-        y="etapa_atual",
-        orientation="h",
-        labels={"peso_total_kg": "KG", "etapa_atual": "Etapa"},
+
+def plotly_template_json(template: str) -> dict:
+    """
+    Template completo (dict) para trocar o tema via Patch no layout.
+    Um só dict por tema, dividido por todas as figuras: não alterar.
+    """
+    return _template(template)
+
+
+def _with_template(fig: dict, template: str) -> dict:
+    """
+    Figura + template, sem copiar os traces nem o template.
+    """
+    return {"data": fig["data"], "layout": {**fig["layout"], "template": plotly_template_json(template)}}
+
+
+def _digest(*parts) -> str:
+    payload = json.dumps(parts, default=str, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def cached_figure(kind: str, template: str, inputs: tuple, build) -> dict:
+    """
+    Figura `kind` com o tema `template` para os agregados `inputs`
+    (listas/valores simples); build(*inputs) só roda se esses números
+    ainda não viraram figura nesse tema. A figura devolvida é dividida
+    entre as respostas: não alterar.
+    """
+    return FIGURES.get_or_create(
+        (kind, template, _digest(kind, *inputs)), lambda: _with_template(build(*inputs), template)
     )
-    fig.update_layout(template=template, height=380, margin=dict(l=10, r=10, t=40, b=10))
-    return fig
 
 
-def build_timeseries_fig(df: pd.DataFrame, template: str):
-    tmp = df.copy()
-    tmp["receb_sem"] = tmp["dt_receb"].dt.to_period("W").dt.start_time
-    tmp["exped_sem"] = tmp["dt_exped"].dt.to_period("W").dt.start_time
+def figure_cache_stats() -> dict:
+    return FIGURES.stats()
+
 
-    receb = tmp.dropna(subset=["receb_sem"]).groupby("receb_sem", as_index=False)["peso_total_kg"].sum()
-    exped = tmp.dropna(subset=["exped_sem"]).groupby("exped_sem", as_index=False)["peso_exped_kg"].sum()
+def _floats(values, decimals: int | None = FIGURE_DECIMALS) -> list:
+    """
+    Números da figura em JSON curto: arredondados (sem o ruído de ponto
+    flutuante) e inteiros quando não têm parte decimal (1500, não 1500.0).
+    """
+    arr = np.asarray(values, dtype="float64")
+    if decimals is not None:
+        arr = np.round(arr, decimals)
+    return [int(v) if v.is_integer() else v for v in arr.tolist()]
 
-    fig = go.Figure()
-    if len(receb):
-        fig.add_trace(go.Scatter(x=receb["receb_sem"], y=receb["peso_total_kg"], mode="lines+markers", name="Recebido (kg)"))
-    if len(exped):
-        fig.add_trace(go.Scatter(x=exped["exped_sem"], y=exped["peso_exped_kg"], mode="lines+markers", name="Expedido (kg)"))
 
-    fig.update_layout(template=template, height=380, margin=dict(l=10, r=10, t=40, b=10), legend=dict(orientation="h"))
-    return fig
+def _layout(**extra) -> dict:
+    return {"height": 380, "margin": MARGIN, **extra}
 
 
-def build_top_os_fig(df: pd.DataFrame, template: str):
+def _axis(anchor: str, title: str, **extra) -> dict:
+    return {"anchor": anchor, "domain": [0.0, 1.0], "title": {"text": title}, **extra}
+
+
+def _bar(x, y, xlabel: str, ylabel: str, orientation: str = "v", **layout) -> dict:
     """
-    Top 10 OS por saldo a produzir (kg).
-    Substitui o antigo gráfico por cliente.
+    Barras simples no formato do px.bar.
+    """
+    trace = {
+        "hovertemplate": f"{xlabel}=%{{x}}<br>{ylabel}=%{{y}}<extra></extra>",
+        "legendgroup": "",
+        "marker": {"color": BAR_COLOR, "pattern": {"shape": ""}},
+        "name": "",
+        "orientation": orientation,
+        "showlegend": False,
+        "textposition": "auto",
+        "x": x,
+        "xaxis": "x",
+        "y": y,
+        "yaxis": "y",
+        "type": "bar",
+    }
+    return {
+        "data": [trace],
+        "layout": _layout(
+            xaxis=_axis("y", xlabel),
+            yaxis=_axis("x", ylabel, **layout.pop("yaxis", {})),
+            legend={"tracegroupgap": 0},
+            barmode="relative",
+            **layout,
+        ),
+    }
+
+
+def fig_empty(template: str, title: str) -> dict:
+    return _with_template({"data": [], "layout": {"title": {"text": title}, "height": 360}}, template)
+
+
+def build_funnel_fig(df: pd.DataFrame, template: str, summary: StageSummary | None = None) -> dict:
+    summary = summary or compute_stage_summary(df)
+    reached = summary.funnel()
+
+    def build(labels, values):
+        trace = {"textinfo": "value+percent initial", "x": values, "y": labels, "type": "funnel"}
+        return {"data": [trace], "layout": _layout()}
+
+    return cached_figure("funnel", template, (list(reached.keys()), _floats(list(reached.values()))), build)
+
+
+def build_wip_stage_fig(df: pd.DataFrame, template: str, summary: StageSummary | None = None) -> dict:
+    summary = summary or compute_stage_summary(df)
+    # Poucas etapas: ordena em numpy (reset_index + sort_values custavam
+    # mais que o resto da figura do cache)
+    kg = summary.stage_kg.to_numpy(dtype="float64")
+    order = np.argsort(kg, kind="stable")
+    inputs = (_floats(kg[order]), summary.stage_kg.index.to_numpy()[order].astype(str).tolist())
+    return cached_figure(
+        "wip", template, inputs,
+        lambda kg, etapas: _bar(kg, etapas, "KG", "Etapa", orientation="h"),
+    )
+
+
+def os_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Somas por OS (ordem de os_cliente): saldo a produzir, total e saldo a expedir.
     """
-    by_os = df.groupby("os_cliente", as_index=False).agg(
+    return df.groupby("os_cliente", as_index=False, observed=True).agg(
         saldo_a_produzir_kg=("saldo_a_produzir_kg", "sum"),
         total_kg=("peso_total_kg", "sum"),
+        saldo_a_expedir_kg=("saldo_a_expedir_kg", "sum"),
     )
-    by_os = by_os[by_os["os_cliente"] != ""].sort_values("saldo_a_produzir_kg", ascending=False).head(10)
-
-    fig = px.bar(
-        by_os[::-1],
-        x="saldo_a_produzir_kg",
-        y="os_cliente",
-        orientation="h",
-        labels={"saldo_a_produzir_kg": "Saldo a Produzir (kg)", "os_cliente": "OS Cliente"},
+
+
+def _period_points(s: pd.Series) -> tuple[list, list]:
+    """
+    (datas ISO do início de cada período, kg) de uma série.
+    """
+    return pd.DatetimeIndex(s.index).strftime("%Y-%m-%d").tolist(), _floats(s.to_numpy())
+
+
+def build_timeseries_fig(
+    df: pd.DataFrame,
+    template: str,
+    series: tuple[pd.Series, pd.Series] | None = None,
+    granularity: str = DEFAULT_GRANULARITY,
+) -> dict:
+    receb, exped = series if series is not None else timeseries_kg(df, granularity)
+
+    def build(receb_pts, exped_pts):
+        data = []
+        for (x, y), name in ((receb_pts, "Recebido (kg)"), (exped_pts, "Expedido (kg)")):
+            if x:
+                data.append({"mode": "lines+markers", "name": name, "x": x, "y": y, "type": "scatter"})
+        return {"data": data, "layout": _layout(legend={"orientation": "h"})}
+
+    return cached_figure("timeseries", template, (_period_points(receb), _period_points(exped)), build)
+
+
+def build_top_os_fig(df: pd.DataFrame, template: str, by_os: pd.DataFrame | None = None) -> dict:
+    """
+    Top 10 OS por saldo a produzir (kg).
+    Substitui o antigo gráfico por cliente.
+    """
+    by_os = by_os if by_os is not None else os_totals(df)
+    names = by_os["os_cliente"].to_numpy().astype(str)
+    kg = by_os["saldo_a_produzir_kg"].to_numpy(dtype="float64")
+    keep = np.flatnonzero(names != "")
+    top = keep[np.argsort(-kg[keep], kind="stable")[:10]][::-1]
+
+    inputs = (_floats(kg[top]), names[top].tolist())
+    return cached_figure(
+        "top_os", template, inputs,
+        lambda kg, os_list: _bar(kg, os_list, "Saldo a Produzir (kg)", "OS Cliente", orientation="h"),
     )
-    fig.update_layout(template=template, height=380, margin=dict(l=10, r=10, t=40, b=10))
-    return fig
 
 
-def build_leadtime_fig(df: pd.DataFrame, template: str):
-    lt = df.loc[df["leadtime_dias"].notna() & (df["leadtime_dias"] >= 0) & (df["leadtime_dias"] <= 3650), "leadtime_dias"]
-    fig = px.histogram(lt, nbins=30, labels={"value": "Lead time (dias)"})
-    fig.update_layout(template=template, height=380, margin=dict(l=10, r=10, t=40, b=10))
-    return fig
+def _nice_size(raw: float) -> float:
+    """
+    Menor tamanho de caixa 1, 2 ou 5 x 10^k que cobre raw (como o plotly).
+    """
+    if raw <= 0:
+        return 1.0
+    power = 10.0 ** np.floor(np.log10(raw))
+    for step in (1, 2, 5, 10):
+        if step * power >= raw:
+            return float(step * power)
+    return float(10 * power)
 
 
-def build_conversion_fig(df: pd.DataFrame, template: str):
-    total_scope = df["peso_total_kg"].sum()
-    reached_prep = df.loc[df["prep_kg"] > 0, "peso_total_kg"].sum()
-    reached_mont = df.loc[df["mont_kg"] > 0, "peso_total_kg"].sum()
-    reached_sold = df.loc[df["sold_kg"] > 0, "peso_total_kg"].sum()
-    reached_acab = df.loc[df["acab_kg"] > 0, "peso_total_kg"].sum()
-    reached_pint = df.loc[df["pint_kg"] > 0, "peso_total_kg"].sum()
-    reached_exped = df.loc[df["peso_exped_kg"] > 0, "peso_total_kg"].sum()
+def leadtime_bins(values: np.ndarray, nbins: int = LEADTIME_BINS) -> tuple[dict, list, list]:
+    """
+    Caixas do histograma de lead time: (xbins, centros, contagens).
+    Até nbins caixas de tamanho "redondo"; com dias inteiros as bordas
+    ficam no meio do dia, para nenhum valor cair na borda.
+    """
+    if len(values) == 0:
+        return {}, [], []
+    lo, hi = float(values.min()), float(values.max())
+    size = _nice_size((hi - lo) / nbins) if hi > lo else 1.0
+    start = np.floor(lo / size) * size
+    if size >= 1 and np.all(values == np.floor(values)):
+        start -= 0.5
+    n = int(np.floor((hi - start) / size)) + 1
+    counts = np.bincount(np.floor((values - start) / size).astype("int64"), minlength=n)
+    centers = start + size * (np.arange(n) + 0.5)
+    xbins = {"start": float(start), "end": float(start + n * size), "size": size}
+    return xbins, _floats(centers, None), _floats(counts, None)
+
+
+def build_leadtime_fig(df: pd.DataFrame, template: str) -> dict:
+    lt = df["leadtime_dias"].to_numpy(dtype="float64", na_value=np.nan)
+    lt = lt[(lt >= 0) & (lt <= LEADTIME_MAX_DIAS)]
+    xbins, centers, counts = leadtime_bins(lt)
+
+    def build(xbins, centers, counts):
+        trace = {
+            "bingroup": "x",
+            "histfunc": "sum",
+            "hovertemplate": "variable=leadtime_dias<br>Lead time (dias)=%{x}<br>count=%{y}<extra></extra>",
+            "legendgroup": "leadtime_dias",
+            "marker": {"color": BAR_COLOR, "pattern": {"shape": ""}},
+            "name": "leadtime_dias",
+            "orientation": "v",
+            "showlegend": True,
+            "x": centers,
+            "xaxis": "x",
+            "xbins": xbins,
+            "y": counts,
+            "yaxis": "y",
+            "type": "histogram",
+        }
+        layout = _layout(
+            xaxis=_axis("y", "Lead time (dias)"),
+            yaxis=_axis("x", "count"),
+            legend={"title": {"text": "variable"}, "tracegroupgap": 0},
+            barmode="relative",
+        )
+        return {"data": [trace], "layout": layout}
+
+    return cached_figure("leadtime", template, (xbins, centers, counts), build)
+
+
+def build_conversion_fig(df: pd.DataFrame, template: str, summary: StageSummary | None = None) -> dict:
+    summary = summary or compute_stage_summary(df)
+    total_scope = summary.total_kg
+    (
+        reached_prep,
+        reached_mont,
+        reached_sold,
+        reached_acab,
+        reached_pint,
+        reached_exped,
+    ) = summary.reached_kg.values()
 
     stages = ["Total→Prep", "Prep→Mont", "Mont→Sold", "Sold→Acab", "Acab→Pint", "Pint→Exped"]
     numer = [reached_prep, reached_mont, reached_sold, reached_acab, reached_pint, reached_exped]
     denom = [total_scope, reached_prep, reached_mont, reached_sold, reached_acab, reached_pint]
     conv = [(n / d) if d > 0 else 0.0 for n, d in zip(numer, denom)]
 
-    fig = px.bar(x=stages, y=[c * 100 for c in conv], labels={"x": "Etapa", "y": "Conversão (%)"})
-    fig.update_layout(template=template, height=380, margin=dict(l=10, r=10, t=40, b=10))
-    fig.update_yaxes(range=[0, 105])
-    return fig
-
+    return cached_figure(
+        "conversion", template, (stages, _floats([c * 100 for c in conv])),
+        lambda x, y: _bar(x, y, "Etapa", "Conversão (%)", yaxis={"range": [0, 105]}),
+    )
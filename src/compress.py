@@ -0,0 +1,105 @@
+"""
+Compressão das respostas HTTP (callbacks do Dash, layout, JS/CSS dos
+componentes):
+- brotli (se o pacote brotli estiver instalado) ou gzip, conforme o
+  Accept-Encoding do navegador
+- Só respostas de texto (JSON, HTML, JS, CSS) acima de COMPRESS_MIN_BYTES
+- JS/CSS dos componentes (_dash-component-suites, ex.: plotly.min.js com
+  ~3,5 MB) é comprimido uma vez por arquivo e guardado num LRU
+- Bytes antes/depois: response_bytes_total{stage="raw"|"wire"} e, por
+  callback, payload_bytes/payload_wire_bytes (src.metrics)
+"""
+
+import gzip
+import os
+
+from flask import g, request
+
+from src.lru import LRUCache
+from src.metrics import inc
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "application/x-javascript",
+                "image/svg+xml")
+STATIC_PREFIX = "/_dash-component-suites/"
+
+# Arquivos estáticos já comprimidos por (caminho, etag, codificação)
+STATIC = LRUCache(maxsize=64)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    "br" ou "gzip" conforme o Accept-Encoding (q=0 recusa); None se nenhum.
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0: mesmo conteúdo, mesmos bytes
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _count(raw: int, wire: int, encoding: str):
+    inc("response_bytes_total", raw, help="Bytes das respostas antes e depois da compressão",
+        stage="raw", encoding=encoding)
+    inc("response_bytes_total", wire, stage="wire", encoding=encoding)
+
+
+def init_app(server, min_bytes: int = COMPRESS_MIN_BYTES):
+    """
+    Comprime as respostas do servidor Flask do Dash. Registrar depois de
+    src.metrics.init_app: o Flask roda os after_request na ordem inversa,
+    então as métricas já veem os bytes comprimidos.
+    """
+    @server.after_request
+    def _compress(response):
+        if (response.direct_passthrough or response.status_code != 200
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(COMPRESSIBLE)):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        g.raw_bytes = len(data)
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None or len(data) < min_bytes:
+            _count(len(data), len(data), "identity")
+            return response
+
+        if request.method == "GET" and request.path.startswith(STATIC_PREFIX):
+            key = (request.path, response.get_etag()[0], encoding)
+            body = STATIC.get_or_create(key, lambda: compress_bytes(data, encoding))
+        else:
+            body = compress_bytes(data, encoding)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        _count(len(data), len(body), encoding)
+        return response
+
+    return server
@@ -0,0 +1,130 @@
+"""
+Opções em cascata dos filtros (cliente, OS, TAG, situação):
+- Para cada par de colunas, quais valores aparecem juntos em alguma linha
+  (mapa de co-ocorrência em formato CSR sobre os códigos do FilterIndex),
+  montado uma vez por versão do dataset
+- Opções de uma coluna = valores compatíveis com o que está selecionado
+  nas outras (a seleção da própria coluna não a restringe)
+- Sem refiltrar o DataFrame: só uniões/interseções de listas de códigos
+- Busca por texto (dropdowns de OS/TAG com muitos valores): índice
+  ordenado dos valores em minúsculas; prefixo por busca binária, depois
+  "contém"; devolve só os primeiros `limit`
+"""
+
+from itertools import combinations
+
+import numpy as np
+
+from src.index import CATEGORY_FILTERS, FilterIndex
+
+
+OPTION_COLUMNS = list(CATEGORY_FILTERS.values())
+
+
+class _Pairs:
+    """
+    Valores de b que aparecem com cada valor de a:
+    indices[indptr[i]:indptr[i + 1]] para o código i de a.
+    """
+
+    def __init__(self, a_codes: np.ndarray, b_codes: np.ndarray, n_a: int):
+        self.indptr = np.searchsorted(a_codes, np.arange(n_a + 1)).astype("int64")
+        self.indices = b_codes.astype("int32")
+
+    def neighbors(self, codes: np.ndarray) -> np.ndarray:
+        parts = [self.indices[self.indptr[c]:self.indptr[c + 1]] for c in codes]
+        return np.concatenate(parts) if parts else self.indices[:0]
+
+
+class CooccurrenceIndex:
+    """
+    Mapas de co-ocorrência entre as colunas categóricas de uma versão do
+    dataset (mesmos códigos do FilterIndex).
+    """
+
+    def __init__(self, index: FilterIndex):
+        self.lookup = {col: index.lookup[col] for col in OPTION_COLUMNS}
+        self.values = {col: np.array(list(lookup), dtype=object) for col, lookup in self.lookup.items()}
+        # Códigos em ordem alfabética, sem o valor vazio
+        self.sorted_codes = {}
+        # Índice de busca: valores em minúsculas ordenados + código de cada um
+        self.search_keys = {}
+        self.search_codes = {}
+        for col, values in self.values.items():
+            text = values.astype(str)
+            order = np.argsort(text, kind="stable")
+            self.sorted_codes[col] = order[text[order] != ""].astype("int32")
+            lower = np.char.lower(text)
+            order = np.argsort(lower, kind="stable")
+            order = order[lower[order] != ""]
+            self.search_keys[col] = lower[order]
+            self.search_codes[col] = order.astype("int32")
+
+        self.pairs = {}
+        for a, b in combinations(OPTION_COLUMNS, 2):
+            n_a, n_b = len(self.values[a]), len(self.values[b])
+            combined = np.unique(index.codes[a].astype("int64") * n_b + index.codes[b])
+            a_codes, b_codes = np.divmod(combined, n_b)
+            self.pairs[a, b] = _Pairs(a_codes, b_codes, n_a)
+            # Mesmo mapa no sentido b -> a
+            order = np.lexsort((a_codes, b_codes))
+            self.pairs[b, a] = _Pairs(b_codes[order], a_codes[order], n_b)
+
+    def _codes(self, col: str, values) -> np.ndarray:
+        lookup = self.lookup[col]
+        return np.array([lookup[v] for v in values if v in lookup], dtype="int64")
+
+    def allowed(self, target: str, selected: dict) -> np.ndarray | None:
+        """
+        Máscara dos códigos de target compatíveis com as seleções das
+        outras colunas ({coluna: valores}); None = sem restrição.
+        """
+        mask = None
+        for col, values in selected.items():
+            if col == target or not values:
+                continue
+            ok = np.zeros(len(self.values[target]), dtype=bool)
+            ok[self.pairs[col, target].neighbors(self._codes(col, values))] = True
+            mask = ok if mask is None else mask & ok
+        return mask
+
+    def option_values(self, target: str, selected: dict) -> np.ndarray:
+        """
+        Valores (ordem alfabética) de target compatíveis com as seleções;
+        os já selecionados em target continuam na lista.
+        """
+        codes = self.sorted_codes[target]
+        mask = self.allowed(target, selected)
+        if mask is None:
+            return self.values[target][codes]
+        own = self._codes(target, selected.get(target) or [])
+        if len(own):
+            mask = mask.copy()
+            mask[own] = True
+        return self.values[target][codes[mask[codes]]]
+
+    def search_values(self, target: str, text: str, selected: dict, limit: int) -> tuple[np.ndarray, int]:
+        """
+        Até `limit` valores de target que contêm `text` (sem diferenciar
+        maiúsculas), compatíveis com as seleções: primeiro os que começam
+        com o texto, depois os que só contêm. Retorna (valores, total de
+        compatíveis com o texto).
+        """
+        mask = self.allowed(target, selected)
+        keys, codes = self.search_keys[target], self.search_codes[target]
+        text = (text or "").strip().lower()
+        if not text:
+            hits = self.sorted_codes[target]
+            if mask is not None:
+                hits = hits[mask[hits]]
+            return self.values[target][hits[:limit]], len(hits)
+
+        # Prefixo: faixa contígua do índice ordenado
+        lo = int(np.searchsorted(keys, text, side="left"))
+        hi = int(np.searchsorted(keys, text + "\uffff", side="left"))
+        contains = np.char.find(keys, text) >= 0
+        contains[lo:hi] = False
+        hits = np.concatenate([codes[lo:hi], codes[contains]])
+        if mask is not None:
+            hits = hits[mask[hits]]
+        return self.values[target][hits[:limit]], len(hits)
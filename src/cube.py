@@ -0,0 +1,251 @@
+"""
+Cubo pré-agregado da base (montado uma vez por versão do dataset):
+- Grão: cliente x OS x TAG x situação x semana de recebimento x semana de
+  expedição x padrão de etapas (flags "etapa atingida" + atraso, que
+  também definem a etapa atual)
+- Medidas: nº de linhas, pesos, saldos e soma/contagem do lead time
+- Série temporal: rollups de kg por (célula, dia de recebimento/expedição)
+  (src/timeseries.py), somados em dia, semana ou mês na consulta
+- Recarga incremental (data.prepare_incremental): os rollups são
+  atualizados a partir do cubo anterior só com as linhas que mudaram
+- KPIs, funil, conversão, WIP por etapa, top OS, insights e série temporal
+  saem do cubo, com bem menos linhas que a base
+- Só serve quando os filtros cabem no grão: sem busca por desenho e com
+  intervalos de data em semanas inteiras (segunda a domingo); senão os
+  mesmos valores vêm das linhas filtradas
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.index import CATEGORY_FILTERS, DATE_FILTERS, FilterIndex
+from src.summary import StageSummary, pattern_codes, summarize_patterns
+from src.timeseries import NO_DAY, SERIES, DayRollup, day_numbers, week_start
+
+
+CUBE_MEASURES = ["peso_total_kg", "produzido_kg", "peso_exped_kg", "saldo_a_produzir_kg", "saldo_a_expedir_kg"]
+
+# Acima desta fração de linhas mexidas, remontar os rollups sai mais barato
+INCREMENTAL_MAX_CHANGED = float(os.environ.get("CUBE_INCREMENTAL_MAX_CHANGED", "0.25"))
+
+
+def _kg(s: pd.Series) -> np.ndarray:
+    return np.nan_to_num(s.to_numpy(dtype="float64", na_value=np.nan))
+
+
+def _to_day(value) -> int | None:
+    if not value:
+        return None
+    return int((pd.Timestamp(value) - pd.Timestamp("1970-01-01")).days)
+
+
+def _on_weekday(value, weekday: int) -> bool:
+    """
+    Limite vazio, ou meia-noite do dia da semana pedido (0 = segunda).
+    """
+    if not value:
+        return True
+    ts = pd.Timestamp(value)
+    return ts == ts.normalize() and ts.weekday() == weekday
+
+
+def _group(keys: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Agrupa linhas com a mesma combinação de chaves.
+    Retorna (primeira linha de cada célula, célula de cada linha).
+    Junta os códigos das chaves num único int64 (base mista) quando cabe;
+    senão ordena as linhas da matriz de chaves.
+    """
+    codes = [pd.factorize(k)[0].astype("int64") for k in keys]
+    sizes = [int(c.max()) + 1 if len(c) else 1 for c in codes]
+    if np.prod([float(n) for n in sizes]) < 2 ** 62:
+        combined = np.zeros(len(keys[0]), dtype="int64")
+        for c, n in zip(codes, sizes):
+            combined = combined * n + c
+        _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(np.column_stack(codes), axis=0, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+class StageCube:
+    """
+    Cubo de uma versão do dataset. Os códigos de cliente/OS/TAG/situação
+    são os mesmos do FilterIndex da versão.
+    prev = (cubo anterior, base anterior, src de data.prepare_incremental):
+    os rollups da série saem do cubo anterior.
+    """
+
+    def __init__(self, df: pd.DataFrame, index: FilterIndex, prev: tuple | None = None):
+        self.lookup = index.lookup
+        self.names = {col: np.array(list(lookup), dtype=object) for col, lookup in index.lookup.items()}
+
+        keys = [index.codes[col].astype("int64") for col in CATEGORY_FILTERS.values()]
+        days = {}
+        for col in DATE_FILTERS.values():
+            days[col] = day_numbers(df[col])
+            keys.append(week_start(days[col]))
+        keys.append(pattern_codes(df).astype("int64"))
+
+        first, inverse = _group(keys)
+        n_cells = len(first)
+
+        dims = list(CATEGORY_FILTERS.values()) + list(DATE_FILTERS.values()) + ["padrao"]
+        self.cells = {d: k[first] for d, k in zip(dims, keys)}
+        self.n_rows = len(df)
+        self.n_cells = n_cells
+
+        # Célula de cada linha: a próxima versão parte daqui (prev)
+        self.row_cells = inverse.astype("int32" if n_cells < 2 ** 31 else "int64")
+
+        self.count = np.bincount(inverse, minlength=n_cells).astype("float64")
+        self.measures = {c: np.bincount(inverse, weights=_kg(df[c]), minlength=n_cells) for c in CUBE_MEASURES}
+        lt = df["leadtime_dias"].to_numpy(dtype="float64", na_value=np.nan)
+        lt_valid = lt >= 0
+        self.leadtime_sum = np.bincount(inverse, weights=np.where(lt_valid, lt, 0.0), minlength=n_cells)
+        self.leadtime_count = np.bincount(inverse, weights=lt_valid.astype("float64"), minlength=n_cells)
+
+        # kg por (célula, dia): a série sai em qualquer granularidade
+        self.series = self._updated_series(df, days, inverse, *prev) if prev is not None else None
+        self.incremental = self.series is not None
+        if self.series is None:
+            self.series = {
+                prefix: DayRollup(inverse, days[col], _kg(df[measure]))
+                for prefix, (col, measure) in SERIES.items()
+            }
+
+    def _cell_keys(self) -> pd.MultiIndex:
+        """
+        Células pelos valores (não pelos códigos, que mudam entre versões).
+        """
+        arrays = [self.names[col][self.cells[col]] for col in CATEGORY_FILTERS.values()]
+        arrays += [self.cells[col] for col in DATE_FILTERS.values()] + [self.cells["padrao"]]
+        return pd.MultiIndex.from_arrays(arrays)
+
+    def _updated_series(self, df, days, inverse, prev_cube, prev_df, src) -> dict | None:
+        """
+        Rollups a partir dos do cubo anterior. Linha mantida = casada em src
+        e na mesma célula (cliente/situação ou atraso podem mudar sem mudar
+        as entradas das derivadas); o resto sai (versão anterior) ou entra
+        (versão nova). None se não der ou se mudou linha demais.
+        """
+        if len(src) != len(df) or len(prev_cube.row_cells) != len(prev_df):
+            return None
+        cell_map = self._cell_keys().get_indexer(prev_cube._cell_keys())
+        old_cells = cell_map[prev_cube.row_cells]
+
+        kept = src >= 0
+        kept[kept] = old_cells[src[kept]] == inverse[kept]
+        gone = np.ones(len(prev_df), dtype=bool)
+        gone[src[kept]] = False
+        old_pos, new_pos = np.flatnonzero(gone), np.flatnonzero(~kept)
+        if len(old_pos) + len(new_pos) > INCREMENTAL_MAX_CHANGED * max(1, len(df)):
+            return None
+
+        out = {}
+        for prefix, (col, measure) in SERIES.items():
+            old_days = day_numbers(prev_df[col].iloc[old_pos])
+            minus = (old_cells[old_pos], old_days, _kg(prev_df[measure].iloc[old_pos]))
+            plus = (inverse[new_pos], days[col][new_pos], _kg(df[measure].iloc[new_pos]))
+            out[prefix] = prev_cube.series[prefix].updated(cell_map, minus, plus)
+        return out
+
+    # ---- Quando o cubo responde ----
+
+    def fits(self, dt_receb_range=None, dt_exped_range=None, desenho_text=None, **_categories) -> bool:
+        """
+        True se os filtros cabem no grão do cubo.
+        """
+        if desenho_text:
+            return False
+        ranges = {"dt_receb_range": dt_receb_range, "dt_exped_range": dt_exped_range}
+        for arg, col in DATE_FILTERS.items():
+            rng = ranges[arg]
+            if not (rng and len(rng) == 2 and (rng[0] or rng[1])):
+                continue
+            # Início numa segunda-feira, fim num domingo (semanas inteiras)
+            if not (_on_weekday(rng[0], 0) and _on_weekday(rng[1], 6)):
+                return False
+        return True
+
+    def mask(
+        self,
+        clientes=None,
+        os_values=None,
+        tag_values=None,
+        situacoes=None,
+        dt_receb_range=None,
+        dt_exped_range=None,
+        desenho_text=None,
+    ) -> np.ndarray:
+        """
+        Células do cubo que entram no recorte (filtros já conferidos por fits).
+        """
+        m = np.ones(self.n_cells, dtype=bool)
+        selected = {"clientes": clientes, "os_values": os_values, "tag_values": tag_values, "situacoes": situacoes}
+        for arg, col in CATEGORY_FILTERS.items():
+            if selected[arg]:
+                lookup = self.lookup[col]
+                wanted = np.zeros(len(lookup) + 1, dtype=bool)
+                for v in selected[arg]:
+                    code = lookup.get(v)
+                    if code is not None:
+                        wanted[code] = True
+                m &= wanted[self.cells[col]]
+
+        ranges = {"dt_receb_range": dt_receb_range, "dt_exped_range": dt_exped_range}
+        for arg, col in DATE_FILTERS.items():
+            rng = ranges[arg]
+            if not (rng and len(rng) == 2 and (rng[0] or rng[1])):
+                continue
+            weeks = self.cells[col]
+            m &= weeks != NO_DAY
+            start, end = _to_day(rng[0]), _to_day(rng[1])
+            if start is not None:
+                m &= weeks >= start
+            if end is not None:
+                m &= weeks <= end - 6
+        return m
+
+    # ---- Consultas ----
+
+    def summary(self, m: np.ndarray) -> StageSummary:
+        return summarize_patterns(
+            self.cells["padrao"][m],
+            self.count[m],
+            self.measures["peso_total_kg"][m],
+            self.measures["produzido_kg"][m],
+            self.measures["peso_exped_kg"][m],
+            self.leadtime_sum[m].sum(),
+            int(round(self.leadtime_count[m].sum())),
+        )
+
+    def os_totals(self, m: np.ndarray) -> pd.DataFrame:
+        """
+        Mesmo resultado de charts.os_totals sobre as linhas do recorte.
+        """
+        codes = self.cells["os_cliente"][m]
+        n = len(self.names["os_cliente"])
+        present = np.bincount(codes, weights=self.count[m], minlength=n) > 0
+
+        def by_os(c):
+            return np.bincount(codes, weights=self.measures[c][m], minlength=n)[present]
+
+        out = pd.DataFrame({
+            "os_cliente": self.names["os_cliente"][present],
+            "saldo_a_produzir_kg": by_os("saldo_a_produzir_kg"),
+            "total_kg": by_os("peso_total_kg"),
+            "saldo_a_expedir_kg": by_os("saldo_a_expedir_kg"),
+        })
+        return out.sort_values("os_cliente", kind="stable", ignore_index=True)
+
+    def timeseries(self, m: np.ndarray, granularity: str) -> tuple[pd.Series, pd.Series]:
+        """
+        Mesmo resultado de timeseries.timeseries_kg sobre as linhas do recorte.
+        """
+        return tuple(
+            self.series[prefix].series(m, granularity, measure, f"{prefix}_periodo")
+            for prefix, (_, measure) in SERIES.items()
+        )
@@ -11,8 +11,91 @@ import io
 import re
 from datetime import date
 
+import numpy as np
 import pandas as pd
 
+from src.metrics import timed
+
+
+# Colunas usadas pelo dashboard (base preparada "enxuta")
+DATASET_COLUMNS = [
+    "cliente", "os_cliente", "tag", "situacao_desenho", "desenho_pai", "descricao",
+    "dt_receb", "dt_entrega", "dt_exped",
+    "peso_total_kg", "peso_exped_kg",
+    "prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg",
+    "produzido_kg", "etapa_atual",
+    "saldo_a_produzir_kg", "saldo_a_expedir_kg",
+    "leadtime_dias", "atrasado",
+]
+
+
+# Etapas em ordem de avanço (etapa_atual é categórica ordenada)
+STAGE_ORDER = [
+    "Não iniciado",
+    "Preparação",
+    "Montagem",
+    "Solda",
+    "Acabamento",
+    "Pintura (pronto p/ expedir)",
+    "Expedido",
+]
+STAGE_DTYPE = pd.CategoricalDtype(STAGE_ORDER, ordered=True)
+
+# Cabeçalhos da planilha -> nomes internos
+COL_MAP = {
+    "DATA RECEBIMENTO DA GUIA": "dt_receb",
+    "DATA DE ENTREGA": "dt_entrega",
+    "DATA EXPEDIÇÃO": "dt_exped",
+
+    "PESO TOTAL ( KG)": "peso_total_kg",
+    "PESO TOTAL ( KG )": "peso_total_kg",
+    "PESO TOTAL (KG)": "peso_total_kg",
+    "PESO EXPEDIDO (KG)": "peso_exped_kg",
+
+    "CLIENTE": "cliente",
+    "OS_CLIENTE": "os_cliente",
+    "TAG": "tag",
+    "SITUAÇÃO DO DESENHO": "situacao_desenho",
+    "N° DESENHO PAI": "desenho_pai",
+    "DESCRIÇÃO DO DESENHO": "descricao",  # pode existir, mas não filtraremos por ela
+
+    # Etapas (kg)
+    "DESENHOS PREPARADOS (KG)": "prep_kg",
+    "DESENHOS MONTADOS (KG)": "mont_kg",
+    "DESENHOS SOLDADOS (KG)": "sold_kg",
+    "DESENHOS ACABADOS (KG)": "acab_kg",
+    "DESENHOS PITADOS (KG)": "pint_kg",
+    "DESENHOS PINTADOS (KG)": "pint_kg",
+}
+
+REQUIRED_COLUMNS = [
+    "dt_receb", "dt_entrega", "dt_exped",
+    "peso_total_kg", "peso_exped_kg",
+    "prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg", "cliente",
+    "os_cliente", "tag", "situacao_desenho",
+    "desenho_pai", "descricao",
+]
+
+# Colunas de entrada das derivadas (se não mudaram, as derivadas também não)
+DERIVE_INPUT_COLUMNS = [
+    "dt_receb", "dt_entrega", "dt_exped",
+    "peso_total_kg", "peso_exped_kg",
+    "prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg",
+]
+DERIVED_COLUMNS = [
+    "produzido_kg", "etapa_atual",
+    "saldo_a_produzir_kg", "saldo_a_expedir_kg",
+    "leadtime_dias", "atrasado",
+]
+
+DATE_COLUMNS = ["dt_receb", "dt_entrega", "dt_exped"]
+
+# Origem de cada linha quando a base junta várias planilhas/abas (categóricas)
+SOURCE_COLUMNS = ["arquivo", "aba"]
+
+# Identificação de uma linha entre versões da planilha
+ROW_KEY_COLUMNS = ["os_cliente", "tag", "desenho_pai"]
+
 
 def normalize_col(c: str) -> str:
     c = str(c).strip().replace("\n", " ")
@@ -28,62 +111,97 @@ def safe_to_numeric(s):
     return pd.to_numeric(s, errors="coerce")
 
 
+def to_day_numbers(s) -> pd.Series:
+    """
+    Datas -> dias desde 1970-01-01 (Int32; NaT vira <NA>).
+    """
+    d = safe_to_datetime(s)
+    return (d - pd.Timestamp("1970-01-01")).dt.days.astype("Int32")
+
+
+def date_values(s: pd.Series) -> pd.Series:
+    """
+    Coluna de data como datetime64, esteja ela em datetime (modo normal)
+    ou em número de dias (modo compacto).
+    """
+    if pd.api.types.is_integer_dtype(s):
+        days = s.to_numpy(dtype="float64", na_value=np.nan)
+        return pd.Series(pd.to_datetime(days, unit="D"), index=s.index, name=s.name)
+    return s
+
+
+def day_bounds(start, end) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+    """
+    Intervalo de datas do filtro em dias inteiros: [início do dia inicial,
+    início do dia seguinte ao final). Com datas que têm hora (modo normal)
+    o resultado é o mesmo das datas em dias do modo compacto.
+    """
+    lo = pd.Timestamp(start).normalize() if start else None
+    hi = pd.Timestamp(end).normalize() + pd.Timedelta(days=1) if end else None
+    return lo, hi
+
+
+@timed("load_excel_local")
 def load_excel_local(path: str) -> pd.DataFrame:
     """
     Lê Excel do disco.
     Tenta aba CONSOLIDADO; se não existir, usa a primeira aba.
     """
-    xls = pd.ExcelFile(path)
-    sheet = "CONSOLIDADO" if "CONSOLIDADO" in xls.sheet_names else xls.sheet_names[0]
-    df = pd.read_excel(path, sheet_name=sheet)
+    # Abre o arquivo uma única vez (lista abas e lê a mesma instância)
+    with pd.ExcelFile(path) as xls:
+        sheet = "CONSOLIDADO" if "CONSOLIDADO" in xls.sheet_names else xls.sheet_names[0]
+        df = xls.parse(sheet_name=sheet)
     df.columns = [normalize_col(c) for c in df.columns]
     return df
 
 
-def prepare_df(df_raw: pd.DataFrame) -> pd.DataFrame:
+def stage_of_row(r):
     """
-    Prepara a base para o dashboard.
-    Tudo em KG (inteiro no display; internamente float ok).
+    Etapa atual de uma linha (versão linha a linha, referência para
+    classify_stages).
+    """
+    if r["peso_exped_kg"] > 0:
+        return "Expedido"
+    if r["pint_kg"] > 0:
+        return "Pintura (pronto p/ expedir)"
+    if r["acab_kg"] > 0:
+        return "Acabamento"
+    if r["sold_kg"] > 0:
+        return "Solda"
+    if r["mont_kg"] > 0:
+        return "Montagem"
+    if r["prep_kg"] > 0:
+        return "Preparação"
+    return "Não iniciado"
+
+
+def classify_stages(df: pd.DataFrame) -> pd.Categorical:
+    """
+    Etapa atual (gargalo) vetorizada: a etapa mais avançada com kg > 0.
+    Mesma regra de stage_of_row, em máscaras ordenadas + np.select.
+    """
+    conds = [
+        df["peso_exped_kg"].to_numpy() > 0,
+        df["pint_kg"].to_numpy() > 0,
+        df["acab_kg"].to_numpy() > 0,
+        df["sold_kg"].to_numpy() > 0,
+        df["mont_kg"].to_numpy() > 0,
+        df["prep_kg"].to_numpy() > 0,
+    ]
+    codes = np.select(conds, [6, 5, 4, 3, 2, 1], default=0).astype("int8")
+    return pd.Categorical.from_codes(codes, dtype=STAGE_DTYPE)
+
+
+def standardize_df(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Padroniza nomes (COL_MAP), garante colunas obrigatórias e converte tipos.
     """
     df = df_raw.copy()
 
-    col_map = {
-        "DATA RECEBIMENTO DA GUIA": "dt_receb",
-        "DATA DE ENTREGA": "dt_entrega",
-        "DATA EXPEDIÇÃO": "dt_exped",
-
-        "PESO TOTAL ( KG)": "peso_total_kg",
-        "PESO TOTAL ( KG )": "peso_total_kg",
-        "PESO TOTAL (KG)": "peso_total_kg",
-        "PESO EXPEDIDO (KG)": "peso_exped_kg",
-
-        "CLIENTE": "cliente",
-        "OS_CLIENTE": "os_cliente",
-        "TAG": "tag",
-        "SITUAÇÃO DO DESENHO": "situacao_desenho",
-        "N° DESENHO PAI": "desenho_pai",
-        "DESCRIÇÃO DO DESENHO": "descricao",  # pode existir, mas não filtraremos por ela
-
-        # Etapas (kg)
-        "DESENHOS PREPARADOS (KG)": "prep_kg",
-        "DESENHOS MONTADOS (KG)": "mont_kg",
-        "DESENHOS SOLDADOS (KG)": "sold_kg",
-        "DESENHOS ACABADOS (KG)": "acab_kg",
-        "DESENHOS PITADOS (KG)": "pint_kg",
-        "DESENHOS PINTADOS (KG)": "pint_kg",
-    }
-
-    rename = {c: col_map[c] for c in df.columns if c in col_map}
+    rename = {c: COL_MAP[c] for c in df.columns if c in COL_MAP}
     df = df.rename(columns=rename)
 
-    required = [
-        "dt_receb", "dt_entrega", "dt_exped",
-        "peso_total_kg", "peso_exped_kg",
-        "prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg","cliente",
-        "os_cliente", "tag", "situacao_desenho",
-        "desenho_pai", "descricao",
-    ]
-    for r in required:
+    for r in REQUIRED_COLUMNS:
         if r not in df.columns:
             df[r] = pd.NA
 
@@ -95,26 +213,23 @@ def prepare_df(df_raw: pd.DataFrame) -> pd.DataFrame:
     for c in ["peso_total_kg", "peso_exped_kg", "prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg"]:
         df[c] = safe_to_numeric(df[c]).fillna(0.0)
 
+    # Text columns
+    for c in ["cliente", "os_cliente", "tag", "situacao_desenho", "desenho_pai", "descricao"]:
+        df[c] = df[c].astype("string").fillna("")
+
+    return df
+
+
+def derive_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas derivadas (produzido, etapa atual, saldos, lead time, atraso)
+    sobre uma base já padronizada. Altera df e o retorna.
+    """
     # Produzido (kg): última etapa atingida
     df["produzido_kg"] = df[["pint_kg", "acab_kg", "sold_kg", "mont_kg", "prep_kg"]].max(axis=1)
 
     # Etapa atual (gargalo)
-    def stage_of_row(r):
-        if r["peso_exped_kg"] > 0:
-            return "Expedido"
-        if r["pint_kg"] > 0:
-            return "Pintura (pronto p/ expedir)"
-        if r["acab_kg"] > 0:
-            return "Acabamento"
-        if r["sold_kg"] > 0:
-            return "Solda"
-        if r["mont_kg"] > 0:
-            return "Montagem"
-        if r["prep_kg"] > 0:
-            return "Preparação"
-        return "Não iniciado"
-
-    df["etapa_atual"] = df.apply(stage_of_row, axis=1)
+    df["etapa_atual"] = classify_stages(df)
 
     # Saldos
     df["saldo_a_produzir_kg"] = (df["peso_total_kg"] - df["produzido_kg"]).clip(lower=0.0)
@@ -124,16 +239,170 @@ def prepare_df(df_raw: pd.DataFrame) -> pd.DataFrame:
     df["leadtime_dias"] = (df["dt_exped"] - df["dt_receb"]).dt.days
 
     # Atraso
-    today = pd.Timestamp(date.today())
-    df["atrasado"] = (df["dt_entrega"].notna()) & (df["dt_entrega"] < today) & (df["peso_exped_kg"] <= 0)
+    mark_atrasado(df)
+
+    return df
+
+
+@timed("prepare_df")
+def prepare_df(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepara a base para o dashboard.
+    Tudo em KG (inteiro no display; internamente float ok).
+    """
+    return derive_columns(standardize_df(df_raw))
 
-    # Text columns
-    for c in ["os_cliente", "tag", "situacao_desenho", "desenho_pai", "descricao"]:
-        df[c] = df[c].astype("string").fillna("")
 
+def row_keys(df: pd.DataFrame) -> pd.MultiIndex:
+    """
+    Chave de linha (OS + TAG + desenho PAI + ordem de ocorrência, para
+    desenhos repetidos na mesma OS/TAG).
+    """
+    occurrence = df.groupby(ROW_KEY_COLUMNS, sort=False).cumcount()
+    return pd.MultiIndex.from_arrays([df[c].astype("string").fillna("") for c in ROW_KEY_COLUMNS] + [occurrence])
+
+
+def _comparable(s: pd.Series) -> np.ndarray:
+    if pd.api.types.is_integer_dtype(s):
+        return s.to_numpy(dtype="float64", na_value=np.nan)
+    return s.to_numpy()
+
+
+@timed("prepare_incremental")
+def prepare_incremental(prev: pd.DataFrame | None, df_raw: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Prepara uma nova versão da planilha reaproveitando as colunas derivadas
+    das linhas que não mudaram em prev (casadas por row_keys).
+    Retorna (df preparado, src): src[i] é a posição em prev da linha i,
+    se ela não mudou, ou -1 se foi recalculada (nova ou alterada).
+    """
+    new = standardize_df(df_raw)
+    if prev is None or len(prev) == 0:
+        return derive_columns(new), np.full(len(new), -1, dtype="int64")
+
+    pos = row_keys(prev).get_indexer(row_keys(new))
+    changed = pos < 0
+    src = np.where(changed, 0, pos)
+    for c in DERIVE_INPUT_COLUMNS:
+        # Compara na representação de prev (normal ou compacta)
+        a = new[c] if new[c].dtype == prev[c].dtype else compact_column(c, new[c])
+        a = _comparable(a)
+        b = _comparable(prev[c])[src]
+        changed |= ~((a == b) | (pd.isna(a) & pd.isna(b)))
+
+    changed_pos = np.flatnonzero(changed)
+    fresh = derive_columns(new.iloc[changed_pos].copy())
+
+    for c in DERIVED_COLUMNS:
+        if c == "atrasado":
+            continue
+        col = prev[c].iloc[src].reset_index(drop=True)
+        col.index = new.index
+        if len(changed_pos):
+            values = fresh[c] if fresh[c].dtype == col.dtype else compact_column(c, fresh[c])
+            col.iloc[changed_pos] = values.array
+        new[c] = col
+
+    # Atraso depende da data de hoje: sempre recalculado
+    mark_atrasado(new)
+    return new, np.where(changed, -1, src).astype("int64")
+
+
+def mark_atrasado(df: pd.DataFrame, today=None) -> pd.DataFrame:
+    """
+    Recalcula a flag de atraso (depende da data de hoje, por isso
+    não vai para o cache em disco).
+    """
+    today = pd.Timestamp(today or date.today())
+    entrega = date_values(df["dt_entrega"])
+    df["atrasado"] = (entrega.notna()) & (entrega < today) & (df["peso_exped_kg"] <= 0)
     return df
 
 
+# Texto vira categórica quando há no máximo esta fração de valores distintos
+CATEGORY_MAX_RATIO = 0.5
+
+
+def compact_column(c: str, s: pd.Series) -> pd.Series:
+    """
+    Representação compacta de uma coluna da base preparada.
+    """
+    if c in DATE_COLUMNS:
+        return s if pd.api.types.is_integer_dtype(s) else to_day_numbers(s)
+    if c == "leadtime_dias":
+        return s.round().astype("Int32")
+    if isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s):
+        return s
+    if pd.api.types.is_float_dtype(s):
+        return s.astype("float32")
+    if s.nunique(dropna=False) <= CATEGORY_MAX_RATIO * max(1, len(s)):
+        return s.astype("category")
+    return s
+
+
+def compact_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Modo compacto da base preparada:
+    - Texto de baixa cardinalidade -> categórica (dicionário + códigos)
+    - Pesos float64 -> float32; lead time -> Int32
+    - Datas -> Int32 (dias desde 1970-01-01); ler com date_values()
+    - etapa_atual já é categórica (códigos int8)
+    """
+    return pd.DataFrame({c: compact_column(c, df[c]) for c in df.columns}, index=df.index)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Memória por coluna (bytes) antes/depois da compactação.
+    """
+    b = before.memory_usage(deep=True, index=False)
+    a = after.memory_usage(deep=True, index=False)
+    rep = pd.DataFrame({
+        "antes": b,
+        "depois": a.reindex(b.index),
+        "dtype_antes": before.dtypes.astype(str),
+        "dtype_depois": after.dtypes.astype(str).reindex(b.index),
+    })
+    rep.loc["TOTAL", ["antes", "depois"]] = [b.sum(), a.sum()]
+    rep["razao"] = rep["antes"] / rep["depois"]
+    return rep
+
+
+def concat_prepared(frames: list[pd.DataFrame], compact: bool = False) -> pd.DataFrame:
+    """
+    Junta bases preparadas (várias planilhas/abas) numa só.
+    Categóricas são unidas (union_categoricals) em vez de virar texto;
+    se uma parte é categórica e outra não, a coluna junta passa de novo
+    por compact_column no modo compacto.
+    """
+    frames = [f for f in frames if len(f)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    cols = {}
+    for c in frames[0].columns:
+        parts = [f[c] for f in frames]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            if all(p.dtype == parts[0].dtype for p in parts):
+                merged = pd.Categorical.from_codes(
+                    np.concatenate([p.cat.codes.to_numpy() for p in parts]), dtype=parts[0].dtype
+                )
+                cols[c] = pd.Series(merged)
+                continue
+            try:
+                cols[c] = pd.Series(pd.api.types.union_categoricals(parts, sort_categories=True))
+                continue
+            except TypeError:
+                # Categorias de tipos diferentes (ex.: vindas do cache): junta como texto
+                pass
+        parts = [p.astype("string") if isinstance(p.dtype, pd.CategoricalDtype) else p for p in parts]
+        merged = pd.concat(parts, ignore_index=True)
+        if c in SOURCE_COLUMNS:
+            merged = merged.astype("category")
+        cols[c] = compact_column(c, merged) if compact else merged
+    return pd.DataFrame(cols)
+
+
 def df_to_store(df: pd.DataFrame) -> str:
     """
     Serializa DF para Store (JSON split). Datas em ISO.
@@ -180,6 +449,7 @@ def apply_filters(
     dt_receb_range,
     dt_exped_range,
     desenho_text,
+    index=None,
 ):
     """
     Filtros ativos:
@@ -187,9 +457,24 @@ def apply_filters(
     - TAG (dropdown multi)
     - Situação do desenho (dropdown multi)
     - intervalo de dt_receb
-    - intervalo de dt_exped
+    - intervalo de dt_exped (dias inteiros, ver day_bounds)
     - desenho_pai contém (texto)
+
+    Com index (src/index.FilterIndex do mesmo df), monta uma única máscara
+    e faz um único take, sem cópias intermediárias.
     """
+    if index is not None:
+        pos = index.positions(
+            clientes=clientes,
+            os_values=os_values,
+            tag_values=tag_values,
+            situacoes=situacoes,
+            dt_receb_range=dt_receb_range,
+            dt_exped_range=dt_exped_range,
+            desenho_text=desenho_text,
+        )
+        return df if pos is None else df.take(pos)
+
     out = df.copy()
     if clientes:
         out = out[out["cliente"].isin(clientes)]
@@ -203,18 +488,18 @@ def apply_filters(
 
     # Datas
     if dt_receb_range and len(dt_receb_range) == 2:
-        s, e = dt_receb_range
-        if s:
-            out = out[out["dt_receb"] >= pd.to_datetime(s)]
-        if e:
-            out = out[out["dt_receb"] <= pd.to_datetime(e)]
+        s, e = day_bounds(*dt_receb_range)
+        if s is not None:
+            out = out[date_values(out["dt_receb"]) >= s]
+        if e is not None:
+            out = out[date_values(out["dt_receb"]) < e]
 
     if dt_exped_range and len(dt_exped_range) == 2:
-        s, e = dt_exped_range
-        if s:
-            out = out[out["dt_exped"] >= pd.to_datetime(s)]
-        if e:
-            out = out[out["dt_exped"] <= pd.to_datetime(e)]
+        s, e = day_bounds(*dt_exped_range)
+        if s is not None:
+            out = out[date_values(out["dt_exped"]) >= s]
+        if e is not None:
+            out = out[date_values(out["dt_exped"]) < e]
 
     # desenho contém
     if desenho_text:
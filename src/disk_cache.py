@@ -0,0 +1,354 @@
+"""
+Cache em disco da base preparada (formato colunar NumPy):
+- Uma pasta .cache/<arquivo>/ ao lado da planilha
+- Um .npy por coluna + meta.json (tamanho, mtime e sha1 da planilha)
+- Reaproveitado na inicialização enquanto a planilha não mudar
+- Reconstruído (leitura em streaming, src.ingest) só quando a planilha muda
+- Com mmap=True as colunas ficam mapeadas do disco (somente leitura):
+  vários processos (workers do gunicorn) dividem as mesmas páginas
+- Texto vai como códigos inteiros + vocabulário (categórica): só os
+  códigos ficam mapeados, nenhuma coluna vira objetos Python por processo
+- Arrays por linha dos índices de filtro também ficam na pasta do cache
+  (array_store), gravados pelo primeiro processo e mapeados pelos outros
+- cache_lock: um processo por vez lê planilhas e grava o cache; os outros
+  esperam e depois só mapeiam o cache pronto
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data import mark_atrasado
+from src.ingest import load_prepared_stream
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+
+CACHE_VERSION = 5
+CACHE_DIRNAME = ".cache"
+
+# Sentinelas de <NA> para colunas inteiras anuláveis
+INT_NA = {name: np.iinfo(name).min for name in ("int8", "int16", "int32", "int64")}
+
+# Colunas que não vão para o cache (dependem da data de hoje)
+VOLATILE_COLUMNS = ["atrasado"]
+
+
+def file_sha1(path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def workbook_signature(path) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def cache_dir_for(path) -> Path:
+    path = Path(path)
+    return path.parent / CACHE_DIRNAME / path.name
+
+
+def _open_lock(directory):
+    if fcntl is None:
+        return None
+    lock_dir = Path(directory) / CACHE_DIRNAME
+    try:
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        return open(lock_dir / ".lock", "a+")
+    except OSError:
+        return None
+
+
+@contextmanager
+def cache_lock(directory):
+    """
+    Trava exclusiva entre processos (flock em <directory>/.cache/.lock)
+    enquanto o bloco lê planilhas da pasta e grava o cache delas.
+    Sem fcntl (Windows) ou sem permissão de escrita, não trava.
+    """
+    f = _open_lock(directory)
+    if f is None:
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            # Solta explicitamente: um fork pode ter herdado o descritor
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def bump_generation(directory, signature: dict) -> int | None:
+    """
+    Geração da origem em <directory>/.cache/generation.json: igual para
+    todos os processos que veem a mesma assinatura, e só cresce (passa a
+    max(geração anterior + 1, relógio em ns) a cada assinatura nova, mesmo
+    que uma planilha saia ou volte com mtime mais antigo).
+    None se não der para gravar (disco somente leitura).
+    """
+    path = Path(directory) / CACHE_DIRNAME / "generation.json"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(path, "a+", encoding="utf-8")
+    except OSError:
+        return None
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            try:
+                data = json.loads(f.read() or "{}")
+            except ValueError:
+                data = {}
+            if data.get("signature") != signature or "generation" not in data:
+                data = {
+                    "generation": max(int(data.get("generation", 0)) + 1, time.time_ns()),
+                    "signature": signature,
+                }
+                f.seek(0)
+                f.truncate()
+                json.dump(data, f)
+                f.flush()
+            return int(data["generation"])
+        except OSError:
+            return None
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_meta(cache_dir: Path):
+    try:
+        with open(cache_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return meta
+
+
+def _write_meta(cache_dir: Path, meta: dict):
+    tmp = cache_dir / "meta.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, cache_dir / "meta.json")
+
+
+def _column_to_array(s: pd.Series):
+    """
+    Converte a coluna em arrays NumPy salváveis sem pickle.
+    Retorna (kind, array, extras) — extras são arrays auxiliares
+    (ex.: categorias de uma coluna categórica).
+    """
+    if _is_text(s):
+        # Códigos + vocabulário ordenado (ordenar pelos códigos = ordenar o
+        # texto); a coluna volta como categórica com os códigos mapeados
+        s = pd.Series(pd.Categorical(s.astype("string").fillna("").to_numpy(dtype=object)))
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = np.asarray(s.cat.categories.astype(str), dtype=str)
+        kind = "ordered" if s.cat.ordered else "category"
+        return kind, s.cat.codes.to_numpy(), {"categories": cats}
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return "datetime", s.to_numpy(), {}
+    if pd.api.types.is_bool_dtype(s):
+        return "bool", s.to_numpy(dtype=bool), {}
+    if pd.api.types.is_integer_dtype(s):
+        # Inteiro anulável (ex.: datas em dias no modo compacto): <NA> vira sentinela
+        return "int", s.to_numpy(dtype=s.dtype.numpy_dtype, na_value=INT_NA[s.dtype.numpy_dtype.name]), {}
+    if pd.api.types.is_numeric_dtype(s):
+        dtype = s.dtype if pd.api.types.is_float_dtype(s) else "float64"
+        return "float", s.to_numpy(dtype=dtype, na_value=np.nan), {}
+    raise TypeError(f"Coluna sem formato de cache: {s.name} ({s.dtype})")
+
+
+def _is_text(s: pd.Series) -> bool:
+    return not (
+        isinstance(s.dtype, pd.CategoricalDtype)
+        or pd.api.types.is_datetime64_any_dtype(s)
+        or pd.api.types.is_bool_dtype(s)
+        or pd.api.types.is_numeric_dtype(s)
+    )
+
+
+def _array_to_column(kind: str, arr, extras: dict) -> pd.Series:
+    if kind in ("category", "ordered"):
+        dtype = pd.CategoricalDtype(extras["categories"], ordered=(kind == "ordered"))
+        return pd.Series(pd.Categorical.from_codes(arr, dtype=dtype), copy=False)
+    if kind == "int":
+        data = np.asarray(arr)
+        return pd.Series(pd.arrays.IntegerArray(data, data == INT_NA[data.dtype.name]), copy=False)
+    # copy=False: com mmap, a coluna continua apontando para o arquivo
+    return pd.Series(np.asarray(arr), copy=False)
+
+
+def save_prepared_cache(df: pd.DataFrame, path, meta_extra: dict | None = None) -> Path:
+    """
+    Grava a base preparada em .cache/<arquivo>/ (troca atômica da pasta).
+    """
+    cache_dir = cache_dir_for(path)
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = cache_dir.with_name(f"{cache_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    kinds = {}
+    for i, c in enumerate(c for c in df.columns if c not in VOLATILE_COLUMNS):
+        kind, arr, extras = _column_to_array(df[c])
+        np.save(tmp_dir / f"{i:03d}.npy", arr, allow_pickle=False)
+        extra_files = {}
+        for name, extra in extras.items():
+            extra_files[name] = f"{i:03d}.{name}.npy"
+            np.save(tmp_dir / extra_files[name], extra, allow_pickle=False)
+        kinds[c] = [kind, f"{i:03d}.npy", extra_files]
+
+    # id: distingue esta gravação de outra na mesma pasta (ver array_store)
+    meta = {"version": CACHE_VERSION, "id": os.urandom(8).hex(), "columns": kinds, **(meta_extra or {})}
+    _write_meta(tmp_dir, meta)
+
+    old_dir = cache_dir.with_name(f"{cache_dir.name}.old-{os.getpid()}")
+    if cache_dir.exists():
+        os.replace(cache_dir, old_dir)
+    os.replace(tmp_dir, cache_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return cache_dir
+
+
+def load_prepared_cache(cache_dir: Path, meta: dict, mmap_mode=None) -> pd.DataFrame:
+    """
+    Lê a base do cache. mmap_mode="r" mapeia as colunas sem copiar.
+    """
+    cols = {}
+    for c, (kind, fname, extra_files) in meta["columns"].items():
+        arr = np.load(cache_dir / fname, mmap_mode=mmap_mode, allow_pickle=False)
+        extras = {name: np.load(cache_dir / f, allow_pickle=False) for name, f in extra_files.items()}
+        cols[c] = _array_to_column(kind, arr, extras)
+    df = pd.DataFrame(cols, copy=False)
+    if mmap_mode is not None:
+        # Índices de filtro desta versão gravam/mapeiam seus arrays aqui
+        df.attrs["array_store"] = (str(cache_dir), meta["id"])
+    return mark_atrasado(df)
+
+
+def array_store(location=None):
+    """
+    get(nome, build) -> array. Com location = df.attrs["array_store"]
+    (pasta e id do cache mapeado), o array fica em <pasta>/index/: o
+    primeiro processo calcula e grava, os outros (e as próximas subidas)
+    só mapeiam. O id no nome impede misturar arrays de outra gravação do
+    cache na mesma pasta. Sem location (ou sem escrita), só calcula.
+    """
+    if not location:
+        return lambda name, build: build()
+    cache_dir, cache_id = location
+    index_dir = Path(cache_dir) / "index"
+
+    def get(name: str, build) -> np.ndarray:
+        path = index_dir / f"{name}.{cache_id}.npy"
+        try:
+            return np.load(path, mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            pass
+        arr = np.ascontiguousarray(build())
+        try:
+            index_dir.mkdir(exist_ok=True)
+            tmp = index_dir / f"{name}.{cache_id}.tmp-{os.getpid()}-{threading.get_ident()}.npy"
+            np.save(tmp, arr, allow_pickle=False)
+            os.replace(tmp, path)
+            return np.load(path, mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            return arr
+
+    return get
+
+
+def load_cache_for_source(path, source: dict, compact: bool = False, mmap_mode=None):
+    """
+    Base do cache de `path` se ele foi gravado para a mesma origem
+    (meta["source"] == source) e no mesmo modo; senão None.
+    """
+    cache_dir = cache_dir_for(path)
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get("source") != source or meta.get("compact", False) != compact:
+        return None
+    try:
+        return load_prepared_cache(cache_dir, meta, mmap_mode=mmap_mode)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def find_valid_cache(path):
+    """
+    Retorna (cache_dir, meta) se o cache bate com a planilha; senão (None, sig).
+    Confere tamanho/mtime; se divergirem, confere o sha1 (ex.: git checkout
+    muda o mtime sem mudar o conteúdo).
+    """
+    sig = workbook_signature(path)
+    cache_dir = cache_dir_for(path)
+    meta = _read_meta(cache_dir)
+    if meta is None:
+        return None, sig
+
+    src = meta.get("source", {})
+    if src.get("size") == sig["size"] and src.get("mtime_ns") == sig["mtime_ns"]:
+        return cache_dir, meta
+
+    sig["sha1"] = file_sha1(path)
+    if src.get("sha1") == sig["sha1"]:
+        meta["source"] = sig
+        try:
+            _write_meta(cache_dir, meta)
+        except OSError:
+            pass
+        return cache_dir, meta
+    return None, sig
+
+
+def load_prepared_cached(path, compact: bool = False, mmap: bool = False, progress=None) -> tuple[pd.DataFrame, bool]:
+    """
+    Carrega a base preparada usando o cache em disco quando válido.
+    compact=True usa a representação compacta (data.compact_df).
+    mmap=True devolve as colunas mapeadas do cache (também logo após
+    reconstruí-lo), para serem divididas entre processos.
+    progress(linhas_lidas, total) acompanha a leitura da planilha.
+    Retorna (df, veio_do_cache).
+    """
+    mmap_mode = "r" if mmap else None
+    cache_dir, info = find_valid_cache(path)
+    if cache_dir is not None and info.get("compact", False) != compact:
+        cache_dir, info = None, workbook_signature(path)
+    if cache_dir is not None:
+        try:
+            return load_prepared_cache(cache_dir, info, mmap_mode=mmap_mode), True
+        except (OSError, ValueError, KeyError):
+            info = workbook_signature(path)
+
+    df = load_prepared_stream(path, compact=compact, progress=progress)
+
+    info.setdefault("sha1", file_sha1(path))
+    meta = {"source": info, "compact": compact}
+    try:
+        cache_dir = save_prepared_cache(df, path, meta)
+    except OSError:
+        # Disco somente leitura: segue sem cache
+        return df, False
+    if mmap:
+        df = load_prepared_cache(cache_dir, _read_meta(cache_dir), mmap_mode=mmap_mode)
+    return df, False
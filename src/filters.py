@@ -1,23 +1,60 @@
 """
 Opções e limites para filtros.
+- Limites de datas calculados uma vez por versão da base
+- Opções de cliente/OS/TAG/situação em cascata: cada lista só traz os
+  valores compatíveis com o que está selecionado nos outros filtros
+  (mapas de co-ocorrência, src/cooccurrence.py)
+- OS e TAG (muitos valores): só as primeiras OPTION_LIMIT opções vão ao
+  navegador; o resto aparece buscando pelo texto digitado no dropdown
 """
 
+import os
+
 import pandas as pd
 
+from src.cooccurrence import OPTION_COLUMNS, CooccurrenceIndex
+from src.data import date_values
+
+
+# Colunas com busca no servidor e quantas opções cada resposta leva
+SEARCH_COLUMNS = ["os_cliente", "tag"]
+OPTION_LIMIT = int(os.environ.get("OPTION_LIMIT", "50"))
+
+# Opção desabilitada no fim da lista quando há mais resultados
+MORE_VALUE = "__mais__"
+
 
-def build_filter_options_and_bounds(df: pd.DataFrame):
-    clientes = sorted([x for x in df["cliente"].unique() if x])
-    os_list = sorted([x for x in df["os_cliente"].unique() if x])
-    tag_list = sorted([x for x in df["tag"].unique() if x])
-    situacoes = sorted([x for x in df["situacao_desenho"].unique() if x])
+def opt(vals):
+    return [{"label": v, "value": v} for v in vals]
 
-    def opt(vals):
-        return [{"label": v, "value": v} for v in vals]
 
-    receb_min = pd.to_datetime(df["dt_receb"].min(), errors="coerce")
-    receb_max = pd.to_datetime(df["dt_receb"].max(), errors="coerce")
-    exp_min = pd.to_datetime(df["dt_exped"].min(), errors="coerce")
-    exp_max = pd.to_datetime(df["dt_exped"].max(), errors="coerce")
+def _searched_options(cooc: CooccurrenceIndex, col: str, selected: dict, text: str, limit: int) -> list[dict]:
+    """
+    Selecionados + até `limit` valores que batem com o texto; avisa
+    quantos ficaram de fora.
+    """
+    values, total = cooc.search_values(col, text, selected, limit)
+    chosen = [v for v in (selected.get(col) or []) if v not in set(values)]
+    options = opt(chosen) + opt(values)
+    if total > len(values):
+        options.append({
+            "label": f"… mais {total - len(values):,} — digite para buscar".replace(",", "."),
+            "value": MORE_VALUE,
+            "disabled": True,
+        })
+    return options
+
+
+def build_filter_bounds(df: pd.DataFrame):
+    """
+    (receb_min, receb_max, exp_min, exp_max, defaults) dos DatePickerRange.
+    """
+    receb = date_values(df["dt_receb"])
+    exped = date_values(df["dt_exped"])
+    receb_min = pd.to_datetime(receb.min(), errors="coerce")
+    receb_max = pd.to_datetime(receb.max(), errors="coerce")
+    exp_min = pd.to_datetime(exped.min(), errors="coerce")
+    exp_max = pd.to_datetime(exped.max(), errors="coerce")
 
     receb_min = receb_min.date() if pd.notna(receb_min) else None
     receb_max = receb_max.date() if pd.notna(receb_max) else None
@@ -26,14 +63,20 @@ def build_filter_options_and_bounds(df: pd.DataFrame):
 
     defaults = {"dt_defaults": [None, None, None, None]}
 
-    return (
-        opt(clientes),
-        opt(os_list),
-        opt(tag_list),
-        opt(situacoes),
-        receb_min,
-        receb_max,
-        exp_min,
-        exp_max,
-        defaults,
-    )
+    return receb_min, receb_max, exp_min, exp_max, defaults
+
+
+def build_cascading_options(cooc: CooccurrenceIndex, selected: dict, columns=OPTION_COLUMNS,
+                            search: dict | None = None, limit: int = OPTION_LIMIT) -> dict:
+    """
+    Opções de cada coluna em `columns` dadas as seleções atuais
+    ({coluna: valores}) e o texto buscado em OS/TAG ({coluna: texto}).
+    """
+    search = search or {}
+    out = {}
+    for col in columns:
+        if col in SEARCH_COLUMNS:
+            out[col] = _searched_options(cooc, col, selected, search.get(col), limit)
+        else:
+            out[col] = opt(cooc.option_values(col, selected))
+    return out
@@ -0,0 +1,184 @@
+"""
+Índices de filtro construídos uma vez por versão do dataset:
+- Colunas categóricas (cliente, OS, TAG, situação) como códigos inteiros
+- Datas (recebimento/expedição) em arrays ordenados -> busca binária
+- desenho_pai: índice de substring (src/search.py) sobre os valores distintos
+- Base mapeada do cache em disco: colunas categóricas usam os próprios
+  códigos mapeados e os arrays por linha (datas ordenadas, linhas por
+  desenho) vêm de src.disk_cache.array_store, divididos entre os workers
+
+Os filtros viram uma única máscara booleana e um único take posicional.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.data import date_values, day_bounds
+from src.disk_cache import array_store
+from src.search import SubstringIndex
+
+
+CATEGORY_FILTERS = {
+    "clientes": "cliente",
+    "os_values": "os_cliente",
+    "tag_values": "tag",
+    "situacoes": "situacao_desenho",
+}
+
+DATE_FILTERS = {
+    "dt_receb_range": "dt_receb",
+    "dt_exped_range": "dt_exped",
+}
+
+_NAT = np.iinfo("int64").min
+
+
+def _encode(s: pd.Series):
+    """
+    (códigos inteiros, valores distintos, valor -> código)
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Sem nulos nem categorias sem uso: os códigos da própria coluna
+        # servem (sem cópia; mapeados do disco quando a base é mapeada)
+        codes = s.array.codes
+        uniques = [str(c) for c in s.cat.categories]
+        if len(set(uniques)) == len(uniques) and (
+            len(codes) == 0 or (codes.min() >= 0 and np.bincount(codes, minlength=len(uniques)).all())
+        ):
+            return codes, uniques, {u: i for i, u in enumerate(uniques)}
+    codes, uniques = pd.factorize(s.astype("string").fillna(""), sort=False)
+    uniques = [str(u) for u in uniques]
+    return codes.astype("int32"), uniques, {u: i for i, u in enumerate(uniques)}
+
+
+class SortedDates:
+    """
+    Datas de uma coluna ordenadas (sem NaT) + posição original de cada uma.
+    arrays: src.disk_cache.array_store (None = só calcula).
+    """
+
+    def __init__(self, s: pd.Series, arrays=None):
+        arrays = arrays or array_store()
+
+        def values():
+            return date_values(s).to_numpy(dtype="datetime64[ns]").view("int64")
+
+        def order():
+            v = values()
+            valid = np.flatnonzero(v != _NAT)
+            return valid[np.argsort(v[valid], kind="stable")].astype("int64")
+
+        self.order = arrays(f"{s.name}.order", order)
+        self.sorted = arrays(f"{s.name}.sorted", lambda: values()[self.order])
+
+    def positions(self, start=None, end=None) -> np.ndarray:
+        start, end = day_bounds(start, end)
+        lo, hi = 0, len(self.sorted)
+        if start is not None:
+            lo = int(np.searchsorted(self.sorted, _to_ns(start), side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(self.sorted, _to_ns(end), side="left"))
+        return self.order[lo:hi] if lo < hi else self.order[:0]
+
+
+def _to_ns(value) -> int:
+    return int(pd.Timestamp(value).as_unit("ns").value)
+
+
+class FilterIndex:
+    """
+    Índice de filtros de um DataFrame preparado (imutável após construção).
+    arrays: src.disk_cache.array_store (None = só calcula).
+    """
+
+    def __init__(self, df: pd.DataFrame, arrays=None):
+        self.n = len(df)
+        self._arrays = arrays or array_store()
+
+        self.codes = {}
+        self.lookup = {}
+        for col in CATEGORY_FILTERS.values():
+            self.codes[col], _, self.lookup[col] = _encode(df[col])
+
+        self.dates = {col: SortedDates(df[col], self._arrays) for col in DATE_FILTERS.values()}
+
+        self._desenho_col = df["desenho_pai"]
+        self._desenho = None
+
+    @property
+    def desenho(self) -> SubstringIndex:
+        """
+        Índice de substring do desenho_pai (construído na primeira busca).
+        """
+        if self._desenho is None:
+            codes, uniques, _ = _encode(self._desenho_col)
+            rows = self._arrays("desenho_pai.rows", lambda: np.argsort(codes, kind="stable").astype("int64"))
+            self._desenho = SubstringIndex([u.lower() for u in uniques], codes, rows=rows)
+        return self._desenho
+
+    def _category_mask(self, col: str, values) -> np.ndarray:
+        lookup = self.lookup[col]
+        wanted = np.zeros(len(lookup) + 1, dtype=bool)
+        for v in values:
+            code = lookup.get(v)
+            if code is not None:
+                wanted[code] = True
+        return wanted[self.codes[col]]
+
+    def _date_mask(self, col: str, start, end) -> np.ndarray:
+        m = np.zeros(self.n, dtype=bool)
+        m[self.dates[col].positions(start, end)] = True
+        return m
+
+    def _desenho_mask(self, text: str) -> np.ndarray:
+        m = np.zeros(self.n, dtype=bool)
+        m[self.desenho.match_rows(text)] = True
+        return m
+
+    def mask(
+        self,
+        clientes=None,
+        os_values=None,
+        tag_values=None,
+        situacoes=None,
+        dt_receb_range=None,
+        dt_exped_range=None,
+        desenho_text=None,
+    ) -> np.ndarray | None:
+        """
+        Máscara combinada de todos os filtros ativos (None = sem filtro).
+        Mesma semântica de apply_filters.
+        """
+        masks = []
+        selected = {
+            "clientes": clientes,
+            "os_values": os_values,
+            "tag_values": tag_values,
+            "situacoes": situacoes,
+        }
+        for arg, col in CATEGORY_FILTERS.items():
+            if selected[arg]:
+                masks.append(self._category_mask(col, selected[arg]))
+
+        ranges = {"dt_receb_range": dt_receb_range, "dt_exped_range": dt_exped_range}
+        for arg, col in DATE_FILTERS.items():
+            rng = ranges[arg]
+            if rng and len(rng) == 2 and (rng[0] or rng[1]):
+                masks.append(self._date_mask(col, rng[0], rng[1]))
+
+        if desenho_text:
+            masks.append(self._desenho_mask(desenho_text))
+
+        if not masks:
+            return None
+        out = masks[0]
+        for m in masks[1:]:
+            out &= m
+        return out
+
+    def positions(self, **filters) -> np.ndarray | None:
+        """
+        Posições (iloc) das linhas filtradas (None = todas as linhas).
+        """
+        m = self.mask(**filters)
+        return None if m is None else np.flatnonzero(m)
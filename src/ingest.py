@@ -0,0 +1,243 @@
+"""
+Leitura da planilha em streaming (bases consolidadas muito grandes):
+- openpyxl em modo read_only, linha a linha, sem montar a aba inteira
+- Aba CONSOLIDADO; sem ela, todas as abas com cabeçalhos conhecidos
+  (coluna "aba" guarda de qual aba veio cada linha)
+- Só as colunas conhecidas (COL_MAP) são guardadas
+- A cada bloco de linhas: padroniza, converte tipos e calcula as derivadas
+  (mesmas regras de prepare_df) e copia para colunas pré-alocadas
+- Texto vira códigos + dicionário já na leitura
+- Pico de memória perto do tamanho da base final
+- Contador de progresso via callback progress(linhas_lidas, total)
+- openpyxl só é importado na primeira leitura (subida mais rápida quando
+  a base vem do cache)
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.data import (
+    COL_MAP, DATASET_COLUMNS, DATE_COLUMNS, STAGE_DTYPE, CATEGORY_MAX_RATIO,
+    normalize_col, standardize_df, derive_columns, mark_atrasado, compact_column, concat_prepared,
+)
+from src.metrics import timed
+
+
+CHUNK_ROWS = 20_000
+
+TEXT_COLUMNS = ["cliente", "os_cliente", "tag", "situacao_desenho", "desenho_pai", "descricao"]
+FLOAT_COLUMNS = [
+    "peso_total_kg", "peso_exped_kg",
+    "prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg",
+    "produzido_kg", "saldo_a_produzir_kg", "saldo_a_expedir_kg", "leadtime_dias",
+]
+
+
+def progress_text(done: int, total: int | None, unit: str = "linhas") -> str:
+    """
+    Texto do load-status durante a leitura.
+    """
+    if total:
+        return f"⏳ Lendo planilha: {done:,} de {total:,} {unit} ({100 * done // total}%)"
+    return f"⏳ Lendo planilha: {done:,} {unit}"
+
+
+def _open_workbook(path):
+    from openpyxl import load_workbook
+
+    return load_workbook(path, read_only=True, data_only=True)
+
+
+def _has_known_header(ws) -> bool:
+    header = next(ws.iter_rows(max_row=1, values_only=True), ())
+    return any(c is not None and normalize_col(c) in COL_MAP for c in header)
+
+
+def data_sheets(path) -> list[str]:
+    """
+    Abas lidas da planilha: CONSOLIDADO se existir; senão todas as abas
+    com algum cabeçalho conhecido (ou a primeira, se nenhuma tiver).
+    """
+    wb = _open_workbook(path)
+    try:
+        if "CONSOLIDADO" in wb.sheetnames:
+            return ["CONSOLIDADO"]
+        sheets = [ws.title for ws in wb.worksheets if _has_known_header(ws)]
+        return sheets or wb.sheetnames[:1]
+    finally:
+        wb.close()
+
+
+def iter_excel_chunks(path, sheet: str, chunk_rows: int = CHUNK_ROWS, progress=None):
+    """
+    Lê a aba em blocos de chunk_rows linhas.
+    Gera DataFrames "crus" (cabeçalhos normalizados, só colunas do COL_MAP).
+    Linhas vazias no fim da aba são ignoradas, como no pd.read_excel.
+    """
+    wb = _open_workbook(path)
+    try:
+        ws = wb[sheet]
+        rows = ws.iter_rows(values_only=True)
+        header = [normalize_col(c) if c is not None else "" for c in next(rows, ())]
+        # Primeira ocorrência de cada cabeçalho conhecido
+        keep = {}
+        for i, c in enumerate(header):
+            if c in COL_MAP and c not in keep:
+                keep[c] = i
+        names, idx = list(keep), list(keep.values())
+        total = (ws.max_row - 1) if ws.max_row else None
+
+        done = 0
+        buf, blanks = [], []
+        for row in rows:
+            if not any(v is not None for v in row):
+                # Só entra se aparecer outra linha com dados depois
+                blanks.append(row)
+                continue
+            if blanks:
+                buf.extend(blanks)
+                blanks = []
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                done += len(buf)
+                yield _chunk_frame(buf, names, idx)
+                buf = []
+                if progress is not None:
+                    progress(done, total)
+        if buf:
+            done += len(buf)
+            yield _chunk_frame(buf, names, idx)
+        if progress is not None:
+            progress(done, done)
+    finally:
+        wb.close()
+
+
+def _chunk_frame(rows, names, idx) -> pd.DataFrame:
+    width = max(idx, default=-1) + 1
+    cols = {c: [None] * len(rows) for c in names}
+    for r, row in enumerate(rows):
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        for c, i in zip(names, idx):
+            cols[c][r] = row[i]
+    return pd.DataFrame(cols, columns=names)
+
+
+def _sheet_column(sheet: str, n: int) -> pd.Series:
+    return pd.Series(pd.Categorical.from_codes(np.zeros(n, dtype="int8"), categories=[sheet]))
+
+
+@timed("read_excel_stream")
+def read_excel_stream(path, progress=None) -> pd.DataFrame:
+    """
+    Equivalente a load_excel_local (só as colunas usadas, + coluna "aba"),
+    lido em streaming.
+    """
+    frames = []
+    for sheet in data_sheets(path):
+        chunks = list(iter_excel_chunks(path, sheet, progress=progress))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        frames.append(df.assign(aba=_sheet_column(sheet, len(df))))
+    df = pd.concat(frames, ignore_index=True)
+    df["aba"] = df["aba"].astype("category")
+    return df
+
+
+class _ColumnBuffers:
+    """
+    Colunas pré-alocadas da base preparada, preenchidas bloco a bloco.
+    Crescem (dobrando) se a aba tiver mais linhas que o previsto.
+    """
+
+    def __init__(self, capacity: int):
+        self.n = 0
+        self.capacity = max(1, capacity)
+        self.arrays = {c: np.empty(self.capacity, dtype="float64") for c in FLOAT_COLUMNS}
+        self.arrays.update({c: np.empty(self.capacity, dtype="datetime64[us]") for c in DATE_COLUMNS})
+        self.arrays.update({c: np.empty(self.capacity, dtype="int32") for c in TEXT_COLUMNS})
+        self.arrays["etapa_atual"] = np.empty(self.capacity, dtype="int8")
+        self.vocab = {c: {} for c in TEXT_COLUMNS}
+
+    def _reserve(self, extra: int):
+        if self.n + extra <= self.capacity:
+            return
+        self.capacity = max(self.n + extra, 2 * self.capacity)
+        for c, arr in self.arrays.items():
+            grown = np.empty(self.capacity, dtype=arr.dtype)
+            grown[:self.n] = arr[:self.n]
+            self.arrays[c] = grown
+
+    def _codes(self, c: str, s: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(s.to_numpy(dtype=object))
+        vocab = self.vocab[c]
+        lut = np.fromiter((vocab.setdefault(u, len(vocab)) for u in uniques), dtype="int32", count=len(uniques))
+        return lut[codes]
+
+    def append(self, df: pd.DataFrame):
+        m = len(df)
+        self._reserve(m)
+        sl = slice(self.n, self.n + m)
+        for c in FLOAT_COLUMNS:
+            self.arrays[c][sl] = df[c].to_numpy(dtype="float64", na_value=np.nan)
+        for c in DATE_COLUMNS:
+            self.arrays[c][sl] = df[c].to_numpy(dtype="datetime64[us]")
+        for c in TEXT_COLUMNS:
+            self.arrays[c][sl] = self._codes(c, df[c])
+        self.arrays["etapa_atual"][sl] = df["etapa_atual"].cat.codes.to_numpy()
+        self.n += m
+
+    def _text_column(self, c: str, compact: bool) -> pd.Series:
+        codes = self.arrays.pop(c)[:self.n]
+        values = np.array(list(self.vocab.pop(c)), dtype=object)
+        if compact and len(values) <= CATEGORY_MAX_RATIO * max(1, self.n):
+            # Mesmas categorias (ordenadas) de compact_column, sem passar por texto
+            order = np.argsort(values, kind="stable")
+            rank = np.empty(len(values), dtype="int32")
+            rank[order] = np.arange(len(values), dtype="int32")
+            cats = pd.Index(values[order], dtype="string")
+            return pd.Series(pd.Categorical.from_codes(rank[codes], categories=cats))
+        return pd.Series(pd.array(values[codes], dtype="string"))
+
+    def to_frame(self, compact: bool = False) -> pd.DataFrame:
+        cols = {}
+        for c in DATASET_COLUMNS:
+            if c == "atrasado":
+                continue
+            if c in TEXT_COLUMNS:
+                s = self._text_column(c, compact)
+            elif c == "etapa_atual":
+                s = pd.Series(pd.Categorical.from_codes(self.arrays.pop(c)[:self.n], dtype=STAGE_DTYPE))
+            else:
+                s = pd.Series(self.arrays.pop(c)[:self.n])
+                if compact:
+                    s = compact_column(c, s)
+            cols[c] = s
+        df = mark_atrasado(pd.DataFrame(cols, copy=False))
+        return df[DATASET_COLUMNS]
+
+
+def _sheet_rows(path, sheet: str) -> int:
+    wb = _open_workbook(path)
+    try:
+        return (wb[sheet].max_row or 1) - 1
+    finally:
+        wb.close()
+
+
+@timed("load_prepared_stream")
+def load_prepared_stream(path, compact: bool = False, chunk_rows: int = CHUNK_ROWS, progress=None) -> pd.DataFrame:
+    """
+    Base preparada direto da planilha, bloco a bloco (mesmo resultado de
+    prepare_df(load_excel_local(path))[DATASET_COLUMNS], ou compact_df dele),
+    com a coluna "aba".
+    """
+    frames = []
+    for sheet in data_sheets(path):
+        cols = _ColumnBuffers(_sheet_rows(path, sheet))
+        for chunk in iter_excel_chunks(path, sheet, chunk_rows=chunk_rows, progress=progress):
+            cols.append(derive_columns(standardize_df(chunk)))
+        df = cols.to_frame(compact=compact)
+        df["aba"] = _sheet_column(sheet, len(df))
+        frames.append(df)
+    return concat_prepared(frames, compact=compact)
@@ -5,6 +5,9 @@ KPIs, insights automáticos e tabela (kg sem casas decimais).
 import pandas as pd
 from dash import html
 
+from src.data import date_values
+from src.summary import StageSummary, compute_stage_summary
+
 
 def fmt_kg(x):
     """
@@ -27,8 +30,14 @@ def make_kpi_card(title, value, subtitle=None):
     )
 
 
-def compute_kpis(df: pd.DataFrame | None):
-    if df is None or len(df) == 0:
+def _is_empty(df, summary) -> bool:
+    if summary is not None:
+        return summary.n_rows == 0
+    return df is None or len(df) == 0
+
+
+def compute_kpis(df: pd.DataFrame | None, summary: StageSummary | None = None):
+    if _is_empty(df, summary):
         return [
             make_kpi_card("Peso Total", "-", "∑ Peso total do escopo (kg)"),
             make_kpi_card("Peso Produzido", "-", "∑ Última etapa atingida (kg)"),
@@ -40,18 +49,18 @@ def compute_kpis(df: pd.DataFrame | None):
             make_kpi_card("Lead Time Médio", "-", "Expedição − Recebimento (dias)"),
         ]
 
-    total = df["peso_total_kg"].sum()
-    produzido = df["produzido_kg"].sum()
-    exped = df["peso_exped_kg"].sum()
+    summary = summary or compute_stage_summary(df)
+    total = summary.total_kg
+    produzido = summary.produzido_kg
+    exped = summary.exped_kg
 
-    saldo_prod = max(0.0, total - produzido)
-    saldo_exped = max(0.0, produzido - exped)
+    saldo_prod = summary.saldo_a_produzir_kg
+    saldo_exped = summary.saldo_a_expedir_kg
 
     pct_avanco = (produzido / total) if total > 0 else 0.0
     pct_exped = (exped / total) if total > 0 else 0.0
 
-    lt = df.loc[df["leadtime_dias"].notna() & (df["leadtime_dias"] >= 0), "leadtime_dias"]
-    lt_mean = float(lt.mean()) if len(lt) else None
+    lt_mean = summary.leadtime_mean
 
     pct_avanco_s = f"{pct_avanco*100:,.1f}%".replace(",", "X").replace(".", ",").replace("X", ".")
     pct_exped_s = f"{pct_exped*100:,.1f}%".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -69,24 +78,26 @@ def compute_kpis(df: pd.DataFrame | None):
     ]
 
 
-def build_insights(df: pd.DataFrame):
-    if df is None or len(df) == 0:
+def build_insights(df: pd.DataFrame, summary: StageSummary | None = None, os_wip: pd.Series | None = None):
+    """
+    os_wip: saldo a expedir por OS (já somado, ex.: pelo cubo); senão vem de df.
+    """
+    if _is_empty(df, summary):
         return "Sem dados suficientes."
 
-    total = df["peso_total_kg"].sum()
-    produzido = df["produzido_kg"].sum()
-    exped = df["peso_exped_kg"].sum()
-    wip = max(0.0, produzido - exped)
-    backlog = max(0.0, total - produzido)
+    summary = summary or compute_stage_summary(df)
+    wip = summary.saldo_a_expedir_kg
+    backlog = summary.saldo_a_produzir_kg
 
-    atraso = df.loc[df["atrasado"], "peso_total_kg"].sum()
+    atraso = summary.atraso_kg
 
-    wip_only = df[df["etapa_atual"].isin(["Preparação", "Montagem", "Solda", "Acabamento", "Pintura (pronto p/ expedir)", "Não iniciado"])]
-    bottleneck = wip_only.groupby("etapa_atual")["peso_total_kg"].sum().sort_values(ascending=False)
+    bottleneck = summary.stage_kg.drop("Expedido", errors="ignore").sort_values(ascending=False)
     bottleneck_stage = bottleneck.index[0] if len(bottleneck) else "-"
     bottleneck_kg = float(bottleneck.iloc[0]) if len(bottleneck) else 0.0
 
-    os_wip = df.groupby("os_cliente")["saldo_a_expedir_kg"].sum().sort_values(ascending=False)
+    if os_wip is None:
+        os_wip = df.groupby("os_cliente", observed=True)["saldo_a_expedir_kg"].sum()
+    os_wip = os_wip.sort_values(ascending=False)
     os_wip_name = os_wip.index[0] if len(os_wip) else "-"
     os_wip_kg = float(os_wip.iloc[0]) if len(os_wip) else 0.0
 
@@ -99,31 +110,56 @@ def build_insights(df: pd.DataFrame):
     ])
 
 
-def build_table_payload(df: pd.DataFrame):
-    cols = [
-        "cliente", "os_cliente", "tag", "situacao_desenho",
-        "desenho_pai",
-        "peso_total_kg", "produzido_kg", "peso_exped_kg",
-        "saldo_a_produzir_kg", "saldo_a_expedir_kg",
-        "etapa_atual",
-        "dt_receb", "dt_entrega", "dt_exped",
-        "leadtime_dias", "atrasado"
-    ]
+TABLE_COLUMNS = [
+    "cliente", "os_cliente", "tag", "situacao_desenho",
+    "desenho_pai",
+    "peso_total_kg", "produzido_kg", "peso_exped_kg",
+    "saldo_a_produzir_kg", "saldo_a_expedir_kg",
+    "etapa_atual",
+    "dt_receb", "dt_entrega", "dt_exped",
+    "leadtime_dias", "atrasado"
+]
+TABLE_WEIGHT_COLUMNS = ["peso_total_kg", "produzido_kg", "peso_exped_kg", "saldo_a_produzir_kg", "saldo_a_expedir_kg"]
+TABLE_DATE_COLUMNS = ["dt_receb", "dt_entrega", "dt_exped"]
+
 
-    tmp = df.copy()
-    for c in cols:
-        if c not in tmp.columns:
-            tmp[c] = pd.NA
+def table_columns():
+    """
+    Colunas da DataTable (tipo numérico/data habilita os filtros por coluna).
+    """
+    def col_type(c):
+        if c in TABLE_WEIGHT_COLUMNS or c == "leadtime_dias":
+            return "numeric"
+        if c in TABLE_DATE_COLUMNS:
+            return "datetime"
+        return "text"
 
-    out = tmp[cols].copy()
+    return [{"name": c, "id": c, "type": col_type(c)} for c in TABLE_COLUMNS]
+
+
+def format_table_rows(df: pd.DataFrame):
+    """
+    Formata só as linhas recebidas (uma página) para a DataTable.
+    """
+    out = pd.DataFrame(index=df.index)
+    for c in TABLE_COLUMNS:
+        out[c] = df[c] if c in df.columns else pd.NA
 
     # Formata pesos como inteiro sem decimais
-    for c in ["peso_total_kg", "produzido_kg", "peso_exped_kg", "saldo_a_produzir_kg", "saldo_a_expedir_kg"]:
+    for c in TABLE_WEIGHT_COLUMNS:
         out[c] = out[c].map(lambda v: str(int(round(float(v)))) if pd.notna(v) else "")
 
-    for c in ["dt_receb", "dt_entrega", "dt_exped"]:
-        out[c] = pd.to_datetime(out[c], errors="coerce").dt.strftime("%Y-%m-%d")
+    for c in TABLE_DATE_COLUMNS:
+        out[c] = pd.to_datetime(date_values(out[c]), errors="coerce").dt.strftime("%Y-%m-%d")
+
+    out["etapa_atual"] = out["etapa_atual"].astype("string")
+    return out.to_dict("records")
 
-    data = out.head(300).to_dict("records")
-    columns = [{"name": c, "id": c} for c in out.columns]
+
+def build_table_payload(df: pd.DataFrame):
+    """
+    Amostra fixa (300 primeiras linhas) — a tabela do app usa src/table.py.
+    """
+    data = format_table_rows(df.head(300))
+    columns = [{"name": c, "id": c} for c in TABLE_COLUMNS]
     return data, columns
@@ -6,24 +6,35 @@ Filtros:
 - TAG (dropdown multi)
 - Situação do desenho (dropdown multi)
 - Datas Recebimento/Expedição (range)
-- Desenho PAI contém (texto)
+- Desenho PAI contém (texto, só envia depois de uma pausa na digitação)
 Botão: Limpar filtros
 """
 
 from dash import dcc, html, dash_table
 
+from src.insights import table_columns
+from src.pipeline import DESENHO_DEBOUNCE_S, FILTER_BATCH_MS
+from src.timeseries import DEFAULT_GRANULARITY, GRANULARITIES
+
 
 def build_layout():
     return html.Div(
         id="app-root",
         className="theme-light",
         children=[
-            dcc.Store(id="store-df"),
+            dcc.Store(id="store-df"),  # chave do dataset em memória (src/cache.py)
+            dcc.Store(id="store-filtered"),  # chave do recorte filtrado (src/memo.py)
             dcc.Store(id="store-theme", data="light"),
             dcc.Store(id="store-filter-defaults"),
+            # Estado atual dos filtros desta aba ({session, seq}; src/pipeline.py)
+            dcc.Store(id="store-filter-seq", data={"seq": 0, "batch_ms": FILTER_BATCH_MS}),
+
+            # Disparador de inicialização: repete até a base (carregada em
+            # segundo plano) ficar pronta; init_data o desliga
+            dcc.Interval(id="page-load", interval=500, n_intervals=0),
 
-            # Disparador de inicialização (1x)
-            dcc.Interval(id="page-load", interval=500, n_intervals=0, max_intervals=1),
+            # Confere se o servidor recarregou uma versão nova da planilha
+            dcc.Interval(id="reload-poll", interval=30_000, n_intervals=0),
 
             html.Div(
                 className="topbar",
@@ -92,7 +103,8 @@ def build_layout():
                     ]),
                     html.Div(className="filter", children=[
                         html.Label("Desenho PAI contém"),
-                        dcc.Input(id="f-desenho", type="text", placeholder="Ex: 71989390", className="text-input"),
+                        dcc.Input(id="f-desenho", type="text", placeholder="Ex: 71989390", className="text-input",
+                                  debounce=DESENHO_DEBOUNCE_S),
                     ]),
                     html.Div(className="filter", children=[
                         html.Label("Ações"),
@@ -123,6 +135,14 @@ def build_layout():
                 children=[
                     html.Div(className="panel", children=[
                         html.H3("Série Temporal — Recebido vs Expedido (kg)"),
+                        dcc.RadioItems(
+                            id="ts-granularity",
+                            options=[{"label": label, "value": value} for value, label in GRANULARITIES.items()],
+                            value=DEFAULT_GRANULARITY,
+                            inline=True,
+                            className="granularity",
+                            inputStyle={"margin-right": "4px"},
+                        ),
                         dcc.Graph(id="g-timeseries"),
                     ]),
                     html.Div(className="panel", children=[
@@ -154,10 +174,20 @@ def build_layout():
                         html.Div(id="insights", className="insights-box"),
                     ]),
                     html.Div(className="panel", children=[
-                        html.H3("Tabela — Itens filtrados (amostra)"),
+                        html.H3("Tabela — Itens filtrados"),
+                        html.Div(id="tbl-count", className="subtitle"),
+                        # Paginação, ordenação e filtro por coluna no servidor (src/table.py)
                         dash_table.DataTable(
                             id="tbl",
+                            columns=table_columns(),
+                            page_action="custom",
+                            page_current=0,
                             page_size=12,
+                            sort_action="custom",
+                            sort_mode="multi",
+                            sort_by=[],
+                            filter_action="custom",
+                            filter_query="",
                             style_table={"overflowX": "auto"},
                             style_cell={"minWidth": "120px", "width": "120px", "maxWidth": "260px", "whiteSpace": "normal"},
                             style_header={"fontWeight": "bold"},
@@ -0,0 +1,81 @@
+"""
+LRUCache genérico (limite de itens, contadores de hit/miss, thread-safe).
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Dicionário com limite de itens e descarte do menos usado recentemente.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = max(1, int(maxsize))
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def pop(self, key, default=None):
+        """
+        Retira e retorna o valor (sem contar hit/miss).
+        """
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def get_or_create(self, key, factory):
+        """
+        Retorna o valor em cache ou cria com factory() e guarda.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = factory()
+        return self.put(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
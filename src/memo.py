@@ -0,0 +1,221 @@
+"""
+Memoização por estado de filtro:
+- Chave = (versão do dataset, filtros normalizados)
+- Guarda o recorte filtrado e tudo que é derivado dele (KPIs, figuras,
+  insights, tabela), com LRU e contadores de hit/miss
+- Trocar o tema ou voltar a uma combinação de filtros já vista
+  re-renderiza do cache, sem rodar pandas de novo
+- Agregados (resumo por etapa, somas por OS, série temporal) vêm do cubo
+  (src/cube.py) quando os filtros cabem no grão dele; as linhas filtradas
+  só são montadas quando alguém precisa delas (tabela, lead time)
+- Cada consulta registra quem a respondeu ("cube" ou "rows")
+"""
+
+import logging
+import os
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from src.cache import get_cube, get_dataset, get_filter_index
+from src.charts import os_totals
+from src.cube import StageCube
+from src.data import apply_filters
+from src.lru import LRUCache
+from src.metrics import count_rows, span
+from src.summary import StageSummary, compute_stage_summary
+from src.timeseries import DEFAULT_GRANULARITY, GRANULARITIES, timeseries_kg
+
+
+log = logging.getLogger(__name__)
+
+# Quantas consultas cada caminho respondeu (cube/rows)
+_path_counts = Counter()
+_path_lock = threading.Lock()
+
+
+def _norm_values(values) -> tuple:
+    return tuple(sorted({str(v) for v in (values or [])}))
+
+
+def _norm_date(value):
+    if not value:
+        return None
+    ts = pd.to_datetime(value, errors="coerce")
+    return None if pd.isna(ts) else ts.isoformat()
+
+
+def _norm_range(rng) -> tuple:
+    if not rng or len(rng) != 2:
+        return (None, None)
+    return (_norm_date(rng[0]), _norm_date(rng[1]))
+
+
+def normalize_filters(
+    clientes=None,
+    os_values=None,
+    tag_values=None,
+    situacoes=None,
+    dt_receb_range=None,
+    dt_exped_range=None,
+    desenho_text=None,
+) -> tuple:
+    """
+    Tupla canônica dos filtros (ordem dos itens e espaços não importam).
+    """
+    return (
+        _norm_values(clientes),
+        _norm_values(os_values),
+        _norm_values(tag_values),
+        _norm_values(situacoes),
+        _norm_range(dt_receb_range),
+        _norm_range(dt_exped_range),
+        str(desenho_text or "").strip().lower(),
+    )
+
+
+def filters_from_key(norm: tuple) -> dict:
+    """
+    kwargs de apply_filters a partir da tupla normalizada.
+    """
+    clientes, os_values, tag_values, situacoes, receb, exped, desenho = norm
+    return {
+        "clientes": list(clientes),
+        "os_values": list(os_values),
+        "tag_values": list(tag_values),
+        "situacoes": list(situacoes),
+        "dt_receb_range": list(receb),
+        "dt_exped_range": list(exped),
+        "desenho_text": desenho,
+    }
+
+
+class FilterResult:
+    """
+    Recorte filtrado de um dataset + agregados derivados (memoizados).
+    """
+
+    def __init__(self, dataset_key: str, filters: tuple, df_builder, cube: StageCube | None = None):
+        self.dataset_key = dataset_key
+        self.filters = filters
+        self.values = LRUCache(maxsize=int(os.environ.get("RESULT_VALUES_SIZE", "32")))
+        # Cubo só quando os filtros cabem no grão dele (senão None)
+        self.cube = cube
+        self.paths = {}
+        self._df_builder = df_builder
+        self._df = None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        Linhas filtradas (montadas na primeira vez que alguém precisa).
+        """
+        if self._df is None:
+            self._df = self._df_builder()
+        return self._df
+
+    def get(self, name, builder):
+        """
+        Valor derivado `name` (ex.: ("funnel", template)); builder() só
+        roda na primeira vez.
+        """
+        return self.values.get_or_create(name, builder)
+
+    def _query(self, name: str, from_cube, from_rows):
+        """
+        Responde pelo cubo quando possível; senão pelas linhas filtradas.
+        """
+        def build():
+            if self.cube is not None:
+                path = "cube"
+                with span("query", query=name, path=path):
+                    m = self.get("cube_mask", lambda: self.cube.mask(**filters_from_key(self.filters)))
+                    value = from_cube(self.cube, m)
+            else:
+                path = "rows"
+                rows = self.df
+                with span("query", query=name, path=path):
+                    value = from_rows(rows)
+            self.paths[name] = path
+            with _path_lock:
+                _path_counts[path] += 1
+            log.debug("%s respondido por %s", name, path)
+            return value
+
+        return self.get(name, build)
+
+    def summary(self) -> StageSummary:
+        return self._query("summary", StageCube.summary, compute_stage_summary)
+
+    def os_totals(self) -> pd.DataFrame:
+        return self._query("os_totals", StageCube.os_totals, os_totals)
+
+    def timeseries(self, granularity: str | None = None):
+        """
+        (recebido, expedido) por dia, semana ou mês.
+        """
+        if granularity not in GRANULARITIES:
+            granularity = DEFAULT_GRANULARITY
+        return self._query(
+            f"timeseries:{granularity}",
+            lambda cube, m: cube.timeseries(m, granularity),
+            lambda rows: timeseries_kg(rows, granularity),
+        )
+
+
+RESULTS = LRUCache(maxsize=int(os.environ.get("RESULT_CACHE_SIZE", "32")))
+
+
+def get_filter_result(dataset_key: str | None, **filters) -> FilterResult | None:
+    """
+    Recorte filtrado (memoizado) do dataset para os filtros informados.
+    """
+    df = get_dataset(dataset_key)
+    if df is None:
+        return None
+
+    norm = normalize_filters(**filters)
+
+    def build():
+        kwargs = filters_from_key(norm)
+        cube = get_cube(dataset_key)
+
+        def build_rows():
+            with span("filter"):
+                rows = apply_filters(df, index=get_filter_index(dataset_key), **kwargs)
+            count_rows("filter", len(df), len(rows))
+            return rows
+
+        return FilterResult(
+            dataset_key,
+            norm,
+            build_rows,
+            cube=cube if cube is not None and cube.fits(**kwargs) else None,
+        )
+
+    return RESULTS.get_or_create((dataset_key, norm), build)
+
+
+def result_store_key(res: FilterResult) -> dict:
+    """
+    Chave do recorte para o dcc.Store (poucos bytes). Leva os filtros
+    normalizados, então qualquer worker consegue refazer o recorte.
+    """
+    return {"dataset": res.dataset_key, "filters": res.filters}
+
+
+def result_from_store(data: dict | None) -> FilterResult | None:
+    if not data:
+        return None
+    return get_filter_result(data.get("dataset"), **filters_from_key(data["filters"]))
+
+
+def memo_stats() -> dict:
+    """
+    Contadores do cache de recortes (hits/misses/tamanho) e de quantas
+    consultas o cubo e as linhas responderam.
+    """
+    with _path_lock:
+        paths = dict(_path_counts)
+    return {**RESULTS.stats(), "paths": paths}
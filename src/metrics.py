@@ -0,0 +1,278 @@
+"""
+Métricas do caminho quente (por processo):
+- span(nome): tempo de cada etapa (filtro, consultas, KPIs, cada figura,
+  insights, tabela, leitura e preparo da planilha)
+- Linhas que entram/saem do filtro e da tabela
+- Bytes de cada resposta dos callbacks do Dash, antes e depois da
+  compressão (src.compress)
+- Hit/miss dos caches (lidos na hora da coleta)
+- Rota /metrics no formato texto do Prometheus; com METRICS_LOG=1, uma
+  linha JSON por requisição com os spans dela
+- Com vários workers do gunicorn, cada um responde pelas suas métricas
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+
+log = logging.getLogger(__name__)
+
+METRICS_LOG = os.environ.get("METRICS_LOG", "0") == "1"
+PREFIX = "dashboard"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_help = {}
+# Funções chamadas na coleta: geram (métrica, labels, valor, tipo)
+_collectors = []
+# Spans da requisição em andamento (uma lista por thread)
+_request = threading.local()
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(metric: str, value: float, buckets=SECONDS_BUCKETS, help: str = "", **labels):
+    """
+    Registra um valor no histograma `metric`.
+    """
+    key = (metric, _labels_key(labels))
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = _Histogram(buckets)
+            _help.setdefault(metric, help)
+        h.observe(value)
+
+
+def inc(metric: str, value: float = 1, help: str = "", **labels):
+    """
+    Soma `value` no contador `metric`.
+    """
+    key = (metric, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        _help.setdefault(metric, help)
+
+
+def count_rows(stage: str, rows_in: int, rows_out: int):
+    inc("rows_in_total", rows_in, help="Linhas que entraram na etapa", stage=stage)
+    inc("rows_out_total", rows_out, help="Linhas que saíram da etapa", stage=stage)
+
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    Mede o bloco e registra em span_seconds{span=name, ...}.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        observe("span_seconds", elapsed, help="Tempo de cada etapa do dashboard", span=name, **labels)
+        spans = getattr(_request, "spans", None)
+        if spans is not None:
+            spans.append({"span": name, **labels, "ms": round(elapsed * 1000, 3)})
+
+
+def timed(name: str):
+    """
+    Decorator: a função inteira vira um span.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def measure(name: str, fn, **labels):
+    """
+    fn() dentro de um span; retorna o resultado (útil em lambdas de cache).
+    """
+    with span(name, **labels):
+        return fn()
+
+
+def register_collector(fn):
+    """
+    fn() -> [(métrica, labels, valor, "gauge" | "counter")], lida a cada coleta.
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def lru_collector(caches: dict):
+    """
+    Coletor de hits/misses/tamanho de LRUCaches ({nome: cache}).
+    """
+    def collect():
+        out = []
+        for name, cache in caches.items():
+            stats = cache.stats()
+            out.append(("cache_hits_total", {"cache": name}, stats["hits"], "counter"))
+            out.append(("cache_misses_total", {"cache": name}, stats["misses"], "counter"))
+            out.append(("cache_items", {"cache": name}, stats["size"], "gauge"))
+        return out
+    return collect
+
+
+# ---- Formato Prometheus ----
+
+def _fmt_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_value(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render_metrics() -> str:
+    """
+    Todas as métricas no formato texto do Prometheus.
+    """
+    lines = []
+
+    def header(metric, kind):
+        name = f"{PREFIX}_{metric}"
+        if _help.get(metric):
+            lines.append(f"# HELP {name} {_help[metric]}")
+        lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            ((key, list(h.buckets), list(h.counts), h.count, h.sum) for key, h in _histograms.items()),
+            key=lambda item: item[0],
+        )
+
+    last = None
+    for (metric, labels), value in counters:
+        if metric != last:
+            name, last = header(metric, "counter"), metric
+        lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+    last = None
+    for (metric, labels), buckets, counts, count, total in histograms:
+        if metric != last:
+            name, last = header(metric, "histogram"), metric
+        for upper, n in zip(buckets, counts):
+            lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', _fmt_value(float(upper))),))} {n}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    # Linhas de uma mesma métrica ficam juntas, venham de qual coletor for
+    families = {}
+    for collect in _collectors:
+        for metric, labels, value, kind in collect():
+            families.setdefault((metric, kind), []).append((labels, value))
+    for (metric, kind), samples in families.items():
+        name = f"{PREFIX}_{metric}"
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_fmt_labels(_labels_key(labels))} {_fmt_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ---- Flask ----
+
+def _callback_output() -> str | None:
+    """
+    Componentes de saída do callback do Dash da requisição atual
+    (ex.: "tbl+tbl-count"); None fora dos callbacks.
+    """
+    if not request.path.endswith("_dash-update-component"):
+        return None
+    body = request.get_json(silent=True) or {}
+    ids = []
+    for part in str(body.get("output", "?")).strip(".").split("..."):
+        component = part.split("@")[0].rsplit(".", 1)[0]
+        if component not in ids:
+            ids.append(component)
+    return "+".join(ids)
+
+
+def init_app(server, log_requests: bool = METRICS_LOG):
+    """
+    Liga as métricas no servidor Flask do Dash: rota /metrics, tempo e
+    bytes de cada callback e (opcional) log JSON por requisição.
+    """
+    @server.before_request
+    def _start():
+        _request.t0 = time.perf_counter()
+        _request.spans = []
+
+    @server.after_request
+    def _finish(response):
+        t0 = getattr(_request, "t0", None)
+        output = _callback_output()
+        if t0 is None or output is None:
+            return response
+        elapsed = time.perf_counter() - t0
+        wire = 0 if response.direct_passthrough else len(response.get_data())
+        # Tamanho antes da compressão (src.compress guarda em g.raw_bytes)
+        size = g.get("raw_bytes", wire)
+        observe("callback_seconds", elapsed, help="Tempo de cada callback do Dash", output=output)
+        observe("payload_bytes", size, BYTES_BUCKETS, help="Bytes da resposta de cada callback", output=output)
+        observe("payload_wire_bytes", wire, BYTES_BUCKETS,
+                help="Bytes enviados de cada callback (depois da compressão)", output=output)
+        if log_requests:
+            log.info(json.dumps({
+                "output": output,
+                "status": response.status_code,
+                "ms": round(elapsed * 1000, 3),
+                "bytes": size,
+                "wire_bytes": wire,
+                "spans": _request.spans,
+            }, ensure_ascii=False))
+        return response
+
+    @server.teardown_request
+    def _clear(_exc):
+        _request.t0 = None
+        _request.spans = None
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    return server
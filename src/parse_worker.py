@@ -0,0 +1,26 @@
+"""
+Processo filho da leitura em paralelo (src.sources):
+    python -m src.parse_worker <planilha> [--compact]
+- Lê a planilha e grava o cache em disco dela; o pai só mapeia o cache
+- Interpretador novo: nada do processo pai (travas de logging/LRU/métricas,
+  threads, app Dash) é herdado, ao contrário de um fork feito de dentro de
+  um worker do gunicorn com várias threads
+- Não importa o app; só o caminho de leitura (src.disk_cache)
+"""
+
+import sys
+
+from src.disk_cache import load_prepared_cached
+
+
+def main(argv=None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if not args:
+        print(__doc__, file=sys.stderr)
+        return 2
+    load_prepared_cached(args[0], compact="--compact" in args[1:])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
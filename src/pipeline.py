@@ -0,0 +1,83 @@
+"""
+Fila de mudanças de filtro por aba do navegador:
+- No navegador (assets/filters.js), mudanças seguidas dos filtros dentro
+  de FILTER_BATCH_MS viram uma só; cada estado novo ganha um número de
+  sequência ({"session", "seq"} no store-filter-seq)
+- No servidor, o maior seq visto por sessão marca o estado atual: o
+  filtro e os painéis de um estado mais antigo são pulados (PreventUpdate)
+  em vez de rodar até o fim
+- Por processo: com vários workers do gunicorn, cada um só conhece os
+  estados que recebeu
+"""
+
+import os
+import threading
+
+from dash.exceptions import PreventUpdate
+
+from src.lru import LRUCache
+from src.metrics import inc
+
+
+FILTER_BATCH_MS = int(os.environ.get("FILTER_BATCH_MS", "250"))
+DESENHO_DEBOUNCE_S = float(os.environ.get("DESENHO_DEBOUNCE_S", "0.4"))
+
+
+class SessionSequencer:
+    """
+    Último seq de cada sessão (LRU, para não crescer sem limite).
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self._latest = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def advance(self, session: str, seq: int) -> bool:
+        """
+        Registra o estado (session, seq). False se já chegou um mais novo.
+        """
+        with self._lock:
+            latest = self._latest.get(session)
+            if latest is not None and latest > seq:
+                return False
+            self._latest.put(session, seq)
+            return True
+
+    def is_stale(self, session: str, seq: int) -> bool:
+        with self._lock:
+            latest = self._latest.get(session)
+        return latest is not None and latest > seq
+
+
+SEQUENCER = SessionSequencer(int(os.environ.get("FILTER_SESSIONS", "10000")))
+
+
+def _seq(data: dict | None) -> tuple[str | None, int | None]:
+    if not data or data.get("session") is None or data.get("seq") is None:
+        return None, None
+    return str(data["session"]), int(data["seq"])
+
+
+def accept_filter_state(seq_data: dict | None) -> dict:
+    """
+    Estado novo dos filtros chegando ao servidor. Retorna {"session", "seq"}
+    para seguir junto com o recorte; PreventUpdate se já ficou velho.
+    """
+    session, seq = _seq(seq_data)
+    if session is None:
+        return {}
+    if not SEQUENCER.advance(session, seq):
+        inc("stale_skipped_total", help="Requisições de um estado de filtro já superado", stage="filter")
+        raise PreventUpdate
+    return {"session": session, "seq": seq}
+
+
+def skip_if_stale(filtered: dict | None, stage: str):
+    """
+    Painel pedido para um recorte cujo estado de filtro já foi superado:
+    PreventUpdate (o estado novo vai pedir o painel de novo).
+    """
+    session, seq = _seq(filtered)
+    if session is not None and SEQUENCER.is_stale(session, seq):
+        inc("stale_skipped_total", help="Requisições de um estado de filtro já superado", stage=stage)
+        raise PreventUpdate
@@ -0,0 +1,289 @@
+"""
+Carga e recarga da planilha sem travar o servidor:
+- A primeira carga também roda na thread do vigia: o app responde com o
+  layout logo ao subir e o load-status mostra o progresso
+- Thread em segundo plano confere tamanho/mtime das planilhas a cada N s
+- Versão nova: lê e prepara fora do caminho das requisições,
+  reaproveitando as derivadas das linhas que não mudaram
+- Leitura em streaming, com progresso exposto em `progress`
+- Troca atômica da versão atual (requisições em andamento seguem com a
+  versão que já tinham em mãos)
+- Várias planilhas: só as alteradas são lidas de novo (src.sources)
+- Se outro processo (ex.: outro worker do gunicorn) já gravou o cache da
+  versão nova, só carrega o cache em vez de ler a planilha de novo; a
+  leitura é feita sob cache_lock, então os outros esperam por ele
+- Versão da chave = geração da origem (src.sources.sources_version),
+  igual em todos os workers e sempre crescente
+- Chave de versão mais nova que a atual (outro worker recarregou antes e
+  já publicou no Store): se o cache em disco dela já existe, só o mapeia,
+  sem bloquear a requisição; senão fica para a thread do vigia
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from src.cache import register_dataset, get_dataset, pin_dataset, warm_dataset, key_version
+from src.data import DATASET_COLUMNS, prepare_incremental, compact_df
+from src.disk_cache import (
+    cache_lock, load_cache_for_source, file_sha1, find_valid_cache, load_prepared_cache, save_prepared_cache,
+)
+from src.ingest import progress_text, read_excel_stream
+from src.metrics import timed
+from src.sources import (
+    CONSOLIDATED_NAME, add_file_column, load_sources, resolve_workbooks, source_label, sources_signature,
+    sources_version,
+)
+from src.startup import STARTUP
+
+
+log = logging.getLogger(__name__)
+
+RELOAD_INTERVAL_S = float(os.environ.get("RELOAD_INTERVAL_S", "30"))
+
+LOADING_STATUS = "⏳ Carregando base…"
+
+
+class DatasetWatcher:
+    """
+    Vigia a(s) planilha(s) da origem (arquivo, pasta ou glob) e mantém
+    (chave, status) da versão atual. Sem chave/assinatura iniciais, a
+    thread começa pela primeira carga.
+    """
+
+    def __init__(self, source, key: str | None = None, status: str = LOADING_STATUS,
+                 signature: dict | None = None, interval: float = RELOAD_INTERVAL_S,
+                 compact: bool = False, mmap: bool = False):
+        self.source = source
+        self.compact = compact
+        self.mmap = mmap
+        self.interval = interval
+        self.current = (key, status)
+        # Texto de progresso enquanto lê uma versão nova (None fora disso)
+        self.progress = None
+        self._signature = signature
+        self._thread = None
+        self._stop = threading.Event()
+        # Carga/recarga uma por vez (thread do vigia ou resolve numa requisição)
+        self._lock = threading.Lock()
+
+    @property
+    def loading(self) -> bool:
+        """
+        True até a primeira carga terminar (com ou sem base).
+        """
+        return self._signature is None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        if self.interval <= 0 and not self.loading:
+            return self
+        self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        if self.loading:
+            try:
+                self.load_initial()
+            except Exception as exc:
+                log.exception("Falha ao carregar %s", self.source)
+                # Assinatura vazia: a próxima checagem tenta de novo
+                self._signature = {}
+                self.current = (None, f"❌ Falha ao carregar a base: {exc}")
+            finally:
+                self.progress = None
+        while self.interval > 0 and not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                log.exception("Falha ao recarregar %s", self.source)
+            finally:
+                self.progress = None
+
+    def load_initial(self):
+        """
+        Primeira carga (cache em disco ou planilhas), fora do caminho das
+        requisições. Registra as fases no relatório de subida.
+        """
+        with self._lock:
+            self._load_initial()
+
+    def _load_initial(self):
+        paths = resolve_workbooks(self.source)
+        self.progress = LOADING_STATUS
+        with STARTUP.phase("load"), self._lock_for(paths):
+            df, info = load_sources(
+                self.source, compact=self.compact, mmap=self.mmap,
+                progress=self._on_files_progress if len(paths) > 1 else None,
+                rows_progress=self._on_progress,
+            )
+        if df is None:
+            self._signature = info["signature"]
+            self.current = (None, f"❌ Nenhuma planilha encontrada em: {self.source}")
+            STARTUP.loaded(rows=0)
+            return
+
+        with STARTUP.phase("prepare"):
+            key = register_dataset(df, version=self._next_version(info["signature"]))
+            pin_dataset(key)
+            warm_dataset(key)
+        origem = " (cache)" if info["from_cache"] else ""
+        self.progress = None
+        self._signature = info["signature"]
+        self.current = (key, f"✅ Base carregada{origem}: {source_label(info['paths'])} — {len(df):,} linhas")
+        STARTUP.loaded(rows=len(df), from_cache=info["from_cache"])
+
+    @staticmethod
+    def _lock_for(paths):
+        # Planilhas e caches (inclusive o consolidado) ficam na pasta da 1ª
+        return cache_lock(paths[0].parent) if paths else nullcontext()
+
+    def check(self) -> bool:
+        """
+        Recarrega se alguma planilha mudou (ou entrou/saiu da origem).
+        Retorna True se trocou de versão.
+        """
+        with self._lock:
+            try:
+                paths = resolve_workbooks(self.source)
+                sig = sources_signature(paths)
+            except OSError:
+                return False
+            if not sig or sig == self._signature:
+                return False
+            self._reload(paths, sig)
+            return True
+
+    def resolve(self, key: str):
+        """
+        Loader de chaves desconhecidas (src.cache.set_dataset_loader), chamado
+        numa requisição. Chave de versão mais nova que a atual: outro worker
+        já recarregou. Nunca bloqueia: se o vigia está carregando, ou se ainda
+        não há cache em disco da versão nova, volta na hora e a recarga fica
+        com a thread do vigia. Senão só mapeia o cache que o outro worker
+        gravou; índices e cubo são montados numa thread à parte.
+        """
+        if key_version(key) <= key_version(self.current[0]):
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            paths = resolve_workbooks(self.source)
+            sig = sources_signature(paths)
+            if not sig or sig == self._signature:
+                return
+            df = self._cached_version(paths, sig)
+            if df is None:
+                return
+            new_key = register_dataset(df, version=self._next_version(sig))
+            pin_dataset(new_key)
+            self._signature = sig
+            self.current = (new_key, f"✅ Base atualizada: {source_label(paths)} — {len(df):,} linhas (cache)")
+        except Exception:
+            log.exception("Falha ao mapear a versão nova de %s", self.source)
+            return
+        finally:
+            self._lock.release()
+        threading.Thread(target=warm_dataset, args=(new_key,), name="dataset-warm", daemon=True).start()
+
+    def _cached_version(self, paths, sig: dict):
+        """
+        Base da versão atual das planilhas, só se o cache em disco dela já
+        estiver pronto (None se precisar ler planilha).
+        """
+        mmap_mode = "r" if self.mmap else None
+        if len(paths) == 1:
+            df = self._load_from_cache(paths[0], mmap_mode)
+            return None if df is None else add_file_column(df, paths[0])
+        return load_cache_for_source(paths[0].parent / CONSOLIDATED_NAME, sig, compact=self.compact,
+                                     mmap_mode=mmap_mode)
+
+    def _next_version(self, sig: dict) -> int:
+        version = sources_version(self.source, sig)
+        if version is None:
+            # Sem escrita junto às planilhas: versão só deste processo
+            version = max(key_version(self.current[0]) + 1, time.time_ns())
+        return version
+
+    @timed("reload")
+    def _reload(self, paths, sig: dict):
+        """
+        Lê a versão nova e troca a atual.
+        """
+        t0 = time.perf_counter()
+        with self._lock_for(paths):
+            src = None
+            if len(paths) == 1:
+                df, detalhe, src = self._reload_single(paths[0], sig[str(paths[0])])
+            else:
+                df, info = load_sources(self.source, compact=self.compact, mmap=self.mmap,
+                                        progress=self._on_files_progress)
+                detalhe = f"{info['parsed']} de {len(paths)} planilhas lidas"
+
+        # Com o casamento das linhas (src), o cubo novo atualiza os rollups
+        # da versão atual em vez de remontá-los
+        prev = (self.current[0], src) if src is not None and self.current[0] else None
+        key = register_dataset(df, version=self._next_version(sig), prev=prev)
+        pin_dataset(key)
+        warm_dataset(key)
+        status = f"✅ Base atualizada: {source_label(paths)} — {len(df):,} linhas ({detalhe})"
+        # Troca atômica: uma única atribuição da tupla
+        self.progress = None
+        self._signature = sig
+        self.current = (key, status)
+        log.info("Base recarregada em %.2fs (%s)", time.perf_counter() - t0, detalhe)
+
+    def _reload_single(self, path, sig: dict):
+        """
+        Uma planilha só: reaproveita as derivadas das linhas que não mudaram.
+        Retorna (df, detalhe do status, src de prepare_incremental ou None).
+        """
+        mmap_mode = "r" if self.mmap else None
+        df = self._load_from_cache(path, mmap_mode)
+        if df is not None:
+            return add_file_column(df, path), "cache", None
+
+        prev = get_dataset(self.current[0])
+        raw = read_excel_stream(path, progress=self._on_progress)
+        df, src = prepare_incremental(prev, raw)
+        n_changed = int((src < 0).sum())
+        df = df[DATASET_COLUMNS + ["aba"]]
+        if self.compact:
+            df = compact_df(df)
+
+        try:
+            meta = {"source": {**sig, "sha1": file_sha1(path)}, "compact": self.compact}
+            save_prepared_cache(df, path, meta)
+        except OSError:
+            pass
+        else:
+            if self.mmap:
+                # Passa a usar as colunas mapeadas do cache recém-gravado
+                cached = self._load_from_cache(path, mmap_mode)
+                df = df if cached is None else cached
+        return add_file_column(df, path), f"{n_changed:,} alteradas", src if prev is not None else None
+
+    def _on_progress(self, done: int, total: int | None):
+        self.progress = progress_text(done, total)
+
+    def _on_files_progress(self, done: int, total: int):
+        self.progress = progress_text(done, total, unit="planilhas")
+
+    def _load_from_cache(self, path, mmap_mode):
+        """
+        Base do cache em disco, se já estiver válido para a planilha atual.
+        """
+        cache_dir, meta = find_valid_cache(path)
+        if cache_dir is None or meta.get("compact", False) != self.compact:
+            return None
+        try:
+            return load_prepared_cache(cache_dir, meta, mmap_mode=mmap_mode)
+        except (OSError, ValueError, KeyError):
+            return None
@@ -0,0 +1,99 @@
+"""
+Índice de substring para "Desenho PAI contém":
+- Índice invertido de trigramas sobre os valores distintos (minúsculos)
+- Consulta = interseção das listas dos trigramas + conferência final
+- Consultas de 1-2 caracteres (as primeiras teclas): listas próprias de
+  caracteres e pares, que já são a resposta exata, sem varrer os valores
+- Memo por consulta: digitar "7198" depois de "719" só refina os
+  candidatos já encontrados para "719"
+- Linhas de cada valor distinto em formato CSR (posições contíguas)
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from src.lru import LRUCache
+
+
+NGRAM = 3
+
+
+class SubstringIndex:
+    """
+    values: valores distintos já em minúsculas.
+    codes: para cada linha, o índice do seu valor em values.
+    rows: argsort estável de codes, se já calculado (ex.: mapeado do disco).
+    """
+
+    def __init__(self, values: list[str], codes: np.ndarray, memo_size: int = 256, rows=None):
+        self.values = values
+        self.n_rows = len(codes)
+
+        # Trigramas e, para consultas curtas, também caracteres e pares
+        postings = defaultdict(list)
+        for i, v in enumerate(values):
+            grams = {v[j:j + k] for k in range(1, NGRAM + 1) for j in range(len(v) - k + 1)}
+            for g in grams:
+                postings[g].append(i)
+        self.postings = {g: np.asarray(ids, dtype="int32") for g, ids in postings.items()}
+
+        # Linhas agrupadas por valor: rows[offsets[i]:offsets[i + 1]]
+        self.rows = np.argsort(codes, kind="stable").astype("int64") if rows is None else rows
+        counts = np.bincount(codes, minlength=len(values))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        self.memo = LRUCache(maxsize=memo_size)
+
+    def _verify(self, query: str, candidates) -> np.ndarray:
+        values = self.values
+        return np.fromiter((i for i in candidates if query in values[i]), dtype="int32")
+
+    def _candidates(self, query: str):
+        # Consulta anterior (de pelo menos um trigrama) que é prefixo desta:
+        # refina o resultado dela
+        for k in range(len(query) - 1, NGRAM - 1, -1):
+            if query[:k] in self.memo:
+                return self.memo.get(query[:k])
+
+        grams = {query[j:j + NGRAM] for j in range(len(query) - NGRAM + 1)}
+        lists = sorted((self.postings.get(g) for g in grams), key=lambda a: 0 if a is None else len(a))
+        if lists[0] is None:
+            return lists[0:0]
+        out = lists[0]
+        for ids in lists[1:]:
+            if len(out) == 0:
+                break
+            out = np.intersect1d(out, ids, assume_unique=True)
+        return out
+
+    def match_values(self, query: str) -> np.ndarray:
+        """
+        Índices (em values) dos valores que contêm query.
+        """
+        query = str(query).strip().lower()
+        if not query:
+            return np.arange(len(self.values), dtype="int32")
+        if query in self.memo:
+            return self.memo.get(query)
+        if len(query) < NGRAM:
+            # Lista de caracteres/pares: já é a resposta
+            return self.memo.put(query, self.postings.get(query, np.empty(0, dtype="int32")))
+        return self.memo.put(query, self._verify(query, self._candidates(query)))
+
+    def match_rows(self, query: str) -> np.ndarray:
+        """
+        Posições (iloc, ordenadas) das linhas cujo valor contém query.
+        """
+        ids = self.match_values(query)
+        if len(ids) == len(self.values):
+            return np.arange(self.n_rows, dtype="int64")
+        if len(ids) == 0:
+            return np.empty(0, dtype="int64")
+        starts = self.offsets[ids]
+        lengths = self.offsets[ids + 1] - starts
+        # Junta os trechos rows[start:start + length] sem loop em Python
+        first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pos = self.rows[np.repeat(starts, lengths) + (np.arange(first.size) - first)]
+        pos.sort()
+        return pos
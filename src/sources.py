@@ -0,0 +1,212 @@
+"""
+Várias planilhas numa só base (ex.: uma planilha por cliente/ano):
+- Origem = arquivo, pasta (todos os .xlsx) ou glob
+- Cada planilha tem o próprio cache em disco; só as que mudaram são lidas
+- Leitura das planilhas alteradas em paralelo (um processo novo por
+  planilha, src.parse_worker, que grava o cache dela)
+- Coluna "arquivo" diz de qual planilha veio cada linha
+- A base junta também vai para um cache (.cache/_consolidado), que os
+  workers mapeiam do disco como no caso de uma planilha só
+"""
+
+import glob
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data import concat_prepared
+from src.disk_cache import (
+    bump_generation, find_valid_cache, load_cache_for_source, load_prepared_cached, save_prepared_cache,
+    workbook_signature,
+)
+from src.metrics import timed
+
+
+WORKBOOK_PATTERNS = ("*.xlsx", "*.xlsm")
+CONSOLIDATED_NAME = "_consolidado"
+
+# Processos para ler planilhas alteradas (0 = um por núcleo)
+LOAD_WORKERS = int(os.environ.get("LOAD_WORKERS", "0"))
+
+
+def resolve_workbooks(source) -> list[Path]:
+    """
+    Planilhas da origem, em ordem de nome. Ignora arquivos temporários
+    do Excel (~$...).
+    """
+    source = str(source)
+    if os.path.isdir(source):
+        paths = [p for pat in WORKBOOK_PATTERNS for p in glob.glob(os.path.join(source, pat))]
+    elif glob.has_magic(source):
+        paths = glob.glob(source)
+    else:
+        paths = [source] if os.path.exists(source) else []
+    return sorted(Path(p).resolve() for p in paths if not os.path.basename(p).startswith("~$"))
+
+
+def sources_signature(paths: list[Path]) -> dict:
+    """
+    Tamanho/mtime de cada planilha ({caminho: assinatura}).
+    """
+    return {str(p): workbook_signature(p) for p in paths}
+
+
+def source_dir(source) -> Path:
+    """
+    Pasta fixa da origem (não depende de quais planilhas existem agora):
+    a própria pasta, a parte sem curingas de um glob ou a pasta do arquivo.
+    """
+    source = str(source)
+    if os.path.isdir(source):
+        return Path(source).resolve()
+    if glob.has_magic(source):
+        parts = Path(source).parts
+        fixed = next(i for i, part in enumerate(parts) if glob.has_magic(part))
+        return Path(*parts[:fixed]).resolve() if fixed else Path.cwd()
+    return Path(source).resolve().parent
+
+
+def sources_version(source, signature: dict) -> int | None:
+    """
+    Versão da origem: geração gravada junto aos caches (bump_generation),
+    a mesma em todos os processos e sempre crescente, inclusive quando a
+    planilha mais nova sai da origem. None sem permissão de escrita.
+    """
+    return bump_generation(source_dir(source), signature)
+
+
+def source_label(paths: list[Path]) -> str:
+    if len(paths) == 1:
+        return paths[0].name
+    return f"{len(paths)} planilhas"
+
+
+def _has_cache(path: Path, compact: bool) -> bool:
+    cache_dir, meta = find_valid_cache(path)
+    return cache_dir is not None and meta.get("compact", False) == compact
+
+
+# Raiz do projeto: de onde o filho roda "python -m src.parse_worker"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _build_cache(path: str, compact: bool, rows_progress=None):
+    """
+    Lê a planilha neste processo e grava o cache dela.
+    Devolve a base só se não deu para gravar o cache (disco somente leitura).
+    """
+    df, _ = load_prepared_cached(path, compact=compact, progress=rows_progress)
+    return None if _has_cache(Path(path), compact) else df
+
+
+def _build_cache_subprocess(path: str, compact: bool):
+    """
+    Lê a planilha num processo novo (src.parse_worker) que grava o cache.
+    Se o filho falhar ou não conseguir gravar, lê aqui mesmo.
+    """
+    cmd = [sys.executable, "-m", "src.parse_worker", path] + (["--compact"] if compact else [])
+    subprocess.run(cmd, cwd=PROJECT_ROOT, stdin=subprocess.DEVNULL, check=False)
+    if _has_cache(Path(path), compact):
+        return None
+    return _build_cache(path, compact)
+
+
+def _parse_changed(paths: list[Path], compact: bool, max_workers: int, progress=None,
+                   rows_progress=None) -> dict:
+    """
+    Lê em paralelo as planilhas sem cache válido. Retorna {caminho: base}
+    das que não puderam ir para o cache.
+    """
+    if len(paths) == 1 or max_workers == 1:
+        out = {}
+        for i, p in enumerate(paths, 1):
+            df = _build_cache(str(p), compact, rows_progress)
+            if df is not None:
+                out[str(p)] = df
+            if progress is not None:
+                progress(i, len(paths))
+        return out
+
+    out = {}
+    # Processos novos em vez de fork: esta thread roda dentro de um worker
+    # com outras threads, e um fork herdaria travas presas (logging, LRU,
+    # métricas); as threads daqui só esperam os filhos
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="parse") as pool:
+        futures = {pool.submit(_build_cache_subprocess, str(p), compact): p for p in paths}
+        for i, fut in enumerate(as_completed(futures), 1):
+            df = fut.result()
+            if df is not None:
+                out[str(futures[fut])] = df
+            if progress is not None:
+                progress(i, len(paths))
+    return out
+
+
+def add_file_column(df: pd.DataFrame, path: Path) -> pd.DataFrame:
+    """
+    Coluna "arquivo" (categórica, um só valor) com o nome da planilha.
+    "atrasado" continua por último, como na base lida do cache
+    consolidado; a ordem das colunas entra na chave do dataset.
+    """
+    arquivo = pd.Categorical.from_codes(np.zeros(len(df), dtype="int8"), categories=[Path(path).name])
+    df = df.assign(arquivo=pd.Series(arquivo, index=df.index))
+    if "atrasado" in df.columns:
+        df = df[[c for c in df.columns if c != "atrasado"] + ["atrasado"]]
+    return df
+
+
+@timed("load_sources")
+def load_sources(source, compact: bool = False, mmap: bool = False, max_workers: int | None = None,
+                 progress=None, rows_progress=None) -> tuple[pd.DataFrame | None, dict]:
+    """
+    Base preparada de todas as planilhas da origem.
+    Retorna (df, info); info tem "paths", "signature", "parsed" (quantas
+    planilhas foram lidas do Excel) e "from_cache".
+    df é None se a origem não tiver planilhas.
+    progress(planilhas, total) a cada planilha lida; rows_progress(linhas,
+    total) dentro da planilha quando a leitura é sequencial.
+    """
+    paths = resolve_workbooks(source)
+    sig = sources_signature(paths)
+    info = {"paths": paths, "signature": sig, "parsed": 0, "from_cache": True}
+    if not paths:
+        return None, info
+
+    mmap_mode = "r" if mmap else None
+    consolidated = paths[0].parent / CONSOLIDATED_NAME
+    if len(paths) > 1:
+        df = load_cache_for_source(consolidated, sig, compact=compact, mmap_mode=mmap_mode)
+        if df is not None:
+            return df, info
+
+    changed = [p for p in paths if not _has_cache(p, compact)]
+    info["parsed"] = len(changed)
+    info["from_cache"] = not changed
+    if progress is not None and changed:
+        progress(0, len(changed))
+    workers = max_workers or LOAD_WORKERS or os.cpu_count() or 1
+    uncached = _parse_changed(changed, compact, max(1, min(workers, len(changed))), progress=progress,
+                              rows_progress=rows_progress)
+
+    frames = []
+    for p in paths:
+        df = uncached.get(str(p))
+        if df is None:
+            df, _ = load_prepared_cached(p, compact=compact, mmap=mmap and len(paths) == 1)
+        frames.append(add_file_column(df, p))
+    df = concat_prepared(frames, compact=compact)
+
+    if len(paths) > 1:
+        try:
+            save_prepared_cache(df, consolidated, {"source": sig, "compact": compact})
+        except OSError:
+            return df, info
+        if mmap:
+            cached = load_cache_for_source(consolidated, sig, compact=compact, mmap_mode=mmap_mode)
+            df = df if cached is None else cached
+    return df, info
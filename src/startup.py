@@ -0,0 +1,88 @@
+"""
+Relatório de subida do processo:
+- Relógio zerado no primeiro import do app (antes de dash/pandas)
+- Fases: imports, layout (app pronto para responder), load (leitura do
+  cache ou da planilha, em segundo plano) e prepare (índices, cubo e
+  co-ocorrência da base)
+- Uma linha no log quando a base fica pronta e startup_seconds{phase}
+  no /metrics
+- Módulo leve: não importa nada além da biblioteca padrão
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+
+log = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """
+    Tempo de cada fase da subida (segundos) + marcos desde o início.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = {}
+        self.milestones = {}
+        self.details = {}
+        self._last = self.t0
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str):
+        """
+        Fecha a fase `phase` (tempo desde o marco anterior).
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self.phases[phase] = now - self._last
+            self.milestones[phase] = now - self.t0
+            self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Mede o bloco como a fase `name` (usado fora da thread principal).
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + (now - t0)
+                self.milestones[name] = now - self.t0
+
+    def loaded(self, **details):
+        """
+        Base pronta: guarda os detalhes e registra o relatório no log.
+        """
+        with self._lock:
+            self.details.update(details)
+            self.milestones["ready"] = time.perf_counter() - self.t0
+        log.info("Subida: %s", self.summary())
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = [f"{name} {secs:.2f}s" for name, secs in self.phases.items()]
+            parts += [f"{k}={v}" for k, v in self.details.items()]
+            total = self.milestones.get("ready")
+        if total is not None:
+            parts.append(f"base pronta em {total:.2f}s")
+        return ", ".join(parts)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"phases": dict(self.phases), "milestones": dict(self.milestones), **self.details}
+
+    def collect(self) -> list:
+        """
+        Coletor para src.metrics.register_collector.
+        """
+        with self._lock:
+            return [("startup_seconds", {"phase": name}, secs, "gauge") for name, secs in self.phases.items()]
+
+
+STARTUP = StartupReport()
@@ -0,0 +1,145 @@
+"""
+Resumo por etapa do recorte filtrado, calculado numa única varredura:
+- Cada linha vira um código de padrão (6 flags "etapa atingida" + atraso)
+- Uma bincount por vetor de peso soma tudo por padrão (128 posições)
+- Uma matriz padrão x métrica converte as somas em funil, etapa atual,
+  totais e atraso
+
+Consumido por funil, conversão, WIP por etapa, KPIs e insights.
+O cubo (src/cube.py) usa o mesmo cálculo sobre as suas células.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.data import STAGE_ORDER
+
+
+# Flags "etapa atingida", do início ao fim do processo
+REACHED_COLS = ["prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg", "peso_exped_kg"]
+REACHED_LABELS = [
+    "Preparação atingida",
+    "Montagem atingida",
+    "Solda atingida",
+    "Acabamento atingido",
+    "Pintura atingida",
+    "Expedido",
+]
+
+N_FLAGS = len(REACHED_COLS)
+N_PATTERNS = 1 << (N_FLAGS + 1)  # + bit de atraso
+
+
+def _stage_matrix() -> np.ndarray:
+    """
+    Matriz (padrão x métrica), métricas:
+    [0] escopo, [1..6] etapa atingida, [7] atrasado, [8..14] etapa atual.
+    Etapa atual = flag mais avançada (mesma regra de classify_stages).
+    """
+    m = np.zeros((N_PATTERNS, 1 + N_FLAGS + 1 + len(STAGE_ORDER)))
+    for p in range(N_PATTERNS):
+        m[p, 0] = 1.0
+        stage = 0
+        for i in range(N_FLAGS):
+            if p >> i & 1:
+                m[p, 1 + i] = 1.0
+                stage = i + 1
+        m[p, 1 + N_FLAGS] = float(p >> N_FLAGS & 1)
+        m[p, 2 + N_FLAGS + stage] = 1.0
+    return m
+
+
+STAGE_MATRIX = _stage_matrix()
+
+
+@dataclass(frozen=True)
+class StageSummary:
+    n_rows: int
+    total_kg: float
+    produzido_kg: float
+    exped_kg: float
+    atraso_kg: float
+    reached_kg: dict          # rótulo do funil -> kg de escopo que atingiu a etapa
+    stage_kg: pd.Series       # etapa atual -> kg (só etapas presentes no recorte)
+    leadtime_sum: float
+    leadtime_count: int
+
+    @property
+    def saldo_a_produzir_kg(self) -> float:
+        return max(0.0, self.total_kg - self.produzido_kg)
+
+    @property
+    def saldo_a_expedir_kg(self) -> float:
+        return max(0.0, self.produzido_kg - self.exped_kg)
+
+    @property
+    def leadtime_mean(self) -> float | None:
+        return (self.leadtime_sum / self.leadtime_count) if self.leadtime_count else None
+
+    def funnel(self) -> dict:
+        return {"Total (escopo)": self.total_kg, **self.reached_kg}
+
+
+def _col(df: pd.DataFrame, c: str) -> np.ndarray:
+    return df[c].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def pattern_codes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Código de padrão de cada linha (6 flags "etapa atingida" + atraso).
+    """
+    key = np.zeros(len(df), dtype="int16")
+    for i, c in enumerate(REACHED_COLS):
+        key |= (_col(df, c) > 0).astype("int16") << i
+    key |= df["atrasado"].to_numpy(dtype=bool).astype("int16") << N_FLAGS
+    return key
+
+
+def summarize_patterns(key, count, total, produzido, exped, leadtime_sum: float, leadtime_count: int) -> StageSummary:
+    """
+    Resumo a partir dos códigos de padrão e dos pesos de cada linha
+    (linhas da base ou células do cubo; count=None conta 1 por linha).
+    """
+    # Uma bincount por vetor de peso; linhas = [linhas, total, produzido, expedido]
+    sums = np.vstack([
+        np.bincount(key, weights=count, minlength=N_PATTERNS),
+        np.bincount(key, weights=total, minlength=N_PATTERNS),
+        np.bincount(key, weights=produzido, minlength=N_PATTERNS),
+        np.bincount(key, weights=exped, minlength=N_PATTERNS),
+    ]) @ STAGE_MATRIX
+    counts, total, produzido, exped = sums
+
+    stages = slice(2 + N_FLAGS, 2 + N_FLAGS + len(STAGE_ORDER))
+    present = counts[stages] > 0
+    stage_kg = pd.Series(total[stages][present], index=pd.Index(np.array(STAGE_ORDER)[present], name="etapa_atual"))
+
+    return StageSummary(
+        n_rows=int(round(counts[0])),
+        total_kg=float(total[0]),
+        produzido_kg=float(produzido[0]),
+        exped_kg=float(exped[0]),
+        atraso_kg=float(total[1 + N_FLAGS]),
+        reached_kg={label: float(total[1 + i]) for i, label in enumerate(REACHED_LABELS)},
+        stage_kg=stage_kg.rename("peso_total_kg"),
+        leadtime_sum=float(leadtime_sum),
+        leadtime_count=int(leadtime_count),
+    )
+
+
+def compute_stage_summary(df: pd.DataFrame) -> StageSummary:
+    """
+    Resumo por etapa de df (qualquer recorte da base preparada).
+    """
+    lt = _col(df, "leadtime_dias")
+    lt = lt[lt >= 0]
+    return summarize_patterns(
+        pattern_codes(df),
+        None,
+        np.nan_to_num(_col(df, "peso_total_kg")),
+        np.nan_to_num(_col(df, "produzido_kg")),
+        np.nan_to_num(_col(df, "peso_exped_kg")),
+        lt.sum(),
+        lt.size,
+    )
@@ -0,0 +1,137 @@
+"""
+Tabela detalhada no servidor (DataTable com page/sort/filter "custom"):
+- filter_query da DataTable aplicado sobre todo o recorte filtrado
+- Ordenação por qualquer coluna sobre todo o recorte
+- Só a página pedida é formatada e enviada
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.data import date_values
+from src.insights import TABLE_COLUMNS, TABLE_DATE_COLUMNS, format_table_rows, table_columns
+
+
+# Operadores da sintaxe filter_query da DataTable -> operador canônico
+FILTER_OPERATORS = {
+    ">=": "ge", "<=": "le", "!=": "ne", "<": "lt", ">": "gt", "=": "eq",
+    "ge": "ge", "le": "le", "ne": "ne", "lt": "lt", "gt": "gt", "eq": "eq",
+    "contains": "contains", "datestartswith": "datestartswith",
+}
+
+# Só casa o operador logo depois de "{coluna}" (prefixo s/i = sensibilidade a
+# maiúsculas, ignorado); palavras exigem espaço, símbolos mais longos primeiro
+FILTER_PART_RE = re.compile(
+    r"^\s*\{(?P<col>[^}]*)\}\s*[si]?"
+    r"(?:(?P<word>contains|datestartswith|ge|le|ne|lt|gt|eq)\s+|(?P<symbol>>=|<=|!=|<|>|=)\s*)"
+    r"(?P<value>.*?)\s*$",
+    re.DOTALL,
+)
+
+# Só colunas numéricas convertem o valor sem aspas para float
+NUMERIC_COLUMNS = {c["id"] for c in table_columns() if c["type"] == "numeric"}
+
+
+def split_filter_part(part: str):
+    """
+    "{col} op valor" -> (col, op, valor); (None, None, None) se não reconhecer.
+    """
+    m = FILTER_PART_RE.match(part)
+    if m is None:
+        return None, None, None
+
+    name = m.group("col")
+    op = FILTER_OPERATORS[m.group("word") or m.group("symbol")]
+    value_part = m.group("value")
+    v0 = value_part[:1]
+    if len(value_part) > 1 and v0 == value_part[-1] and v0 in ("'", '"', "`"):
+        value = value_part[1:-1].replace("\\" + v0, v0)
+    elif name in NUMERIC_COLUMNS and op not in ("contains", "datestartswith"):
+        try:
+            value = float(value_part)
+        except ValueError:
+            value = value_part
+    else:
+        value = value_part
+    return name, op, value
+
+
+def _as_text(s: pd.Series) -> pd.Series:
+    if s.name in TABLE_DATE_COLUMNS:
+        return pd.to_datetime(date_values(s), errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+    return s.astype("string").fillna("")
+
+
+def _compare(s: pd.Series, op: str, value) -> np.ndarray:
+    if op == "contains":
+        return _as_text(s).str.contains(str(value), case=False, regex=False).to_numpy(dtype=bool)
+    if op == "datestartswith":
+        return _as_text(s).str.startswith(str(value)).to_numpy(dtype=bool)
+
+    if s.name in TABLE_DATE_COLUMNS:
+        s = date_values(s)
+        value = pd.to_datetime(value, errors="coerce")
+        if pd.isna(value):
+            return np.zeros(len(s), dtype=bool)
+    elif not pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        s = _as_text(s)
+        value = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+    elif not isinstance(value, float):
+        # Texto comparado com coluna numérica: nada casa
+        return np.zeros(len(s), dtype=bool)
+
+    ops = {
+        "ge": s.__ge__, "le": s.__le__, "lt": s.__lt__,
+        "gt": s.__gt__, "ne": s.__ne__, "eq": s.__eq__,
+    }
+    return ops[op](value).fillna(False).to_numpy(dtype=bool)
+
+
+def filter_positions(df: pd.DataFrame, filter_query: str | None) -> np.ndarray | None:
+    """
+    Posições das linhas que passam no filter_query (None = todas).
+    """
+    if not filter_query:
+        return None
+    mask = np.ones(len(df), dtype=bool)
+    for part in filter_query.split(" && "):
+        col, op, value = split_filter_part(part)
+        if col in TABLE_COLUMNS and col in df.columns:
+            mask &= _compare(df[col], op, value)
+    return np.flatnonzero(mask)
+
+
+def sort_positions(df: pd.DataFrame, positions: np.ndarray | None, sort_by) -> np.ndarray:
+    """
+    Ordem das linhas (posições) segundo sort_by da DataTable.
+    Ordena só as colunas pedidas; nulos sempre no fim.
+    """
+    if positions is None:
+        positions = np.arange(len(df))
+    cols = [s for s in (sort_by or []) if s.get("column_id") in df.columns]
+    if not cols or len(positions) == 0:
+        return positions
+
+    keys = df[[s["column_id"] for s in cols]].iloc[positions].reset_index(drop=True)
+    order = keys.sort_values(
+        by=[s["column_id"] for s in cols],
+        ascending=[s.get("direction", "asc") == "asc" for s in cols],
+        kind="stable",
+        na_position="last",
+    ).index.to_numpy()
+    return positions[order]
+
+
+def build_table_page(df: pd.DataFrame, page_current: int, page_size: int, order: np.ndarray):
+    """
+    Formata só a página pedida. Retorna (registros, page_count, total_linhas).
+    """
+    total = len(order)
+    page_size = max(1, int(page_size or 1))
+    page_count = max(1, -(-total // page_size))
+    page_current = min(max(0, int(page_current or 0)), page_count - 1)
+
+    page = order[page_current * page_size: (page_current + 1) * page_size]
+    return format_table_rows(df.iloc[page]), page_count, total
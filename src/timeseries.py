@@ -0,0 +1,156 @@
+"""
+Série temporal (kg recebido x expedido) por dia, semana ou mês:
+- Datas como número do dia (desde 1970-01-01): a base compacta já guarda
+  assim; no modo normal é uma divisão inteira, sem to_period por linha
+- Semana (segunda-feira) e mês (dia 1) saem do número do dia por conta
+  inteira
+- DayRollup: kg por (célula do cubo, dia), montado uma vez por versão do
+  dataset junto com o cubo; a série de um recorte soma as linhas do
+  rollup das células dele no período pedido, sem reler a base
+- Recarga incremental: o rollup novo sai do anterior (células renumeradas)
+  menos as linhas que saíram/mudaram e mais as novas/alteradas
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.data import date_values
+
+
+# Granularidades do seletor da série (valor -> rótulo)
+GRANULARITIES = {"dia": "Dia", "semana": "Semana", "mes": "Mês"}
+DEFAULT_GRANULARITY = "semana"
+
+# Dia sem data (NaT / <NA>)
+NO_DAY = np.iinfo("int32").min
+
+_DAY_NS = 86_400 * 10**9
+
+
+def day_numbers(s: pd.Series) -> np.ndarray:
+    """
+    Dias desde 1970-01-01 em int64 (sem data = NO_DAY); o horário é
+    descartado, como nos filtros de data (src.data.day_bounds).
+    """
+    if pd.api.types.is_integer_dtype(s):
+        # Base compacta: a coluna já é o número do dia
+        days = s.to_numpy(dtype="float64", na_value=np.nan)
+        valid = ~np.isnan(days)
+        return np.where(valid, days, NO_DAY).astype("int64")
+    ns = date_values(s).to_numpy(dtype="datetime64[ns]").view("int64")
+    valid = ns != np.iinfo("int64").min
+    days = np.where(valid, np.floor_divide(ns, _DAY_NS), 0)
+    return np.where(valid, days, NO_DAY).astype("int64")
+
+
+def week_start(days: np.ndarray) -> np.ndarray:
+    """
+    Dia da segunda-feira da semana; 1970-01-01 foi quinta.
+    """
+    return np.where(days == NO_DAY, NO_DAY, days - (days + 3) % 7)
+
+
+def period_start(days: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    Primeiro dia do período (dia, semana ou mês) de cada dia (sem NO_DAY).
+    """
+    if granularity == "dia":
+        return days
+    if granularity == "mes":
+        months = days.astype("datetime64[D]").astype("datetime64[M]")
+        return months.astype("datetime64[D]").astype("int64")
+    return days - (days + 3) % 7
+
+
+def series_from_days(days: np.ndarray, kg: np.ndarray, granularity: str, name: str, index_name: str) -> pd.Series:
+    """
+    Soma de kg por período (índice = data de início do período), só dos
+    dias válidos.
+    """
+    valid = days != NO_DAY
+    days, kg = days[valid], kg[valid]
+    if len(days):
+        lo = int(days.min())
+        span = int(days.max()) - lo + 1
+        if span <= 4 * len(days):
+            # Soma por dia com bincount (faixa de dias curta) antes de ir
+            # para o período: o resto trabalha só com os dias distintos
+            offsets = days - lo
+            present = np.flatnonzero(np.bincount(offsets, minlength=span))
+            kg = np.bincount(offsets, weights=kg, minlength=span)[present]
+            days = present + lo
+    periods, inverse = np.unique(period_start(days, granularity), return_inverse=True)
+    sums = np.bincount(inverse.ravel(), weights=kg, minlength=len(periods))
+    index = pd.DatetimeIndex(pd.to_datetime(periods, unit="D"), name=index_name)
+    return pd.Series(sums, index=index, name=name)
+
+
+def _kg(df: pd.DataFrame, col: str) -> np.ndarray:
+    return np.nan_to_num(df[col].to_numpy(dtype="float64", na_value=np.nan))
+
+
+# (coluna de data, medida) de cada linha da série
+SERIES = {"receb": ("dt_receb", "peso_total_kg"), "exped": ("dt_exped", "peso_exped_kg")}
+
+
+def timeseries_kg(df: pd.DataFrame, granularity: str = DEFAULT_GRANULARITY) -> tuple[pd.Series, pd.Series]:
+    """
+    kg recebido e expedido por período, direto das linhas (recortes que o
+    cubo não responde).
+    """
+    out = []
+    for prefix, (col, measure) in SERIES.items():
+        days = day_numbers(df[col])
+        out.append(series_from_days(days, _kg(df, measure), granularity, measure, f"{prefix}_periodo"))
+    return tuple(out)
+
+
+class DayRollup:
+    """
+    kg (e nº de linhas) por (célula do cubo, dia) de uma coluna de data;
+    linhas sem data ou sem célula (-1) ficam de fora.
+    """
+
+    def __init__(self, cells: np.ndarray, days: np.ndarray, kg: np.ndarray, n: np.ndarray | None = None):
+        valid = (days != NO_DAY) & (cells >= 0)
+        cells, days, kg = cells[valid].astype("int64"), days[valid], kg[valid]
+        n = np.ones(len(days)) if n is None else n[valid]
+        if len(days):
+            lo = int(days.min())
+            span = int(days.max()) - lo + 1
+            keys, inverse = np.unique(cells * span + (days - lo), return_inverse=True)
+            self.cells, offsets = np.divmod(keys, span)
+            self.days = offsets + lo
+            self.kg = np.bincount(inverse.ravel(), weights=kg, minlength=len(keys))
+            self.n = np.bincount(inverse.ravel(), weights=n, minlength=len(keys))
+            # Atualização incremental: (célula, dia) que ficou sem linhas sai
+            keep = self.n > 0.5
+            if not keep.all():
+                self.cells, self.days, self.kg, self.n = (a[keep] for a in (self.cells, self.days, self.kg, self.n))
+        else:
+            self.cells = self.days = np.zeros(0, dtype="int64")
+            self.kg = self.n = np.zeros(0, dtype="float64")
+
+    def updated(self, cell_map: np.ndarray, minus: tuple, plus: tuple) -> "DayRollup":
+        """
+        Rollup da versão nova a partir deste, sem passar pelas linhas que
+        não mudaram. cell_map: célula deste cubo -> célula do cubo novo
+        (-1 = sumiu); minus/plus: (célula nova, dia, kg) das linhas que
+        saíram ou mudaram / das linhas novas ou alteradas.
+        """
+        return DayRollup(
+            np.concatenate([cell_map[self.cells], minus[0], plus[0]]),
+            np.concatenate([self.days, minus[1], plus[1]]),
+            np.concatenate([self.kg, -minus[2], plus[2]]),
+            np.concatenate([self.n, -np.ones(len(minus[0])), np.ones(len(plus[0]))]),
+        )
+
+    def __len__(self):
+        return len(self.days)
+
+    def series(self, m: np.ndarray, granularity: str, name: str, index_name: str) -> pd.Series:
+        """
+        Série das células marcadas em m (máscara sobre as células do cubo).
+        """
+        sel = m[self.cells]
+        return series_from_days(self.days[sel], self.kg[sel], granularity, name, index_name)
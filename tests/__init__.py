@@ -0,0 +1,4 @@
+"""
+Testes (rodar da raiz do projeto):
+    python -m pytest -q
+"""
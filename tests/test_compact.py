@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_raw_df
+from src.data import apply_filters, compact_df, prepare_df
+from src.index import FilterIndex
+from src.insights import build_insights, compute_kpis
+from src.summary import compute_stage_summary
+
+
+# Recebimento com horário: no modo compacto a data vira só o dia
+STAMPED = pd.Timestamp("2024-03-10 15:30")
+
+
+@pytest.fixture(scope="module")
+def bases():
+    raw = make_raw_df(3_000, seed=3)
+    raw.loc[:9, "DATA RECEBIMENTO DA GUIA"] = STAMPED
+    raw.loc[10:19, "DATA EXPEDIÇÃO"] = STAMPED + pd.Timedelta(days=30)
+    df = prepare_df(raw)
+    return df, compact_df(df)
+
+
+def _filter(df, receb=None, exped=None, index=False):
+    return apply_filters(
+        df, None, None, None, None, receb or [None, None], exped or [None, None], None,
+        index=FilterIndex(df) if index else None,
+    )
+
+
+def _same_rows(a: pd.DataFrame, b: pd.DataFrame):
+    assert a.index.tolist() == b.index.tolist()
+
+
+def _json(components):
+    return [c.to_plotly_json() for c in components] if isinstance(components, list) else components.to_plotly_json()
+
+
+def test_kpis_and_insights_match(bases):
+    df, small = bases
+    assert str(_json(compute_kpis(df))) == str(_json(compute_kpis(small)))
+    assert str(_json(build_insights(df))) == str(_json(build_insights(small)))
+
+
+def test_stage_summary_matches(bases):
+    full, small = (compute_stage_summary(d) for d in bases)
+    assert full.n_rows == small.n_rows
+    assert full.leadtime_sum == small.leadtime_sum and full.leadtime_count == small.leadtime_count
+    for name in ["total_kg", "produzido_kg", "exped_kg", "atraso_kg"]:
+        assert getattr(full, name) == pytest.approx(getattr(small, name), rel=1e-6)
+    pd.testing.assert_series_equal(full.stage_kg, small.stage_kg, rtol=1e-6)
+
+
+@pytest.mark.parametrize("index", [False, True])
+@pytest.mark.parametrize("receb, exped", [
+    # Fim no dia com horário: a linha das 15:30 entra nos dois modos
+    (["2024-03-01", "2024-03-10"], None),
+    # Início no dia seguinte: fica de fora nos dois modos
+    (["2024-03-11", "2024-04-30"], None),
+    (["2024-03-10", "2024-03-10"], ["2024-04-09", "2024-04-09"]),
+    (None, ["2024-01-01", "2024-06-30"]),
+])
+def test_date_filters_match(bases, receb, exped, index):
+    df, small = bases
+    got = _filter(df, receb, exped, index)
+    _same_rows(got, _filter(small, receb, exped, index))
+    _same_rows(got, _filter(df, receb, exped, not index))
+
+
+def test_day_filter_keeps_rows_with_time_of_day(bases):
+    df, _ = bases
+    got = _filter(df, ["2024-03-10", "2024-03-10"])
+    assert set(range(10)) <= set(got.index)
+    assert (got["dt_receb"].dt.normalize() == pd.Timestamp("2024-03-10")).all()
+    assert np.isin(got.index, _filter(df, ["2024-03-11", None]).index).sum() == 0
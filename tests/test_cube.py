@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_raw_df
+from src.cube import StageCube
+from src.data import prepare_df, prepare_incremental
+from src.index import FilterIndex
+from src.timeseries import GRANULARITIES
+
+
+def _edited(raw: pd.DataFrame) -> pd.DataFrame:
+    raw = raw.copy()
+    raw.loc[10:40, "PESO TOTAL ( KG)"] += 5.0
+    raw.loc[50:60, "DATA RECEBIMENTO DA GUIA"] += pd.Timedelta(days=9)
+    raw.loc[70:80, "CLIENTE"] = "CLIENTE NOVO"
+    raw = raw.drop(index=range(100, 130))
+    extra = make_raw_df(40, seed=7)
+    return pd.concat([raw, extra], ignore_index=True)
+
+
+def test_incremental_rollups_match_rebuild():
+    raw = make_raw_df(3_000, seed=1)
+    df1 = prepare_df(raw)
+    cube1 = StageCube(df1, FilterIndex(df1))
+
+    df2, src = prepare_incremental(df1, _edited(raw))
+    incremental = StageCube(df2, FilterIndex(df2), prev=(cube1, df1, src))
+    rebuilt = StageCube(df2, FilterIndex(df2))
+    assert incremental.incremental and not rebuilt.incremental
+
+    masks = [
+        np.ones(rebuilt.n_cells, dtype=bool),
+        rebuilt.mask(clientes=["CLIENTE NOVO", "CLIENTE 3"]),
+        rebuilt.mask(situacoes=["LIBERADO"], dt_receb_range=["2024-03-04", "2024-09-29"]),
+    ]
+    for m in masks:
+        for g in GRANULARITIES:
+            for got, expected in zip(incremental.timeseries(m, g), rebuilt.timeseries(m, g)):
+                assert got.index.equals(expected.index)
+                assert np.allclose(got.to_numpy(), expected.to_numpy())
+
+
+def test_too_many_changes_rebuild():
+    raw = make_raw_df(500, seed=2)
+    df1 = prepare_df(raw)
+    cube1 = StageCube(df1, FilterIndex(df1))
+    df2, src = prepare_incremental(df1, make_raw_df(500, seed=3))
+    assert not StageCube(df2, FilterIndex(df2), prev=(cube1, df1, src)).incremental
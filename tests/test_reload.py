@@ -0,0 +1,70 @@
+import os
+import shutil
+
+from benchmarks.synthetic import make_raw_df, write_workbook
+from src.cache import key_version
+from src.reload import DatasetWatcher
+
+
+def _watcher(tmp_path):
+    w = DatasetWatcher(str(tmp_path), interval=0, compact=True)
+    w.load_initial()
+    return w
+
+
+def _workbooks(tmp_path):
+    for i in range(2):
+        path = tmp_path / f"cliente_{i}.xlsx"
+        write_workbook(make_raw_df(30, seed=i), path)
+        os.utime(path, ns=(10**18 + i * 10**9, 10**18 + i * 10**9))
+    return tmp_path / "cliente_0.xlsx", tmp_path / "cliente_1.xlsx"
+
+
+def test_version_grows_when_newest_workbook_is_removed(tmp_path):
+    _, newest = _workbooks(tmp_path)
+    w = _watcher(tmp_path)
+    before = w.current[0]
+
+    newest.unlink()
+    assert w.check()
+    assert key_version(w.current[0]) > key_version(before)
+
+
+def test_version_grows_when_older_copy_is_restored(tmp_path):
+    oldest, _ = _workbooks(tmp_path)
+    backup = tmp_path / "backup.bin"
+    shutil.copy2(oldest, backup)
+    write_workbook(make_raw_df(30, seed=9), oldest)
+    w = _watcher(tmp_path)
+    before = w.current[0]
+
+    # Volta a cópia antiga, com o mtime antigo
+    shutil.copy2(backup, oldest)
+    assert w.check()
+    assert key_version(w.current[0]) > key_version(before)
+
+
+def test_same_files_same_version_in_another_process(tmp_path):
+    _workbooks(tmp_path)
+    assert _watcher(tmp_path).current[0] == _watcher(tmp_path).current[0]
+
+
+def test_resolve_does_not_wait_for_a_running_reload(tmp_path):
+    _, newest = _workbooks(tmp_path)
+    w = _watcher(tmp_path)
+    before = w.current[0]
+    newest.unlink()
+
+    with w._lock:
+        w.resolve(f"{key_version(before) + 1:x}.0")
+    assert w.current[0] == before
+
+
+def test_resolve_maps_the_cache_written_by_another_worker(tmp_path):
+    _, newest = _workbooks(tmp_path)
+    a, b = _watcher(tmp_path), _watcher(tmp_path)
+    newest.unlink()
+    assert a.check()
+
+    b.resolve(a.current[0])
+    assert b.current[0] == a.current[0]
@@ -0,0 +1,25 @@
+import numpy as np
+
+from src.search import SubstringIndex
+
+
+VALUES = ["70001", "70012", "a-71", "b7", "", "x1y2", "7198-a"]
+
+
+def _expected(query: str) -> list[int]:
+    return [i for i, v in enumerate(VALUES) if query in v]
+
+
+def test_matches_brute_force_for_short_and_long_queries():
+    idx = SubstringIndex(VALUES, np.arange(len(VALUES), dtype="int32"))
+    for query in ["7", "1", "-", "70", "71", "a", "zz", "700", "7001", "719", "198-", "x1y2", "q"]:
+        assert idx.match_values(query).tolist() == _expected(query), query
+
+
+def test_short_query_then_refined():
+    idx = SubstringIndex(VALUES, np.arange(len(VALUES), dtype="int32"))
+    assert idx.match_values("7").tolist() == _expected("7")
+    assert idx.match_values("70").tolist() == _expected("70")
+    assert idx.match_values("700").tolist() == _expected("700")
+    assert idx.match_values("7001").tolist() == _expected("7001")
+    assert idx.match_rows("71").tolist() == _expected("71")
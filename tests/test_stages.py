@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from src.data import classify_stages, stage_of_row
+
+
+WEIGHT_COLS = ["prep_kg", "mont_kg", "sold_kg", "acab_kg", "pint_kg", "peso_exped_kg"]
+
+
+def _check(df: pd.DataFrame):
+    got = np.asarray(classify_stages(df).astype(str))
+    expected = df.apply(stage_of_row, axis=1).to_numpy(dtype=str)
+    assert (got == expected).all()
+
+
+def test_random_weights_with_nan_and_negatives():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    values = rng.choice([0.0, 1.0, 250.5, -3.0, np.nan], size=(n, len(WEIGHT_COLS)))
+    _check(pd.DataFrame(values, columns=WEIGHT_COLS))
+
+
+def test_every_non_monotonic_pattern():
+    # Todas as 64 combinações de etapas com/sem peso, inclusive "pulos"
+    # (ex.: pintado sem ter preparado)
+    patterns = (np.arange(64)[:, None] >> np.arange(len(WEIGHT_COLS))) & 1
+    _check(pd.DataFrame(patterns * 100.0, columns=WEIGHT_COLS))
+
+
+def test_nan_weights_count_as_not_reached():
+    df = pd.DataFrame([[np.nan] * len(WEIGHT_COLS), [np.nan, 10.0, np.nan, np.nan, np.nan, np.nan]],
+                      columns=WEIGHT_COLS)
+    assert list(classify_stages(df).astype(str)) == ["Não iniciado", "Montagem"]
+    _check(df)
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from src.table import filter_positions, split_filter_part
+
+
+def test_operator_only_right_after_column():
+    assert split_filter_part("{descricao} contains chapa ge 3") == ("descricao", "contains", "chapa ge 3")
+    assert split_filter_part("{descricao} contains a<b") == ("descricao", "contains", "a<b")
+
+
+def test_text_column_keeps_value_as_text():
+    assert split_filter_part("{os_cliente} = 00123") == ("os_cliente", "eq", "00123")
+    assert split_filter_part("{os_cliente} eq 00123") == ("os_cliente", "eq", "00123")
+
+
+def test_numeric_column_coerces_value():
+    assert split_filter_part("{peso_total_kg} >= 10") == ("peso_total_kg", "ge", 10.0)
+    assert split_filter_part("{peso_total_kg} ge 10") == ("peso_total_kg", "ge", 10.0)
+    assert split_filter_part('{peso_total_kg} = "10"') == ("peso_total_kg", "eq", "10")
+
+
+def test_unrecognized_part():
+    assert split_filter_part("descricao contains x") == (None, None, None)
+    assert split_filter_part("{descricao} general") == (None, None, None)
+
+
+def test_filter_positions_text_equality():
+    df = pd.DataFrame({"os_cliente": ["00123", "123", "00124"], "peso_total_kg": [1.0, 20.0, 30.0]})
+    assert filter_positions(df, "{os_cliente} = 00123").tolist() == [0]
+    assert filter_positions(df, "{peso_total_kg} > 10 && {os_cliente} contains 12").tolist() == [1, 2]